@@ -0,0 +1,28 @@
+# compare the bytes transferred and the latency of display_status
+# before (whole 'dumpsys window') and after (only the needed flags)
+
+import shlex
+from time import perf_counter
+from statistics import mean
+from adb_connector_python.connector import (
+    Py_adb, execute, parse_display_status, COMMAND_INFO_SCREEN, COMMAND_SHELL, SCRIPT_DISPLAY_STATUS
+)
+
+RUNS = 20
+
+device = Py_adb()
+device_id = device.get_first_avaiable_device()["id"]
+
+commands = {
+    "before": COMMAND_INFO_SCREEN.format(device_id),
+    "after": COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_DISPLAY_STATUS))
+}
+
+for name, command in commands.items():
+    latencies = []
+    for _ in range(RUNS):
+        start = perf_counter()
+        output = execute(command, device.transport)
+        latencies.append((perf_counter() - start) * 1000)
+    print(f"{name:6s} {len(output.encode()):8d} bytes  mean {mean(latencies):7.1f} ms  "
+          f"min {min(latencies):7.1f} ms  max {max(latencies):7.1f} ms  {parse_display_status(output)}")
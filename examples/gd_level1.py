@@ -2,7 +2,9 @@
 # use this code to complete geometry dash level 1
 from adb_connector_python.connector import Py_adb
 
-device = Py_adb()
+# bind the device once, so every jump skips the device checks
+# sendevent writes touches directly in /dev/input, much faster and more precise than "input tap"
+device = Py_adb(input_backend="sendevent").device()
 
 
 # ensure this is a touchable location on your device
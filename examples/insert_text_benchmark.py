@@ -0,0 +1,39 @@
+# measure the characters per second of every insert_text strategy available on the device,
+# and of 'input text' with different chunk sizes (to tune TEXT_CHUNK_SIZE)
+
+# focus an empty text field on the device (e.g. a notes app) before running:
+#   python insert_text_benchmark.py
+# the field is cleared between the runs
+
+from time import perf_counter
+from adb_connector_python.connector import Py_adb, TEXT_CHUNK_SIZE
+
+LENGTHS = (16, 256, 2048)
+CHUNK_SIZES = (32, 64, TEXT_CHUNK_SIZE, 512)
+SAMPLE = "The quick brown fox jumps over the lazy dog 0123456789 % & ' \" $HOME; "
+
+device = Py_adb()
+device_id = device.get_first_avaiable_device()["id"]
+
+
+def clear(length: int) -> None:
+    device.key_sequence(["KEYCODE_MOVE_END"] + ["KEYCODE_DEL"] * length, device_id=device_id)
+
+
+def report(name: str, length: int, chunk_size: int = None) -> None:
+    text = (SAMPLE * (length // len(SAMPLE) + 1))[:length]
+    start = perf_counter()
+    ok = device.insert_text(text, strategy=name, chunk_size=chunk_size, device_id=device_id)
+    elapsed = perf_counter() - start
+    clear(length)
+    label = name if chunk_size is None else f"{name}/{chunk_size}"
+    print(f"{label:12s} {length:6d} chars {elapsed:7.2f} s {length / elapsed:9.1f} chars/s {'ok' if ok else 'FAILED'}")
+
+
+strategies = device.text_strategies(device_id)
+print("available strategies:", ", ".join(strategies))
+for name in strategies:
+    for length in LENGTHS:
+        report(name, length)
+for chunk_size in CHUNK_SIZES:
+    report("input", LENGTHS[-1], chunk_size)
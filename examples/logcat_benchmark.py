@@ -0,0 +1,94 @@
+# compare the text logcat parser with the binary (logcat -B) decoder on a log recorded from a device
+
+# record the fixtures once (the last RECORDS records of the connected device, in both formats) with:
+#   python logcat_benchmark.py record
+# which runs:
+#   adb logcat -d -t 20000 -v threadtime > fixtures/logcat.txt
+#   adb exec-out logcat -d -t 20000 -B > fixtures/logcat.bin
+# then run: python logcat_benchmark.py (or python logcat_benchmark.py logcat.txt logcat.bin for other files)
+# "python logcat_benchmark.py synthetic" uses a generated log, it only checks the decoders
+# because real logs have longer messages, more tags and multi line records
+
+import os
+import sys
+import struct
+import subprocess
+from io import BytesIO
+from time import perf_counter
+from adb_connector_python.connector import parse_logcat_line, iter_binary_logcat
+
+
+RECORDS = 20000
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+TEXT_FIXTURE = os.path.join(FIXTURES, "logcat.txt")
+BINARY_FIXTURE = os.path.join(FIXTURES, "logcat.bin")
+
+
+def record_fixtures() -> None:
+    os.makedirs(FIXTURES, exist_ok=True)
+    with open(TEXT_FIXTURE, "wb") as f:
+        subprocess.run(["adb", "logcat", "-d", "-t", str(RECORDS), "-v", "threadtime"], stdout=f, check=True)
+    # exec-out keeps the binary frames intact (shell would translate the newlines on old devices)
+    with open(BINARY_FIXTURE, "wb") as f:
+        subprocess.run(["adb", "exec-out", "logcat", "-d", "-t", str(RECORDS), "-B"], stdout=f, check=True)
+    print("recorded", TEXT_FIXTURE, "and", BINARY_FIXTURE)
+
+
+def synthetic_fixtures() -> tuple:
+    text = []
+    binary = []
+    for i in range(RECORDS * 10):
+        tag = ("ActivityManager", "chatty", "InputDispatcher", "SurfaceFlinger")[i % 4]
+        message = f"event {i} processed in {i % 97} ms for uid {10000 + i % 50}"
+        level = "VDIWE"[i % 5]
+        pid, tid, sec, nsec = 1000 + i % 7, 2000 + i % 13, 1700000000 + i // 1000, (i % 1000) * 1000000
+        text.append(f"10-18 12:00:{i // 1000 % 60:02d}.{i % 1000:03d}  {pid:5d}  {tid:5d} {level} {tag}: {message}\n")
+        payload = bytes([2 + "VDIWE".index(level)]) + tag.encode() + b"\0" + message.encode() + b"\0"
+        # logger_entry v4: len, hdr_size, pid, tid, sec, nsec, lid, uid
+        binary.append(struct.pack("<HHiIIIII", len(payload), 28, pid, tid, sec, nsec, 0, 1000) + payload)
+    return "".join(text).encode(), b"".join(binary)
+
+
+def bench_text(data: bytes) -> int:
+    count = 0
+    for line in BytesIO(data):
+        if parse_logcat_line(line.decode("utf8", "replace")) is not None:
+            count += 1
+    return count
+
+
+def bench_binary(data: bytes) -> int:
+    count = 0
+    for record in iter_binary_logcat(BytesIO(data)):
+        count += 1
+    return count
+
+
+def report(name: str, data: bytes, bench) -> None:
+    start = perf_counter()
+    count = bench(data)
+    elapsed = perf_counter() - start
+    print(f"{name:7s} {count:8d} records {len(data) / 1e6:8.2f} MB {elapsed:7.3f} s "
+          f"{count / elapsed:10.0f} records/s {len(data) / 1e6 / elapsed:7.1f} MB/s")
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["record"]:
+        record_fixtures()
+        sys.exit()
+    if sys.argv[1:] == ["synthetic"]:
+        text, binary = synthetic_fixtures()
+    elif len(sys.argv) == 3:
+        text, binary = read(sys.argv[1]), read(sys.argv[2])
+    elif os.path.exists(TEXT_FIXTURE) and os.path.exists(BINARY_FIXTURE):
+        text, binary = read(TEXT_FIXTURE), read(BINARY_FIXTURE)
+    else:
+        sys.exit("no recorded log, connect a device and run: python logcat_benchmark.py record")
+
+    report("text", text, bench_text)
+    report("binary", binary, bench_binary)
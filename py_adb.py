@@ -1,28 +1,214 @@
-from subprocess import check_output, CalledProcessError,run
-from os import system
-from sys import platform
-from time import sleep
+from subprocess import check_output, CalledProcessError,run,Popen,PIPE,DEVNULL
+from os import system,environ,remove
+from os.path import getmtime,getsize
+from sys import platform, byteorder
+from array import array
+from time import sleep, perf_counter, time, monotonic
+from tempfile import NamedTemporaryFile
+from functools import lru_cache
+from zipfile import ZipFile
 from termcolor import colored
 from os.path import realpath,exists
+from collections import deque
+from collections.abc import Mapping
+from bisect import bisect_left, insort
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from threading import Condition, Event, Lock, Thread, Timer
+from typing import NamedTuple
+from statistics import mean, pstdev
+from hashlib import sha1, sha256
+from xml.etree.ElementTree import XMLPullParser, ParseError
+from base64 import b64encode
+import asyncio
+import struct
+import socket
+import shlex
+import sys
+import re
+
+# optional, only needed to get frames as arrays
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# optional, only needed to decode the h264 screen stream
+try:
+    import av
+except ImportError:
+    av = None
 
 
 # INPUTS
 BASIC_INPUT_KEYEVENT: str = "adb -s {0} shell input keyevent {1}"
 COMMAND_INFO_SCREEN: str = "adb -s {0} shell dumpsys window"
+# only the flags of display_status are sent back, instead of the whole window manager state
+SCRIPT_DISPLAY_STATUS: str = ("dumpsys window policy | grep -o -E 'mDreamingLockscreen=[a-z]+|screenState=SCREEN_STATE_[A-Z_]+'; "
+                              "dumpsys power | grep -m1 -o -E 'mWakefulness=[A-Za-z]+'; true")
+# on-device loop printing the display flags only when they change
+SCRIPT_STATE_WATCH: str = 'last=""; while true; do state=$( ({0}) | tr "\\n" " "); if [ "$state" != "$last" ]; then echo "$state"; last="$state"; fi; sleep {1}; done'
+# seconds between two checks of the state watcher on the device, every check runs two dumpsys,
+# so a shorter interval reacts faster but keeps the device busier
+STATE_WATCH_INTERVAL: float = 1
 COMMAND_INFO_BATTERY: str = "adb -s {0} shell dumpsys battery"
 COMMAND_INFO_DEVICE: str = "adb -s {0} shell getprop"
 COMMAND_LIST_PACKAGES: str = "adb -s {0} shell pm list packages"
+COMMAND_PACKAGE_CHANGES: str = "adb -s {0} shell dumpsys package changes"
+SCRIPT_LIST_PACKAGES_DETAILED: str = "pm list packages --show-versioncode -U {0} 2>/dev/null || pm list packages -U {0}"
+PACKAGE_PATTERN = re.compile(r"^package:(\S+?)(?: versionCode:(\d+))?(?: uid:(\d+))?\r?$", re.M)
+# seconds a package index is trusted before checking the device change counter again
+PACKAGE_INDEX_MAX_AGE: float = 2
 COMMAND_INSTALL_APK: str = "adb -s {0} install {1}"
 COMMAND_UNINSTALL_APK: str = "adb -s {0} uninstall --user 0 {1}"
+DEPLOY_DIRECTORY: str = "/data/local/tmp/py_adb_deploy"
+SCRIPT_DEPLOY_STATUS: str = "dumpsys package {0} | grep -m1 versionCode=; cat " + DEPLOY_DIRECTORY + "/{0}.sha256 2>/dev/null; true"
+SCRIPT_DEPLOY_MARKER: str = "echo {1} > " + DEPLOY_DIRECTORY + "/{0}.sha256"
+SYNC_CHUNK_SIZE: int = 64 * 1024
+COMMAND_UI_DUMP: str = "adb -s {0} exec-out uiautomator dump /dev/tty"
+# only the windows section (the displays one on newer android) instead of the whole 'dumpsys window'
+SCRIPT_WINDOW_FOCUS: str = ("dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp' || "
+                            "dumpsys window displays | grep -E 'mCurrentFocus|mFocusedApp' || true")
+UI_BOUNDS_PATTERN = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+# seconds a ui dump is trusted before checking the focused window again
+UI_HIERARCHY_MAX_AGE: float = 1
 COMMAND_LOGCAT: str = "adb -s {0} logcat"
-COMMAND_INSERT_TEXT: str = "adb -s {0} shell input text {1}"
+COMMAND_LOGCAT_BINARY: str = "adb -s {0} exec-out logcat -B"
+LOGCAT_LEVELS: str = "VDIWEF"
+# android_LogPriority values, 2 is VERBOSE
+LOGCAT_PRIORITIES: str = "??VDIWEFS"
+LOGGER_ENTRY_V1_SIZE: int = 20
+LOGCAT_PATTERN = re.compile(r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+|\d+\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEFS])\s+(.*?)\s*: (.*)$")
+COMMAND_SCREENCAP: str = "adb -s {0} exec-out screencap"
+# android PixelFormat of the raw screencap: (name, bytes per pixel)
+SCREENCAP_FORMATS: dict = {
+    1: ("RGBA_8888", 4),
+    2: ("RGBX_8888", 4),
+    3: ("RGB_888", 3),
+    4: ("RGB_565", 2),
+    5: ("BGRA_8888", 4)
+}
+SCREENCAP_HEADER = struct.Struct("<III")
+COMMAND_SCREENRECORD_H264: str = "adb -s {0} exec-out screenrecord --output-format=h264 {1} -"
+# frames used to compute the fps and latency of a screen stream
+SCREEN_STREAM_WINDOW: int = 60
+# seconds screenrecord runs before stopping by itself, a run this long is restarted even without frames
+SCREENRECORD_TIME_LIMIT: float = 180
+# screenrecord runs in a row ending without frames before the h264 stream gives up (falling back to screencap
+# with source 'auto'), the restarts wait SCREEN_STREAM_BACKOFF seconds, doubled every time
+SCREEN_STREAM_RETRIES: int = 3
+SCREEN_STREAM_BACKOFF: float = 0.5
+# visual waits: seconds between captures and maximum channel difference of equal pixels
+VISUAL_WAIT_INTERVAL: float = 0.1
+VISUAL_WAIT_TOLERANCE: int = 16
 COMMAND_TURN_OFF: str = "adb -s {0} shell reboot -p"
 COMMAND_REBOOT: str = "adb -s {0} shell reboot"
+COMMAND_SHELL: str = "adb -s {0} shell {1}"
 
 # GESTURES
 COMMAND_SWIPE: str = "adb -s {0} shell input swipe {1} {2} {3} {4}"
 COMMAND_TAP: str = "adb -s {0} shell input tap {1} {2}"
 
+# RAW INPUT EVENTS (linux/input-event-codes.h)
+COMMAND_GETEVENT_INFO: str = "adb -s {0} shell getevent -p"
+COMMAND_SCREEN_SIZE: str = "adb -s {0} shell wm size"
+COMMAND_CPU_ABI: str = "adb -s {0} shell getprop ro.product.cpu.abi"
+INJECT_DIRECTORY: str = "/data/local/tmp/py_adb_events"
+INJECT_MISSING: str = "__PYADB_MISSING__"
+# /data/local/tmp can be wiped (reboot, cleaners), the scripts stop before writing anything if a file is gone
+SCRIPT_INJECT_CHECK: str = "for f in {0}; do [ -f $f ] || {{ echo " + INJECT_MISSING + "; exit 0; }}; done"
+EV_SYN: int = 0x00
+EV_KEY: int = 0x01
+EV_ABS: int = 0x03
+SYN_REPORT: int = 0x00
+BTN_TOUCH: int = 0x14a
+ABS_MT_SLOT: int = 0x2f
+ABS_MT_TOUCH_MAJOR: int = 0x30
+ABS_MT_POSITION_X: int = 0x35
+ABS_MT_POSITION_Y: int = 0x36
+ABS_MT_TRACKING_ID: int = 0x39
+ABS_MT_PRESSURE: int = 0x3a
+
+# STATE WAITS
+# seconds of the first poll interval, growing by WAIT_BACKOFF up to WAIT_MAX_INTERVAL
+WAIT_TIMEOUT: float = 5
+WAIT_INTERVAL: float = 0.05
+WAIT_BACKOFF: float = 1.5
+WAIT_MAX_INTERVAL: float = 0.5
+# waits kept in Py_adb.wait_log
+WAIT_LOG_SIZE: int = 1000
+SCRIPT_RESUMED_ACTIVITY: str = "dumpsys activity activities | grep -m1 -E 'mResumedActivity|topResumedActivity'; true"
+FOCUSED_WINDOW_PATTERN = re.compile(r"mCurrentFocus=Window\{\S+ \S+ ([^\s}]+)\}")
+RESUMED_ACTIVITY_PATTERN = re.compile(r"ActivityRecord\{\S+ \S+ ([^\s}]+)")
+UNLOCK_TIMEOUT: float = 2
+# the pin pad has no state to wait for, only its animation
+UNLOCK_PIN_PAD_DELAY: float = 0.3
+# seconds a return key (take, stop, confirm) has to change the camera window before the next one
+CAMERA_STEP_TIMEOUT: float = 2
+# the return keys that take (or stop) and then confirm a photo or a video
+CAMERA_STEPS: tuple = ("capture", "confirm")
+
+# ON DEVICE SCRIPTS
+SHELL_TIMESTAMP: str = "date +%s%N"
+# a timestamp just before and just after each tap, to tell the delays from the time 'input tap' takes
+SCRIPT_TAP: str = SHELL_TIMESTAMP + "; input tap {0} {1}; " + SHELL_TIMESTAMP
+SCRIPT_SLEEP: str = "sleep {0}"
+SCRIPT_REPEAT: str = "i=0; while [ $i -lt {0} ]; do {1}; i=$((i+1)); done"
+SCRIPT_FOREVER: str = "while true; do {0}; done"
+SCRIPT_KEYEVENT: str = "input keyevent {0}{1}"
+# 'input text' of a value known only on the device (like a script argument), with its spaces escaped there
+SCRIPT_INPUT_TEXT_VALUE: str = 'input text "$(printf %s {0} | sed \'s/ /%s/g\')"'
+KEY_PATTERN = re.compile(r"^\w+$")
+# milliseconds between the zoom keys of the camera
+CAMERA_ZOOM_DELAY: int = 100
+# text input strategies, 'keyboard' needs the ADBKeyBoard IME enabled and 'clipboard' the Clipper app
+TEXT_STRATEGIES: tuple = ("keyboard", "clipboard", "input")
+ADB_KEYBOARD_IME: str = "com.android.adbkeyboard/.AdbIME"
+CLIPPER_PACKAGE: str = "ca.zgrs.clipper"
+SCRIPT_TEXT_STRATEGIES: str = "settings get secure default_input_method; pm path " + CLIPPER_PACKAGE + " 2>/dev/null; true"
+SCRIPT_INPUT_TEXT: str = "input text {0}"
+SCRIPT_KEYBOARD_TEXT: str = "am broadcast -a ADB_INPUT_B64 --es msg {0} >/dev/null"
+SCRIPT_CLIPBOARD_FAILED: str = "__PYADB_CLIPBOARD_FAILED__"
+# Clipper answers with result=-1 (RESULT_OK), without it the clipboard wasn't set and nothing is pasted
+SCRIPT_CLIPBOARD_PASTE: str = ('case "$(am broadcast -a clipper.set -e text {0})" in *result=-1*) input keyevent 279;; '
+                               '*) echo ' + SCRIPT_CLIPBOARD_FAILED + '; exit 0;; esac')
+# characters per 'input text', longer strings start to drop characters on slow devices
+# (see examples/insert_text_benchmark.py to tune it)
+TEXT_CHUNK_SIZE: int = 128
+# characters per broadcast of the 'keyboard' and 'clipboard' strategies
+TEXT_BROADCAST_CHUNK_SIZE: int = 4096
+# bytes of a single shell command, lower it for devices older than android 7
+TEXT_COMMAND_SIZE: int = 32768
+
+# SCRIPT CACHE
+SCRIPT_CACHE_DIRECTORY: str = "/data/local/tmp/py_adb_scripts"
+SCRIPT_CACHE_MISSING: str = "__PYADB_MISSING__"
+# the copy runs only if its content still has the hash in its name, otherwise it is pushed again
+SCRIPT_CACHE_RUN: str = ('if [ "$(sha256sum {0} 2>/dev/null | cut -c1-{3})" = {2} ]; then sh {0} {1}; '
+                         'else echo ' + SCRIPT_CACHE_MISSING + '; fi')
+SCRIPT_CACHE_LIST: str = "ls " + SCRIPT_CACHE_DIRECTORY + " 2>/dev/null; true"
+
+# GESTURE TRACES
+COMMAND_GETEVENT_TIMED: str = "adb -s {0} shell getevent -t {1}"
+GETEVENT_PATTERN = re.compile(r"^\[\s*(\d+)\.(\d+)\]\s+([0-9a-f]{4}) ([0-9a-f]{4}) ([0-9a-f]{8})")
+GESTURE_TRACE_MAGIC: bytes = b"PYGT"
+GESTURE_TRACE_HEADER = struct.Struct("<4sHIII")
+GESTURE_DOWN: int = 0
+GESTURE_MOVE: int = 1
+GESTURE_UP: int = 2
+# milliseconds clock of the replay script: the device shell (mksh) has 32 bit arithmetic, so only the seconds
+# elapsed since b (the last 9 digits of the seconds at the start, which roll over once every ~31 years)
+# are converted to milliseconds, that fits for ~24 days of replay
+# n reads the clock in t (nanoseconds since the epoch, for the statistics) and c (milliseconds since the start),
+# f is the first frame not written yet
+SCRIPT_REPLAY_CLOCK: str = ("n() { t=$(date +%s%N); c=$((10#${t:1:9} - b)); [ $c -lt 0 ] && c=$((c + 1000000000)); "
+                            "c=$((c * 1000 + 10#${t:10:3})); }\nt=$(date +%s%N); b=$((10#${t:1:9})); n; s=$c; f=0")
+# write the frames from f to {4} (excluded) sleeping until the time of the last one, then print the time
+# and the first frame written, the clock is read once per write and sleep runs only when early
+SCRIPT_REPLAY_WRITE: str = ("w=$((s + {0} - c)); [ $w -gt 0 ] && sleep $((w / 1000)).$(printf %03d $((w % 1000))); "
+                            "dd if={1} of={2} bs={3} skip=$f count=$(({4} - f)) 2>/dev/null; n; echo $t $f; f={4}")
+# a frame is written only if the next one is not already late, otherwise it goes with the next write
+SCRIPT_REPLAY_STEP: str = "if [ $((s + {0} - c)) -gt 0 ]; then {1}; fi"
+
 
 # INTENTS
 INTENT_TAKE_PICTURE_INTENT:str ="adb -s {0} shell am start -a android.media.action.IMAGE_CAPTURE --ei android.intent.extras.CAMERA_FACING {1}"
@@ -31,10 +217,22 @@ INTENT_CALLTO: str = "adb -s {0} shell am start -a android.intent.action.CALL -d
 INTENT_SENDTO: str = "adb -s {0} shell am start -a android.intent.action.SENDTO -d sms:'{1}' --es sms_body '{2}'"
 
 
-# queries
-query_product_brand: str = "[ro.product.brand]:"
-query_product_model: str = "[ro.product.model]:"
-query_product_version: str = "[ro.build.version.release]:"
+# phone_data sections cache time in seconds
+PHONE_DATA_TTL: dict = {
+    "battery_data": 30,
+    "device_data": float("inf"),
+    "status": 1,
+    "packages": 60
+}
+
+# properties
+PROPERTY_BRAND: str = "ro.product.brand"
+PROPERTY_MODEL: str = "ro.product.model"
+PROPERTY_VERSION: str = "ro.build.version.release"
+PROPERTY_PATTERN = re.compile(r"^\[([^\]\n]+)\]: \[(.*?)\]\r?$", re.M | re.S)
+COMMAND_GETPROP: str = "adb -s {0} shell getprop {1}"
+# seconds before mutable properties are read again
+PROPERTY_TTL: float = 5
 
 # KEYEVENTS
 KEYEVENT_SCREENSHOT: int = 120
@@ -71,6 +269,20 @@ CMD_START_ADB: str = "adb start-server"
 CMD_KILL_ADB: str = "adb kill-server"
 CMD_LIST_DEVICES: str = "adb devices"
 
+# adb server (host protocol)
+ADB_SERVER_HOST: str = environ.get("ANDROID_ADB_SERVER_ADDRESS", "127.0.0.1")
+ADB_SERVER_PORT: int = int(environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+SHELL_SENTINEL: str = "__PYADB_DONE__"
+SHELL_SENTINEL_PATTERN = re.compile(r"^" + SHELL_SENTINEL + r" (\d+) (\d+)\r?$")
+# shell protocol v2 packets: id (stdout, stderr, exit...) and payload length, then the payload
+SHELL_V2_HEADER = struct.Struct("<BI")
+SHELL_V2_STDOUT: int = 1
+SHELL_V2_STDERR: int = 2
+SHELL_V2_EXIT: int = 3
+# devices without shell v2 print the exit code after the command, framed like the ShellSession sentinel
+SHELL_EXIT_SUFFIX: str = "\nprintf '\\n%s 0 %d\\n' " + SHELL_SENTINEL + " $?"
+ADB_COMMAND_PATTERN = re.compile(r"^\s*adb(?:\s+-s\s+(\S+))?\s+(\S+)\s*(.*)$", re.S)
+
 
 
 
@@ -86,511 +298,3489 @@ def IS_ADB_RUNNING_CMD() -> bool:
 
 
 
-def execute(CMD:str):
-    return check_output(CMD, shell=True).decode("utf8")
-
-def execute_keyevent(CMD_KEYEVENT:str)->bool:
-    return check_output(CMD_KEYEVENT, shell=True).decode("utf8") == ""
+def split_adb_command(CMD:str) -> tuple:
+    """
+split an adb command like 'adb -s <serial> shell input tap 1 2' into (serial, verb, arguments),
+serial is None when '-s' is not provided
+    """
+    match = ADB_COMMAND_PATTERN.match(CMD)
+    if not match:
+        raise RuntimeError(f"not an adb command: '{CMD}'")
+    return match.group(1), match.group(2), match.group(3)
 
-def execute_intent(CMD_INTENT:str) ->bool:
-    res = check_output(CMD_INTENT, shell=True).decode("utf8")
-    
-    if "Starting: Intent" in  res:
-        return True 
-    else:
-        return False
 
+def join_shell_arguments(args:str) -> str:
+    """
+the adb client joins its arguments with spaces after the local shell has parsed them,
+this does the same so the device shell receives the exact same command line
+    """
+    return " ".join(shlex.split(args))
 
-def clear_cmd():
-    match platform:
-        case "win32":
-            system("cls")
-        case "linux" | "darwin":
-            system("clear")
 
+def parse_shell_v2(data: bytes) -> tuple:
+    """
+split the packets of a 'shell,v2' service in (stdout, stderr, exit_code),
+exit_code is None when the stream ended without it (like after a reboot)
+    """
+    out, err = bytearray(), bytearray()
+    exit_code = None
+    view = memoryview(data)
+    offset: int = 0
+    while offset + SHELL_V2_HEADER.size <= len(view):
+        kind, size = SHELL_V2_HEADER.unpack_from(view, offset)
+        offset += SHELL_V2_HEADER.size
+        payload = view[offset:offset + size]
+        offset += size
+        if kind == SHELL_V2_STDOUT:
+            out += payload
+        elif kind == SHELL_V2_STDERR:
+            err += payload
+        elif kind == SHELL_V2_EXIT and size:
+            exit_code = payload[0]
+            break
+    return bytes(out), bytes(err), exit_code
+
+
+def parse_shell_exit(data: bytes) -> tuple:
+    """
+split the output of a command run with SHELL_EXIT_SUFFIX in (output, exit_code),
+exit_code is None when the sentinel is missing
+    """
+    head, _, last = data.rstrip(b"\r\n").rpartition(b"\n")
+    match = SHELL_SENTINEL_PATTERN.match(last.decode("utf8", "replace"))
+    if not match:
+        return data, None
+    # head ends where the newline printed before the sentinel starts (a pty adds a '\r')
+    return head.removesuffix(b"\r"), int(match.group(2))
 
 
-class Py_adb:
+class ProcessStream:
     """
-this is a simple low level ADB connector, you can use it for every task, such as
-debugging, automatism and even fun!
-a list of avaiable function and methods with description
-
-    * ADB_DATA : get some adb data such as version and main ADB executable path
-    * ADB_VERSION : return only the version of ADB
-    * ADB_EXECUTABLE : only return main executable ADB path
-    * is_adb_running : to check if adb is actualy running
-    * list_devices : to check all avaiable devices
-    * display_status : check if display is awake or locked
-    * get_first_avaiable_device : to get a a dict of first avaiable device
-    * phone_data : a rich dict with some of the most important phone data
-    * install_apk : try to insrall install apk on device
-    * uninstall_apk : try to unistall apk by its package name
-    * start_logcat : very interesting feature for debugging app, current device log
-    * screenshot : to take a screenshot
-    * power_button : to lock or unlock the screen
-    * call : to start a call
-    * send_sms : to send a sms to someone
-    * insert_text : to input some text
-    * unlock_screen : to try to unlock the screen, you may provide a password if needed
-    * take_picture : take a photo, you can even provide the zoom_in<int> and zoom_out<int>
-    * video_capture start a video capture, you can even provide the zoom_in<int> and zoom_out<int> and duration<int> to define video duration
-    * swipe : to swipe on the screen 
-    * tap : to tap on the screen giving x and y
-    * turn_off : turn off the device
-    * reboot : reboot device
-    * open_call_log : open the system default call-log app
-    * open_calendar : open the system default calendar app
-    * open_calulator : open the system default calculator app
-    * open_email : open the system default email
-    * open_browser : open the system default browser
-    * open_camera : open the system default camera, specify 'frontal_camera=True' to use frontal camera
-    * home : go to the device home screen
-    * back : go back in the previous screen
-    * foreground_apps : toggle the app in background
-    * notification_center : toggle the notification center
-    * voice_assistant : toggle voice assistant, like saying 'ok google'
-    * volume_up / volume_down : to raise or low the volume, provide 'times' to define how many times repeat the action
-    * brightness_up / brightness_down : to raise or low brightness, provide 'times' to define how many times repeat the action
+binary stream over a running adb client process, returned by SubprocessTransport.open
     """
 
-    def __init__(self) -> None:
-        # if adb shell is not running, raise a RuntimeError exception
-        if not self.is_adb_running():
-            raise RuntimeError(
-                "ADB is not running, please start it with 'adb start-server'")
+    def __init__(self, process: Popen) -> None:
+        self.process = process
 
-        self.ADB_DATA = execute("adb --version")
-        self.ADB_VERSION = self.ADB_DATA.split()[4]
-        self.ADB_EXECUTABLE = self.ADB_DATA.split()[9]
-        self.SUPPORTED_APPS = {
-            "call_log":KEYEVENT_CALL_LOG,
-            "calendar":KEYEVENT_CALENDAR,
-            "music":KEYEVENT_MUSIC,
-            "calculator":KEYEVENT_CALCULATOR,
-            "email":KEYEVENT_EMAIL,
-            "browser":KEYEVENT_BROWSER,
-            "camera":KEYEVENT_CAMERA
-        }
-        self.SUPPORTED_NAVIGATION_ACTIONS = {
-            "home":KEYEVENT_HOME,
-            "back":KEYEVENT_BACK,
-            "foreground":KEYEVENT_FOREGROUND,
-            "notification_center":KEYEVENT_NOTIFICATION_CENTER
-        }
+    def read(self, size: int = -1) -> bytes:
+        return self.process.stdout.read(size)
 
-    # ADB FUNCTIONS
+    def read1(self, size: int = -1) -> bytes:
+        return self.process.stdout.read1(size)
 
-    def is_adb_running(self) -> bool:
-        """
-this function return boolean value True if adb is runnig else it raises
-a RuntimeError exception, to solve this issue just run in CMD 'adb start-server'
-        """
-        try:
-            return IS_ADB_RUNNING_CMD()
-        except CalledProcessError:
-            return False
+    def readinto(self, buffer) -> int:
+        return self.process.stdout.readinto1(buffer)
 
-    def list_devices(self) -> list:
-        """
-this function return a list containing a dict with name and status of each devices
-        """
-        devices: list = []
-        match platform:
-            case "win32":
-                res: list = execute(CMD_LIST_DEVICES).split()
-                tmp: str = res[res.index("attached") + 1:]
-                i: int = 0
-                while i < len(tmp):
-                    devices.append({"id": tmp[i], "status": tmp[i+1]})
-                    i += 2
-            case "linux" | "darwin":
-                res: list = execute(CMD_LIST_DEVICES).split("\n")[1:]
-
-                clean: list = [x for x in res if x]
-                for el in clean:
-                    s: list = el.split("\t")
-                    devices.append({"id": s[0], "status": s[1]})
-        return devices
+    def readline(self) -> bytes:
+        return self.process.stdout.readline()
 
-    def get_first_avaiable_device(self) -> dict:
-        """
-this function just returns a dict of first device avaiable
-        """
-        # use this on every function to check if there is a device else raise exception
-        d: list = self.list_devices()
-        if len(d):
-            return d[0]
-        else:
-            return {}
-     
-    def _basic_device_check(self,device_id:str="") ->None:
-        """
-this is an internal function just to check if some devices are unauthorized, this may cause fatal errors
-        """
-        if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-            device_id = self.get_first_avaiable_device()["id"]
-        
-        if "unauthorized" in execute("adb devices"):
-            print(colored(" > ERROR - some of your devices are tagged with 'unauthorized' status, this may cause problems, please get developer mode in android settings","red"))
+    def write(self, data: bytes) -> None:
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
 
-    # PHONE DATA
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            if pipe:
+                pipe.close()
 
-    def display_status(self, device_id: str = None) -> dict:
-        """
-this function can be called to check if display is awake and unlocked
-        """
-        
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()['id']
+    def __iter__(self):
+        return iter(self.process.stdout.readline, b"")
 
-            screen_data: str = execute(COMMAND_INFO_SCREEN.format(device_id))
+    def __enter__(self):
+        return self
 
-            return {
-                "is_locked": "mDreamingLockscreen=true" in screen_data,
-                "is_awake": "screenState=SCREEN_STATE_ON" in screen_data,
-            }
-        
-    def get_apps(self, device_id=None) ->str:
-        """get a list of all package on your device"""
-        if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-            device_id = self.get_first_avaiable_device()['id']
+    def __exit__(self, *exc) -> None:
+        self.close()
 
-            return self.phone_data(device_id=device_id)["packages"]["list"]
-        
 
-    def phone_data(self, device_id=None) -> dict:
-        """
-this function return the most part of phone data that you could need,
-the parameterdevice_id is optionally, it will take as default the first device avaiable
-if you want to use another device just call
-the 'get_first_avaiable_device[\'id'] function and use theDEVICE_ID to refer to device'
-        """
+class SocketStream:
+    """
+binary stream over a socket connected to an adb service, returned by SocketTransport.open
+    """
 
-        # riase exception if there is no device
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            # if not providedDEVICE_ID take thedevice_id of the first avaiable
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connectedsms")
-                device_id = self.get_first_avaiable_device()['id']
-
-            screen_data: str = execute(
-                COMMAND_INFO_SCREEN.format(device_id))
-            battery_data: list = execute(
-                COMMAND_INFO_BATTERY.format(device_id)).split()
-            general_data: list = execute(
-                COMMAND_INFO_DEVICE.format(device_id)).split()
-            package_list_tmp: list = execute(
-                COMMAND_LIST_PACKAGES.format(device_id)).split("\n")
-
-            package_list: list = []
-            i = 0
-            while i < len(package_list_tmp):
-                if package_list_tmp[i]:
-                    pack = package_list_tmp[i].removesuffix("\r")
-                    pack = pack.split(":")[-1]
-                    package_list.append(pack)
-                i += 1
+    def __init__(self, sock: socket.socket) -> None:
+        self.socket = sock
+        self.reader = sock.makefile("rb")
 
-            model: str = general_data[general_data.index(
-                query_product_model) + 1]
-            version: str = general_data[general_data.index(
-                query_product_version) + 1]
-            brand: str = general_data[general_data.index(
-                query_product_brand) + 1]
-
-            device_data_object = {
-                "model": model.removeprefix("[").removesuffix("]"),
-                "android_version": f"{version.removeprefix('[').removesuffix(']')}",
-                "brand": brand.removeprefix("[").removesuffix("]")
-            }
-
-            battery_object: dict = {
-                "level": battery_data[battery_data.index("level:") + 1],
-                "is_charging": battery_data[battery_data.index("USB")] == "true"
-            }
-
-            phone_status_object: dict = {
-                "is_locked": "mDreamingLockscreen=true" in screen_data,
-                "is_awake": "screenState=SCREEN_STATE_ON" in screen_data,
-            }
-
-            return {
-                "battery_data": battery_object,
-                "device_data": device_data_object,
-                "status": phone_status_object,
-                "packages": {
-                    "list": package_list,
-                    "count": len(package_list)
-                }
-            }
+    def read(self, size: int = -1) -> bytes:
+        return self.reader.read(size)
 
-    # FUNCTIONS
+    def read1(self, size: int = -1) -> bytes:
+        return self.reader.read1(size)
 
-    def install_apk(self, path: str, device_id: str = None) -> bool:
-        """
-this function try to install apk it needs a path to apk
-and optionalyDEVICE_ID, if notDEVICE_ID is provided it will take the first device as default,
-you have to allow the operation from the device
-        """
+    def readinto(self, buffer) -> int:
+        return self.reader.readinto1(buffer)
 
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            # path check
-            real_path: str = realpath(path)
-            if not exists(real_path):
-                raise RuntimeError(f"no such apk file: '{real_path}'")
+    def readline(self) -> bytes:
+        return self.reader.readline()
 
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()['id']
+    def write(self, data: bytes) -> None:
+        self.socket.sendall(data)
 
-            print(" > request sent to device")
-            print(" > confirm installation")
-            return execute_keyevent(COMMAND_INSTALL_APK.format(device_id, path))
+    def close(self) -> None:
+        self.reader.close()
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
 
-    def uninstall_apk(self, package_name: str, device_id=None) -> bool:
-        """
-this function try to uninstall a package by its name, you have to pass into attribute 'path'
-a package name like 'com.package.app' in order to uninstall it, to get a list of
-packages present on this device run 'phone_data()['packages']'
-        """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()['id']
+    def __iter__(self):
+        return iter(self.reader.readline, b"")
 
-            system(COMMAND_UNINSTALL_APK.format(
-                device_id, package_name.removeprefix("package:")))
-            return True
+    def __enter__(self):
+        return self
 
-    def start_logcat(self, term: str = None, device_id: str = None):
-        """
-this function is useful if you need to debug your app in production, you can
-see the entire log of your phone, it may look very messy, so you can pass
-in the attribute 'term' a word that you want to find inside the log,
-so you can create a custom error and isolate it
-        """
+    def __exit__(self, *exc) -> None:
+        self.close()
 
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                device_id = self.get_first_avaiable_device()['id']
 
-            if term:
-                system(COMMAND_LOGCAT.format(device_id) + f" --regex={term}")
-            else:
-                system(COMMAND_LOGCAT.format(device_id))
+class SubprocessTransport:
+    """
+this transport runs every command spawning the adb client, like you would do in a terminal
+    """
 
-    # ACTIONS
+    def run(self, CMD: str) -> bytes:
+        return check_output(CMD, shell=True)
 
-    def screenshot(self, device_id: str = None) -> bool:
-        """
-this command take a screenshot, it will not awake the screen,
-to do it, use the 'power_button' function
-        """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-            return execute_keyevent(BASIC_INPUT_KEYEVENT.format(
-                device_id, KEYEVENT_SCREENSHOT))
+    def open(self, CMD: str) -> ProcessStream:
+        return ProcessStream(Popen(CMD, shell=True, stdin=PIPE, stdout=PIPE, stderr=DEVNULL))
 
-    def power_button(self, device_id: str = None) -> bool:
+    def push(self, serial: str, source, remote_path: str) -> None:
+        """push a local file (path) or bytes in remote_path on the device"""
+        if isinstance(source, str):
+            check_output(["adb", "-s", serial, "push", source, remote_path])
+            return
+        with NamedTemporaryFile(delete=False) as file:
+            file.write(source)
+        try:
+            check_output(["adb", "-s", serial, "push", file.name, remote_path])
+        finally:
+            remove(file.name)
+
+
+class SocketTransport:
+    """
+this transport talks directly with the adb server on port 5037 using its wire protocol,
+so no process is spawned for 'shell', 'exec-out', 'logcat', 'uninstall' and 'devices' commands,
+every other command (like 'install') falls back to the adb client
+    """
+
+    def __init__(self, host: str = ADB_SERVER_HOST, port: int = ADB_SERVER_PORT, timeout: float = None) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.fallback = SubprocessTransport()
+        # features of each device (like 'shell_v2'), asked once to the server
+        self.device_features: dict = {}
+
+    # WIRE PROTOCOL
+
+    def connect(self) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def recv_exactly(sock: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise RuntimeError("adb server closed the connection")
+            data += chunk
+        return bytes(data)
+
+    @staticmethod
+    def recv_all(sock: socket.socket) -> bytes:
+        chunks: list = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def send_request(self, sock: socket.socket, request: str) -> None:
         """
-this command simulate the pressing of power button
+send a length prefixed request and wait for the 'OKAY' status, raise RuntimeError on 'FAIL'
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-            return execute_keyevent(BASIC_INPUT_KEYEVENT.format(
-                device_id, KEYEVENT_POWER_BUTTON))
+        payload = request.encode("utf8")
+        sock.sendall(b"%04x" % len(payload) + payload)
+        status = self.recv_exactly(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message = self.recv_exactly(sock, int(self.recv_exactly(sock, 4), 16))
+            raise RuntimeError(f"adb server error: {message.decode('utf8', 'replace')}")
+        raise RuntimeError(f"unexpected adb server response: {status!r}")
+
+    def read_block(self, sock: socket.socket) -> bytes:
+        """read a length prefixed payload, used by host services"""
+        return self.recv_exactly(sock, int(self.recv_exactly(sock, 4), 16))
+
+    def host_service(self, request: str) -> socket.socket:
+        sock = self.connect()
+        try:
+            self.send_request(sock, request)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
 
-    def call(self, phone_number: str, device_id: str = None) -> bool:
+    def device_service(self, serial: str, service: str) -> socket.socket:
         """
-this function start a call even if the device is locked
+switch the connection to the device identified by serial (or the only one when serial is None)
+and start the given service on it, like 'shell:ls' or 'exec:screencap'
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id: str = self.get_first_avaiable_device()["id"]
-            return execute_intent(INTENT_CALLTO.format(device_id, phone_number))
+        sock = self.connect()
+        try:
+            self.send_request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+            self.send_request(sock, service)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
 
+    # COMMANDS
 
-    def send_sms(self, phone_number: str, message: str, device_id: str = None) -> bool:
+    @staticmethod
+    def to_service(verb: str, args: str) -> str:
         """
-this function send a sms, but the phone need to be locked
+translate an adb client command in the device service the client would open,
+return None if the command is not supported by this transport
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-            execute_intent(INTENT_SENDTO.format(device_id, phone_number, message))
-
-            status: str = self.display_status(device_id)
-            if status["is_locked"] or not status["is_awake"]:
-                print(colored(" > ERROR : the phone need to be unlocked","red"))
-                return False
-            else:
-                for i in range(3):
-                    execute_keyevent(BASIC_INPUT_KEYEVENT.format(
-                        device_id, KEYEVENT_TAB))
-                return True
-
-    def insert_text(self, text: str, device_id: str = None) -> bool:
+        joined = join_shell_arguments(args)
+        match verb:
+            case "shell":
+                return "shell:" + joined
+            case "exec-out":
+                return "exec:" + joined
+            case "logcat":
+                return "shell:export ANDROID_LOG_TAGS=\"\"; exec logcat " + joined
+            case "uninstall":
+                return "shell:pm uninstall " + joined
+            case _:
+                return None
+
+    def features(self, serial: str = None) -> set:
+        if serial not in self.device_features:
+            with self.host_service(f"host-serial:{serial}:features" if serial else "host:features") as sock:
+                self.device_features[serial] = set(self.read_block(sock).decode("utf8").split(","))
+        return self.device_features[serial]
+
+    def run_shell(self, serial: str, command: str, CMD: str) -> bytes:
         """
-this function input a text only if the device is locked
+run a shell command returning its stdout like the adb client, stderr is written on this process stderr
+and CalledProcessError is raised when the command exits with an error
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
+        errors: bytes = b""
+        if "shell_v2" in self.features(serial):
+            with self.device_service(serial, "shell,v2,raw:" + command) as sock:
+                output, errors, exit_code = parse_shell_v2(self.recv_all(sock))
         else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id: str = self.get_first_avaiable_device()["id"]
-            return execute(COMMAND_INSERT_TEXT.format(device_id, text))
+            # shell v1 merges stderr in the output and has no exit code, so it is printed after the command
+            with self.device_service(serial, "shell:" + command + SHELL_EXIT_SUFFIX) as sock:
+                output, exit_code = parse_shell_exit(self.recv_all(sock))
+        if errors:
+            sys.stderr.write(errors.decode("utf8", "replace"))
+        if exit_code:
+            raise CalledProcessError(exit_code, CMD, output, errors)
+        return output
+
+    def run(self, CMD: str) -> bytes:
+        serial, verb, args = split_adb_command(CMD)
+        try:
+            if verb == "devices":
+                with self.host_service("host:devices") as sock:
+                    return b"List of devices attached\n" + self.read_block(sock) + b"\n"
+            service = self.to_service(verb, args)
+            if service is None:
+                return self.fallback.run(CMD)
+            if service.startswith("shell:"):
+                return self.run_shell(serial, service.removeprefix("shell:"), CMD)
+            with self.device_service(serial, service) as sock:
+                return self.recv_all(sock)
+        except ConnectionRefusedError:
+            # no server listening, the adb client will start it
+            return self.fallback.run(CMD)
+
+    def push(self, serial: str, source, remote_path: str, mode: int = 0o644) -> None:
+        """
+push a local file (path) or bytes in remote_path on the device using the sync protocol,
+bytes are sent straight from memory, so the same buffer can be pushed to many devices at once
+        """
+        if isinstance(source, str):
+            with open(source, "rb") as file:
+                source = file.read()
+        data = memoryview(source)
+        try:
+            sock = self.device_service(serial, "sync:")
+        except ConnectionRefusedError:
+            return self.fallback.push(serial, bytes(data), remote_path)
+        with sock:
+            target: bytes = f"{remote_path},{mode}".encode("utf8")
+            sock.sendall(b"SEND" + struct.pack("<I", len(target)) + target)
+            for offset in range(0, len(data), SYNC_CHUNK_SIZE):
+                chunk = data[offset:offset + SYNC_CHUNK_SIZE]
+                sock.sendall(b"DATA" + struct.pack("<I", len(chunk)))
+                sock.sendall(chunk)
+            sock.sendall(b"DONE" + struct.pack("<I", int(time())))
+            status, length = struct.unpack("<4sI", self.recv_exactly(sock, 8))
+            if status != b"OKAY":
+                message = self.recv_exactly(sock, length).decode("utf8", "replace")
+                raise RuntimeError(f"push of '{remote_path}' failed: {message}")
+            sock.sendall(b"QUIT" + struct.pack("<I", 0))
+
+    def open(self, CMD: str):
+        serial, verb, args = split_adb_command(CMD)
+        if verb == "track-devices":
+            try:
+                return SocketStream(self.host_service("host:track-devices"))
+            except ConnectionRefusedError:
+                return self.fallback.open(CMD)
+        service = self.to_service(verb, args)
+        if service is None:
+            return self.fallback.open(CMD)
+        try:
+            return SocketStream(self.device_service(serial, service))
+        except ConnectionRefusedError:
+            return self.fallback.open(CMD)
 
 
-    def unlock_screen(self, password: str = None, device_id: str = None) -> bool:
+class ShellResult(NamedTuple):
+    output: str
+    exit_code: int
+
+
+class ShellSession:
+    """
+a long lived 'adb shell' on a single device, commands are written on its stdin and
+their output is framed with a sentinel line, so every command still gets its own output
+and exit code, commands are pipelined: 'submit' does not wait for the previous one to finish
+    """
+
+    def __init__(self, serial: str = None, transport=None) -> None:
+        self.serial = serial
+        transport = transport or DEFAULT_TRANSPORT
+        self.stream = transport.open(f"adb -s {serial} shell sh" if serial else "adb shell sh")
+        self.pending: deque = deque()
+        self.write_lock = Lock()
+        self.counter = 0
+        self.closed = False
+        # merge stderr, so errors are part of the command output
+        self.stream.write(b"exec 2>&1\n")
+        self.reader = Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def submit(self, command: str) -> Future:
         """
-this function try to unlock the screen, you may provide a password if needed
+send a command without waiting for its result, return a Future resolving to a ShellResult
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id: str = self.get_first_avaiable_device()["id"]
+        future: Future = Future()
+        with self.write_lock:
+            if self.closed:
+                raise RuntimeError("shell session is closed")
+            self.counter += 1
+            self.pending.append((self.counter, future))
+            # the leading newline ends the command output even if it has no trailing newline
+            self.stream.write(f"{command}\nprintf '\\n{SHELL_SENTINEL} %d %d\\n' {self.counter} $?\n".encode("utf8"))
+        return future
+
+    def run(self, command: str, timeout: float = None) -> ShellResult:
+        """send a command and wait for its result"""
+        return self.submit(command).result(timeout)
+
+    def _read_loop(self) -> None:
+        output = bytearray()
+        error = RuntimeError("shell session closed")
+        try:
+            for line in self.stream:
+                match = SHELL_SENTINEL_PATTERN.match(line.decode("utf8", "replace"))
+                if not match:
+                    output += line
+                    continue
+                command_id, future = self.pending.popleft() if self.pending else (None, None)
+                if command_id != int(match.group(1)):
+                    # the framing is lost, so no later output can be trusted: fail and drop the session
+                    error = RuntimeError("shell session out of sync")
+                    if future is not None:
+                        future.set_exception(error)
+                    self.stream.close()
+                    break
+                # drop the newline added before the sentinel
+                text = output.decode("utf8", "replace").replace("\r\n", "\n")
+                future.set_result(ShellResult(text[:-1] if text.endswith("\n") else text, int(match.group(2))))
+                output.clear()
+        except (OSError, ValueError) as e:
+            # the stream broke or was closed while reading
+            error = RuntimeError(f"shell session closed: {e}")
+        finally:
+            self._fail_pending(error)
+
+    def _fail_pending(self, error: Exception) -> None:
+        with self.write_lock:
+            self.closed = True
+            while self.pending:
+                _, future = self.pending.popleft()
+                if not future.done():
+                    future.set_exception(error)
+
+    def close(self) -> None:
+        with self.write_lock:
+            self.closed = True
+        try:
+            self.stream.write(b"exit\n")
+        except OSError:
+            pass
+        self.stream.close()
+        self.reader.join(1)
 
-            status: dict = self.display_status()
+    def __enter__(self):
+        return self
 
-            # if already locked return True
-            if not status["is_locked"]:
-                return True
-            else:
-                # if is in sleep press power button and swipe
-                if not status["is_awake"]:
-                    execute_keyevent(BASIC_INPUT_KEYEVENT.format(
-                        device_id, KEYEVENT_POWER_BUTTON))
-                    sleep(0.5)
+    def __exit__(self, *exc) -> None:
+        self.close()
 
-                self.swipe(from_x=200, from_y=500, to_x=200, to_y=0)
-                sleep(0.5)
 
-                # if password write it
+class ShellSessionTransport:
+    """
+wrap another transport keeping one ShellSession open for each device, every 'adb shell <command>'
+is sent to the device session instead of opening a new shell, other commands go to the wrapped transport
+    """
 
-                if password:
-                    self.insert_text(password)
+    def __init__(self, transport=None) -> None:
+        self.transport = transport or DEFAULT_TRANSPORT
+        self.sessions: dict = {}
+        self.lock = Lock()
+
+    def session(self, serial: str = None) -> ShellSession:
+        with self.lock:
+            session = self.sessions.get(serial)
+            if session is None or session.closed:
+                session = self.sessions[serial] = ShellSession(serial, self.transport)
+            return session
+
+    def run(self, CMD: str) -> bytes:
+        serial, verb, args = split_adb_command(CMD)
+        if verb != "shell" or not args:
+            return self.transport.run(CMD)
+        result: ShellResult = self.session(serial).run(join_shell_arguments(args))
+        if result.exit_code:
+            raise CalledProcessError(result.exit_code, CMD, result.output.encode("utf8"))
+        return result.output.encode("utf8")
+
+    def open(self, CMD: str):
+        return self.transport.open(CMD)
+
+    def push(self, serial: str, source, remote_path: str) -> None:
+        return self.transport.push(serial, source, remote_path)
+
+    def close(self) -> None:
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+def parse_device_list(output: str) -> list:
+    """
+parse the output of 'adb devices' (or a 'track-devices' update) in a list of dict with id and status
+    """
+    devices: list = []
+    for line in output.splitlines():
+        parts: list = line.split()
+        if len(parts) < 2 or line.startswith("List of devices") or line.startswith("*"):
+            continue
+        devices.append({"id": parts[0], "status": parts[1]})
+    return devices
 
-                sleep(0.5)
 
-                # check if unlocked
+class DeviceRegistry:
+    """
+process wide table of connected devices, a background thread follows the adb server
+'track-devices' stream and updates it, so reading it never runs a command,
+if the stream is not available the table is refreshed with 'adb devices'
+    """
 
-                if self.display_status()["is_locked"]:
-                    return False
-                else:
-                    return True
+    _shared: dict = {}
+    _shared_lock = Lock()
+
+    def __init__(self, transport=None, reconnect_delay: float = 1, startup_wait: float = 2, poll_ttl: float = 0.5) -> None:
+        self.transport = transport or DEFAULT_TRANSPORT
+        self.reconnect_delay = reconnect_delay
+        # the first read waits startup_wait for the stream, later reads poll at once (reusing a poll for poll_ttl)
+        self.startup_wait = startup_wait
+        self.poll_ttl = poll_ttl
+        self.waited = False
+        self.polled: float = None
+        self.devices: dict = {}
+        self.snapshot: list = []
+        self.unauthorized: int = 0
+        self.lock = Lock()
+        self.ready = Event()
+        self.thread = None
+
+    @classmethod
+    def shared(cls, transport=None) -> "DeviceRegistry":
+        """return the registry of the adb server used by transport, creating it once per process"""
+        inner = getattr(transport, "transport", transport)
+        key = (type(inner).__name__, getattr(inner, "host", None), getattr(inner, "port", None))
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(transport)
+            return cls._shared[key]
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(target=self._track_loop, daemon=True)
+                self.thread.start()
+
+    def _track_loop(self) -> None:
+        while True:
+            stream = None
+            try:
+                stream = self.transport.open("adb track-devices")
+                while True:
+                    header: bytes = stream.read(4)
+                    if len(header) < 4:
+                        break
+                    payload: bytes = stream.read(int(header, 16)) if int(header, 16) else b""
+                    self.update(parse_device_list(payload.decode("utf8", "replace")))
+            except Exception:
+                pass
+            finally:
+                # the table could be stale until the stream is open again
+                self.ready.clear()
+                if stream:
+                    stream.close()
+            sleep(self.reconnect_delay)
+
+    def _store(self, devices: list) -> None:
+        with self.lock:
+            self.devices = {device["id"]: device["status"] for device in devices}
+            self.snapshot = devices
+            self.unauthorized = sum(1 for device in devices if device["status"] == "unauthorized")
+
+    def update(self, devices: list) -> None:
+        self._store(devices)
+        self.ready.set()
+
+    def _current(self) -> list:
+        self.start()
+        if self.ready.is_set():
+            return self.snapshot
+        with self.lock:
+            wait, self.waited = not self.waited, True
+        if wait and self.ready.wait(self.startup_wait):
+            return self.snapshot
+        # the stream is down: poll, the data is only good for a short time
+        if self.polled is None or monotonic() - self.polled >= self.poll_ttl:
+            self._store(parse_device_list(self.transport.run(CMD_LIST_DEVICES).decode("utf8")))
+            self.polled = monotonic()
+        return self.snapshot
 
-    def take_picture(self,frontal_camera:bool=False,zoom_in:int=0,zoom_out:int=0,device_id:str="")->bool:
-        """
-this function just take photo, serveral arguments ca be provided such as:
-        * frontal_camera : <bool> if True open the frontal camera
-        * zoom_in : <int> if specified it zoom in the camera 'n' times
-        * zoom_in : <int> if specified it zoom out the camera 'n' times
-        """
-        if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-            device_id = self.get_first_avaiable_device()["id"]
-        
-            
-
-        if self.open_camera(device_id=device_id,camera_type=1,frontal_camera=1 if frontal_camera else 0):
-            # zoom in events
-            for el in range(zoom_in):
-                sleep(0.5)
-                execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id, KEYEVENT_ZOOM_IN))
-            # zoom out events
-            for el in range(zoom_out):
-                sleep(0.5)
-                execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id, KEYEVENT_ZOOM_OUT))
-
-            sleep(1)
-            execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_RETURN))
-            sleep(1)
-            return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_RETURN))
-        else:
-            return False
+    def list_devices(self) -> list:
+        return [dict(device) for device in self._current()]
 
+    def first(self) -> dict:
+        snapshot = self._current()
+        return dict(snapshot[0]) if snapshot else {}
 
-    def video_capture(self,frontal_camera:bool=False,zoom_in:int=0,zoom_out:int=0,duration:int=0,device_id:str=""):
-        """
-call this function if you want to capture video, you can provide some data like:
-        * frontal_camera : <bool> if True open the frontal camera
-        * zoom_in : <int> if specified it zoom in the camera 'n' times
-        * zoom_in : <int> if specified it zoom out the camera 'n' times
-        * duration : <int> in seconds of the duration of the video
-        """
+    def status(self, serial: str) -> str:
+        """return the status of a device ('device', 'unauthorized', 'offline'...) or None if not connected"""
+        self._current()
+        return self.devices.get(serial)
+
+    def has_unauthorized(self) -> bool:
+        self._current()
+        return self.unauthorized > 0
+
+
+DEFAULT_TRANSPORT = SubprocessTransport()
+
+
+def execute(CMD:str, transport=None):
+    return (transport or DEFAULT_TRANSPORT).run(CMD).decode("utf8")
+
+def execute_keyevent(CMD_KEYEVENT:str, transport=None)->bool:
+    return execute(CMD_KEYEVENT, transport) == ""
+
+def execute_intent(CMD_INTENT:str, transport=None) ->bool:
+    res = execute(CMD_INTENT, transport)
+    
+    if "Starting: Intent" in  res:
+        return True 
+    else:
+        return False
+
+
+def parse_timestamps(output: str) -> list:
+    """parse the nanoseconds timestamps printed by on-device scripts, one per line"""
+    return [int(line) for line in output.split() if line.isdigit()]
+
+
+def tap_statistics(timestamps: list, requested: list = None, ends: list = None) -> dict:
+    """
+return achieved rate and timing statistics of a tap sequence from the device timestamps (nanoseconds)
+taken just before each tap, interval_ms is the wall time from a tap to the next one, so it includes
+the time the tap itself took: with ends (the timestamps just after each tap) that time is reported
+in dispatch_ms, requested is the list of requested delays (milliseconds) before each tap after the first,
+if provided the error between each delay and the measured one (the interval without the dispatch time) is added
+    """
+    intervals: list = [(b - a) / 1e6 for a, b in zip(timestamps, timestamps[1:])]
+    dispatches: list = [(b - a) / 1e6 for a, b in zip(timestamps, ends or [])]
+    duration: float = (timestamps[-1] - timestamps[0]) / 1e9 if len(timestamps) > 1 else 0
+    stats: dict = {
+        "taps": len(timestamps),
+        "duration": duration,
+        "rate": (len(timestamps) - 1) / duration if duration else 0,
+        "interval_ms": {
+            "mean": mean(intervals) if intervals else 0,
+            "min": min(intervals, default=0),
+            "max": max(intervals, default=0),
+            "jitter": pstdev(intervals) if intervals else 0
+        }
+    }
+    if dispatches:
+        stats["dispatch_ms"] = {
+            "mean": mean(dispatches),
+            "max": max(dispatches)
+        }
+    if requested is not None:
+        delays: list = [interval - dispatch for interval, dispatch in zip(intervals, dispatches)] if dispatches else intervals
+        errors: list = [abs(achieved - wanted) for achieved, wanted in zip(delays, requested)]
+        stats["error_ms"] = {
+            "mean": mean(errors) if errors else 0,
+            "max": max(errors, default=0)
+        }
+    return stats
+
+
+def parse_getevent_info(output: str) -> dict:
+    """
+parse 'getevent -p' in a dict like { "/dev/input/event2": { "name":"fts_ts", "abs":{ 0x35:(0, 1079) }, "keys":{ 0x14a }, "direct":True } }
+    """
+    devices: dict = {}
+    device: dict = None
+    section: str = ""
+    for line in output.splitlines():
+        added = re.match(r"add device \d+: (\S+)", line)
+        if added:
+            device = devices[added.group(1)] = {"name": "", "abs": {}, "keys": set(), "direct": False}
+            continue
+        if device is None:
+            continue
+        name = re.match(r"\s+name:\s+\"(.*)\"", line)
+        if name:
+            device["name"] = name.group(1)
+            continue
+        header = re.match(r"\s+(\w+) \([0-9a-f]{4}\):(.*)", line)
+        if header:
+            section, line = header.group(1), header.group(2)
+        elif not line.startswith("        "):
+            section = ""
+        if "INPUT_PROP_DIRECT" in line:
+            device["direct"] = True
+        if section == "ABS":
+            axis = re.search(r"([0-9a-f]{4})\s+: value -?\d+, min (-?\d+), max (-?\d+)", line)
+            if axis:
+                device["abs"][int(axis.group(1), 16)] = (int(axis.group(2)), int(axis.group(3)))
+        elif section == "KEY":
+            device["keys"].update(int(code, 16) for code in re.findall(r"\b[0-9a-f]{4}\b", line))
+    return devices
+
+
+def octal_escape(data: bytes) -> str:
+    """escape every byte as \\NNN, so binary data can be written on the device with printf"""
+    return "".join("\\%03o" % byte for byte in data)
+
+
+def parse_screen_size(output: str) -> tuple:
+    """parse 'wm size' output, the override size wins over the physical one"""
+    sizes: dict = dict(re.findall(r"(\w+) size: (\d+x\d+)", output))
+    size: str = sizes.get("Override") or sizes.get("Physical")
+    if not size:
+        raise RuntimeError(f"cannot read screen size from '{output.strip()}'")
+    width, height = size.split("x")
+    return int(width), int(height)
+
+
+class ScriptArg(int):
+    """an argument of an ActionScript, written as "$N" in the script"""
+
+    def __str__(self) -> str:
+        return f'"${int(self)}"'
+
+
+class ActionScript:
+    """
+a sequence of actions written as a shell script, register it with 'Py_adb.register_script' to push it once
+on the device and run it with a single command, values can be arguments of the script ('ActionScript.arg'):
+
+    unlock = ActionScript().keyevent(KEYEVENT_POWER_BUTTON).swipe(200, 500, 200, 0).text(ActionScript.arg(1))
+    """
+
+    def __init__(self) -> None:
+        self.lines: list = []
+
+    @staticmethod
+    def arg(index: int) -> ScriptArg:
+        return ScriptArg(index)
+
+    def tap(self, x, y) -> "ActionScript":
+        self.lines.append(f"input tap {x} {y}")
+        return self
+
+    def swipe(self, from_x, from_y, to_x, to_y, duration=None) -> "ActionScript":
+        self.lines.append(f"input swipe {from_x} {from_y} {to_x} {to_y}" + (f" {duration}" if duration is not None else ""))
+        return self
+
+    def keyevent(self, keycode, longpress: bool = False) -> "ActionScript":
+        self.lines.append(f"input keyevent {'--longpress ' if longpress else ''}{keycode}")
+        return self
+
+    def text(self, text) -> "ActionScript":
+        if isinstance(text, ScriptArg):
+            # the value is escaped on the device like input_text_commands does for literals (only the spaces,
+            # so arguments with new lines, tabs or a literal '%s' are not typed as they are)
+            self.lines.append(SCRIPT_INPUT_TEXT_VALUE.format(text))
+        else:
+            self.lines.extend(input_text_commands(text))
+        return self
+
+    def sleep(self, milliseconds) -> "ActionScript":
+        self.lines.append(SCRIPT_SLEEP.format(milliseconds / 1000))
+        return self
+
+    def shell(self, command: str) -> "ActionScript":
+        self.lines.append(command)
+        return self
+
+    @property
+    def source(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+    @property
+    def digest(self) -> str:
+        return sha256(self.source.encode("utf8")).hexdigest()[:16]
+
+    def __repr__(self) -> str:
+        return f"<ActionScript {self.digest} {len(self.lines)} actions>"
+
+
+class ScriptCache:
+    """
+the ActionScripts of a device, pushed in SCRIPT_CACHE_DIRECTORY and named by the hash of their content,
+so a script is pushed once and then run with a short 'sh <hash>.sh args', a copy missing on the device
+(like after a cleanup) or whose content doesn't match its hash (truncated or changed) is pushed again, a script changed on the host gets a new hash and its old copy
+can be removed with 'evict'
+    """
+
+    def __init__(self, adb: "Py_adb", device_id: str) -> None:
+        self.adb = adb
+        self.device_id = device_id
+        self.pushed: set = set()
+        self.lock = Lock()
+
+    def _shell(self, script: str) -> str:
+        return execute(COMMAND_SHELL.format(self.device_id, shlex.quote(script)), self.adb.transport)
+
+    @staticmethod
+    def path(digest: str) -> str:
+        return f"{SCRIPT_CACHE_DIRECTORY}/{digest}.sh"
+
+    def push(self, script: ActionScript) -> None:
+        """push the script and check its content on the device"""
+        source: bytes = script.source.encode("utf8")
+        path: str = self.path(script.digest)
+        self._shell(f"mkdir -p {SCRIPT_CACHE_DIRECTORY}")
+        self.adb.transport.push(self.device_id, source, path)
+        if sha256(source).hexdigest() not in self._shell(f"sha256sum {path} 2>/dev/null; true"):
+            raise RuntimeError(f"script '{path}' was not pushed correctly on device '{self.device_id}'")
+        self.pushed.add(script.digest)
+
+    def run(self, script: ActionScript, args: tuple = ()) -> str:
+        with self.lock:
+            if script.digest not in self.pushed:
+                self.push(script)
+        command: str = SCRIPT_CACHE_RUN.format(self.path(script.digest), " ".join(shlex.quote(str(arg)) for arg in args),
+                                               script.digest, len(script.digest))
+        output: str = self._shell(command)
+        if output.startswith(SCRIPT_CACHE_MISSING):
+            with self.lock:
+                self.pushed.discard(script.digest)
+                self.push(script)
+            output = self._shell(command)
+        return output
+
+    def list(self) -> list:
+        """the hashes of the scripts on the device"""
+        return sorted(name.removesuffix(".sh") for name in self._shell(SCRIPT_CACHE_LIST).split() if name.endswith(".sh"))
+
+    def evict(self, digests: list) -> None:
+        if not digests:
+            return
+        self._shell("rm -f " + " ".join(self.path(digest) for digest in digests))
+        with self.lock:
+            self.pushed.difference_update(digests)
+
+
+class GestureTrace:
+    """
+touches recorded from a device, kept in arrays: times in microseconds from the first sample,
+x and y in screen pixels of a width x height screen and actions (GESTURE_DOWN, GESTURE_MOVE, GESTURE_UP),
+'to_bytes' / 'save' write a compact binary trace (a header and the four arrays), 'load' reads it back
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.times = array("I")
+        self.xs = array("i")
+        self.ys = array("i")
+        self.actions = array("B")
+
+    def append(self, time_us: int, x: int, y: int, action: int) -> None:
+        self.times.append(time_us)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.actions.append(action)
+
+    @property
+    def duration(self) -> float:
+        """seconds from the first to the last sample"""
+        return self.times[-1] / 1e6 if self.times else 0.0
+
+    def scaled(self, width: int, height: int) -> "GestureTrace":
+        """the same trace on a screen of width x height"""
+        trace = GestureTrace(width, height)
+        trace.times = array("I", self.times)
+        trace.xs = array("i", (round(x * (width - 1) / max(self.width - 1, 1)) for x in self.xs))
+        trace.ys = array("i", (round(y * (height - 1) / max(self.height - 1, 1)) for y in self.ys))
+        trace.actions = array("B", self.actions)
+        return trace
+
+    def to_bytes(self) -> bytes:
+        arrays: list = [self.times, self.xs, self.ys, self.actions]
+        if byteorder == "big":
+            arrays = [array(values.typecode, values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+        header: bytes = GESTURE_TRACE_HEADER.pack(GESTURE_TRACE_MAGIC, 1, self.width, self.height, len(self))
+        return header + b"".join(values.tobytes() for values in arrays)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GestureTrace":
+        magic, version, width, height, count = GESTURE_TRACE_HEADER.unpack_from(data)
+        if magic != GESTURE_TRACE_MAGIC:
+            raise RuntimeError("not a gesture trace")
+        trace = cls(width, height)
+        offset: int = GESTURE_TRACE_HEADER.size
+        for values in (trace.times, trace.xs, trace.ys, trace.actions):
+            size: int = count * values.itemsize
+            values.frombytes(data[offset:offset + size])
+            if byteorder == "big":
+                values.byteswap()
+            offset += size
+        return trace
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "GestureTrace":
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __iter__(self):
+        return zip(self.times, self.xs, self.ys, self.actions)
+
+    def __repr__(self) -> str:
+        return f"<GestureTrace {len(self)} samples, {self.duration:.3f}s on {self.width}x{self.height}>"
+
+
+def parse_touch_events(lines, to_screen, width: int, height: int) -> GestureTrace:
+    """
+build a GestureTrace from the lines of 'getevent -t' of a touchscreen, one sample for each report,
+only the first finger (slot 0) is recorded, to_screen converts axis units in screen pixels
+    """
+    trace = GestureTrace(width, height)
+    origin: int = None
+    slot: int = 0
+    axis_x = axis_y = None
+    touching = pressed = released = moved = False
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf8", "replace")
+        event = GETEVENT_PATTERN.match(line)
+        if not event:
+            continue
+        seconds, micros, kind, code, value = event.groups()
+        kind, code, value = int(kind, 16), int(code, 16), int(value, 16)
+        if value >= 1 << 31:
+            value -= 1 << 32
+        if kind == EV_ABS and code == ABS_MT_SLOT:
+            slot = value
+        elif kind == EV_ABS and slot == 0 and code == ABS_MT_TRACKING_ID:
+            released, pressed = value == -1, value != -1 and not touching
+        elif kind == EV_KEY and code == BTN_TOUCH:
+            released, pressed = value == 0, value == 1 and not touching
+        elif kind == EV_ABS and slot == 0 and code == ABS_MT_POSITION_X:
+            axis_x, moved = value, True
+        elif kind == EV_ABS and slot == 0 and code == ABS_MT_POSITION_Y:
+            axis_y, moved = value, True
+        elif kind == EV_SYN and code == SYN_REPORT and axis_x is not None and axis_y is not None:
+            action: int = None
+            if pressed:
+                action, touching = GESTURE_DOWN, True
+            elif released and touching:
+                action, touching = GESTURE_UP, False
+            elif moved and touching:
+                action = GESTURE_MOVE
+            if action is not None:
+                time_us: int = int(seconds) * 1000000 + int(micros.ljust(6, "0")[:6])
+                origin = time_us if origin is None else origin
+                trace.append(time_us - origin, *to_screen(axis_x, axis_y), action)
+            pressed = released = moved = False
+    return trace
+
+
+def replay_statistics(timestamps: list, offsets: list) -> dict:
+    """
+compare the nanoseconds timestamps of the replayed events with their offsets in milliseconds,
+lateness is how late each event was compared to the first one, for a gesture replay the events are
+the writes (late frames are written together) and their offset is the one of their first frame
+    """
+    if not timestamps:
+        return {"events": 0, "duration": 0.0, "lateness_ms": None}
+    lateness: list = [(timestamp - timestamps[0]) / 1e6 - (offset - offsets[0]) for timestamp, offset in zip(timestamps, offsets)]
+    return {
+        "events": len(timestamps),
+        "duration": (timestamps[-1] - timestamps[0]) / 1e9,
+        "lateness_ms": {
+            "mean": mean(lateness),
+            "max": max(lateness),
+            "jitter": pstdev(lateness)
+        }
+    }
+
+
+class SendeventInjector:
+    """
+inject touches writing input_event structs directly in the touchscreen /dev/input/eventN node,
+'input tap' and 'input swipe' start a java process on the device for each gesture, this only runs 'cat'.
+event buffers are precomputed, pushed in INJECT_DIRECTORY (named by their content hash, again only if the device lost them)
+and then written in bulk, one write for each touch frame
+    """
+
+    def __init__(self, serial: str, transport=None) -> None:
+        self.serial = serial
+        self.transport = transport or DEFAULT_TRANSPORT
+        touchscreens: list = [
+            (path, device) for path, device in parse_getevent_info(self._shell("getevent -p")).items()
+            if ABS_MT_POSITION_X in device["abs"] and ABS_MT_POSITION_Y in device["abs"]
+        ]
+        if not touchscreens:
+            raise RuntimeError(f"no touchscreen found on device '{serial}'")
+        # prefer direct input devices (screens) over touchpads
+        touchscreens.sort(key=lambda item: not item[1]["direct"])
+        self.node, self.touchscreen = touchscreens[0]
+        self.width, self.height = parse_screen_size(execute(COMMAND_SCREEN_SIZE.format(serial), self.transport))
+        # struct input_event has a timeval, so its size depends on the userspace ABI
+        abi: str = execute(COMMAND_CPU_ABI.format(serial), self.transport)
+        # little endian without padding like the kernel on arm and x86, whatever the host is
+        self.event_struct = struct.Struct("<qqHHi" if "64" in abi else "<iiHHi")
+        self.uploaded: set = set()
+
+    def _shell(self, script: str) -> str:
+        return execute(COMMAND_SHELL.format(self.serial, shlex.quote(script)), self.transport)
+
+    # EVENT BUFFERS
+
+    def events(self, *events: tuple) -> bytes:
+        """pack (type, code, value) tuples, the kernel sets the timestamps"""
+        return b"".join(self.event_struct.pack(0, 0, *event) for event in events)
+
+    def to_axis(self, x: float, y: float) -> tuple:
+        """convert screen pixels in touchscreen axis units"""
+        x_min, x_max = self.touchscreen["abs"][ABS_MT_POSITION_X]
+        y_min, y_max = self.touchscreen["abs"][ABS_MT_POSITION_Y]
+        return (
+            round(x_min + x * (x_max - x_min) / max(self.width - 1, 1)),
+            round(y_min + y * (y_max - y_min) / max(self.height - 1, 1))
+        )
+
+    def touch_down(self, x: float, y: float) -> bytes:
+        axis_x, axis_y = self.to_axis(x, y)
+        events: list = []
+        if ABS_MT_SLOT in self.touchscreen["abs"]:
+            events.append((EV_ABS, ABS_MT_SLOT, 0))
+        # one finger at a time, the tracking id can be reused after the release
+        events.append((EV_ABS, ABS_MT_TRACKING_ID, 1))
+        if BTN_TOUCH in self.touchscreen["keys"]:
+            events.append((EV_KEY, BTN_TOUCH, 1))
+        events += [(EV_ABS, ABS_MT_POSITION_X, axis_x), (EV_ABS, ABS_MT_POSITION_Y, axis_y)]
+        for code in (ABS_MT_TOUCH_MAJOR, ABS_MT_PRESSURE):
+            if code in self.touchscreen["abs"]:
+                low, high = self.touchscreen["abs"][code]
+                events.append((EV_ABS, code, max(low, min(high, (low + high) // 2 or 1))))
+        events.append((EV_SYN, SYN_REPORT, 0))
+        return self.events(*events)
+
+    def touch_move(self, x: float, y: float) -> bytes:
+        axis_x, axis_y = self.to_axis(x, y)
+        return self.events((EV_ABS, ABS_MT_POSITION_X, axis_x), (EV_ABS, ABS_MT_POSITION_Y, axis_y), (EV_SYN, SYN_REPORT, 0))
+
+    def touch_up(self) -> bytes:
+        events: list = [(EV_ABS, ABS_MT_TRACKING_ID, -1)]
+        if BTN_TOUCH in self.touchscreen["keys"]:
+            events.append((EV_KEY, BTN_TOUCH, 0))
+        events.append((EV_SYN, SYN_REPORT, 0))
+        return self.events(*events)
+
+    def to_screen(self, axis_x: int, axis_y: int) -> tuple:
+        """convert touchscreen axis units in screen pixels"""
+        x_min, x_max = self.touchscreen["abs"][ABS_MT_POSITION_X]
+        y_min, y_max = self.touchscreen["abs"][ABS_MT_POSITION_Y]
+        return (
+            round((axis_x - x_min) * (self.width - 1) / max(x_max - x_min, 1)),
+            round((axis_y - y_min) * (self.height - 1) / max(y_max - y_min, 1))
+        )
+
+    # DEVICE SIDE
+
+    @staticmethod
+    def buffer_path(buffer: bytes) -> str:
+        return f"{INJECT_DIRECTORY}/{sha1(buffer).hexdigest()[:16]}.bin"
+
+    def checked(self, paths: list, command: str, upload) -> str:
+        """
+run command after checking that paths are still on the device, if some are gone
+they are forgotten, uploaded again and the command runs once more
+        """
+        script: str = SCRIPT_INJECT_CHECK.format(" ".join(dict.fromkeys(paths))) + "\n" + command
+        output: str = self._shell(script)
+        if output.startswith(INJECT_MISSING):
+            self.uploaded.difference_update(paths)
+            upload()
+            output = self._shell(script)
+        return output
+
+    def upload(self, buffers: list) -> list:
+        """
+make sure every buffer is on the device, missing ones are pushed with a single command,
+return the list of commands writing each buffer in the touchscreen node
+        """
+        commands: list = []
+        missing: dict = {}
+        for buffer in buffers:
+            path: str = self.buffer_path(buffer)
+            if path not in self.uploaded:
+                missing[path] = buffer
+            commands.append(f"cat {path} > {self.node}")
+        if missing:
+            pushes: list = [f"mkdir -p {INJECT_DIRECTORY}"]
+            pushes += [f"printf '{octal_escape(buffer)}' > {path}" for path, buffer in missing.items()]
+            self._shell("\n".join(pushes))
+            self.uploaded.update(missing)
+        return commands
+
+    def run(self, steps: list) -> str:
+        """
+steps is a list of event buffers (bytes) and delays in milliseconds (int/float),
+everything runs as a single on-device script
+        """
+        buffers: list = [step for step in steps if isinstance(step, bytes)]
+        writes = iter(self.upload(buffers))
+        script: list = []
+        for step in steps:
+            if isinstance(step, bytes):
+                script.append(next(writes))
+            elif step == "timestamp":
+                script.append(SHELL_TIMESTAMP)
+            elif step > 0:
+                script.append(SCRIPT_SLEEP.format(step / 1000))
+        return self.checked([self.buffer_path(buffer) for buffer in buffers], "\n".join(script), lambda: self.upload(buffers))
+
+    # GESTURES
+
+    def tap(self, x: float, y: float) -> bool:
+        return self.run([self.touch_down(x, y), self.touch_up()]) == ""
+
+    def swipe(self, from_x: float, from_y: float, to_x: float, to_y: float, duration: int = 300, steps: int = 20) -> bool:
+        frames: list = [self.touch_down(from_x, from_y)]
+        for step in range(1, steps + 1):
+            frames += [duration / steps, self.touch_move(from_x + (to_x - from_x) * step / steps, from_y + (to_y - from_y) * step / steps)]
+        frames.append(self.touch_up())
+        return self.run(frames) == ""
+
+    def record(self, duration: float = None) -> GestureTrace:
+        """
+record the touches on the touchscreen for duration seconds (until CTRL+C if not provided)
+        """
+        stream = self.transport.open(COMMAND_GETEVENT_TIMED.format(self.serial, self.node))
+        timer = Timer(duration, stream.close) if duration else None
+        lines: list = []
+        try:
+            if timer:
+                timer.start()
+            for line in stream:
+                lines.append(line)
+        except (KeyboardInterrupt, OSError, ValueError):
+            pass
+        finally:
+            if timer:
+                timer.cancel()
+            stream.close()
+        return parse_touch_events(lines, self.to_screen, self.width, self.height)
+
+    def replay(self, trace: GestureTrace, scale: bool = True) -> dict:
+        """
+replay a GestureTrace with its original timing, the touch frames and the script are pushed once
+and run on the device, which sleeps until the time of each frame (so delays don't add up), frames
+already late (like dense moves, closer than the cost of a write) are written together with one 'dd',
+with scale the trace is adapted to the screen size of this device, return the timing statistics
+        """
+        if scale and (trace.width, trace.height) != (self.width, self.height):
+            trace = trace.scaled(self.width, self.height)
+        frames: list = []
+        for _, x, y, action in trace:
+            if action == GESTURE_DOWN:
+                frames.append(self.touch_down(x, y))
+            elif action == GESTURE_MOVE:
+                frames.append(self.touch_move(x, y))
+            else:
+                frames.append(self.touch_up())
+        # frames are padded with empty reports (dropped by the kernel) to read them with a fixed block size
+        size: int = max(len(frame) for frame in frames) if frames else 0
+        padding: bytes = self.events((EV_SYN, SYN_REPORT, 0))
+        blob: bytes = b"".join(frame + padding * ((size - len(frame)) // len(padding)) for frame in frames)
+        blob_path: str = self.buffer_path(blob)
+        offsets: list = [time_us // 1000 for time_us in trace.times]
+        steps: list = [SCRIPT_REPLAY_WRITE.format(offset, blob_path, self.node, size, index + 1) for index, offset in enumerate(offsets)]
+        # late frames are coalesced on the device: a step is skipped when the next frame is already due
+        script: str = "\n".join([SCRIPT_REPLAY_CLOCK] + [
+            SCRIPT_REPLAY_STEP.format(offsets[index + 1], step) for index, step in enumerate(steps[:-1])
+        ] + steps[-1:])
+        script_path: str = f"{INJECT_DIRECTORY}/{sha1(script.encode()).hexdigest()[:16]}.sh"
+
+        def upload() -> None:
+            missing: dict = {path: data for path, data in ((blob_path, blob), (script_path, script.encode())) if path not in self.uploaded}
+            if missing:
+                self._shell(f"mkdir -p {INJECT_DIRECTORY}")
+                for path, data in missing.items():
+                    self.transport.push(self.serial, data, path)
+                self.uploaded.update(missing)
+
+        upload()
+        # every write prints its time and its first frame, which is compared with the time of that frame
+        output: str = self.checked([blob_path, script_path], f"sh {script_path}", upload)
+        writes: list = [line.split() for line in output.splitlines() if len(line.split()) == 2]
+        statistics: dict = replay_statistics([int(stamp) for stamp, _ in writes], [offsets[int(index)] for _, index in writes])
+        statistics["frames"] = len(offsets)
+        return statistics
+
+    def precision_tap(self, instructions: list) -> dict:
+        steps: list = []
+        for instruction in instructions:
+            steps += [instruction["milliseconds"], "timestamp", self.touch_down(instruction["x"], instruction["y"]), self.touch_up(), "timestamp"]
+        timestamps: list = parse_timestamps(self.run(steps))
+        return tap_statistics(timestamps[0::2], [x["milliseconds"] for x in instructions[1:]], timestamps[1::2])
+
+
+def key_sequence_script(keys: list, delay_ms: float = 0, longpress: bool = False) -> str:
+    """
+the shell command pressing keys (keycodes or names like 'KEYCODE_HOME') in order, without delay they are
+all sent by a single 'input keyevent', otherwise the delays run on the device between the keys
+    """
+    keys = [str(key) for key in keys]
+    for key in keys:
+        if not KEY_PATTERN.match(key):
+            raise RuntimeError(f"'{key}' is not a keycode")
+    flag: str = "--longpress " if longpress else ""
+    if not delay_ms:
+        return SCRIPT_KEYEVENT.format(flag, " ".join(keys))
+    return f"; {SCRIPT_SLEEP.format(delay_ms / 1000)}; ".join(SCRIPT_KEYEVENT.format(flag, key) for key in keys)
+
+
+def split_text(text: str, size: int) -> list:
+    """split text in pieces of at most size characters"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def batch_commands(commands: list, size: int = TEXT_COMMAND_SIZE) -> list:
+    """join shell commands with ';' in scripts of about size bytes, so they run with few round trips"""
+    scripts: list = []
+    batch: list = []
+    length: int = 0
+    for command in commands:
+        if batch and length + len(command) + 2 > size:
+            scripts.append("; ".join(batch))
+            batch, length = [], 0
+        batch.append(command)
+        length += len(command) + 2
+    if batch:
+        scripts.append("; ".join(batch))
+    return scripts
+
+
+def input_text_commands(text: str, chunk_size: int = TEXT_CHUNK_SIZE) -> list:
+    """
+the device shell commands typing text with 'input text', which handles only ascii: spaces become '%s',
+a literal '%s' is sent in two pieces (so it isn't read as a space), new lines and tabs are sent as keyevents
+    """
+    if not text.isascii():
+        raise RuntimeError("'input text' supports only ascii, use the 'keyboard' or 'clipboard' strategy")
+    commands: list = []
+    for piece in re.split(r"(\n|\t)", text):
+        if piece in ("\n", "\t"):
+            commands.append(SCRIPT_KEYEVENT.format("", KEYEVENT_RETURN if piece == "\n" else KEYEVENT_TAB))
+            continue
+        # split '%s' between '%' and 's'
+        for part in re.split(r"(?<=%)(?=s)", piece):
+            for chunk in split_text(part, chunk_size):
+                commands.append(SCRIPT_INPUT_TEXT.format(shlex.quote(chunk.replace(" ", "%s"))))
+    return commands
+
+
+def keyboard_text_commands(text: str, chunk_size: int = TEXT_BROADCAST_CHUNK_SIZE) -> list:
+    """the device shell commands sending text to the ADBKeyBoard IME, base64 encoded so any character is fine"""
+    return [SCRIPT_KEYBOARD_TEXT.format(b64encode(chunk.encode()).decode()) for chunk in split_text(text, chunk_size)]
+
+
+def clipboard_text_commands(text: str, chunk_size: int = TEXT_BROADCAST_CHUNK_SIZE) -> list:
+    """
+the device shell commands setting the clipboard with Clipper and pasting it, chunk by chunk,
+they stop at the first broadcast Clipper doesn't confirm
+    """
+    return [SCRIPT_CLIPBOARD_PASTE.format(shlex.quote(chunk)) for chunk in split_text(text, chunk_size)]
+
+
+def parse_text_strategies(output: str) -> list:
+    """the text strategies available from the output of SCRIPT_TEXT_STRATEGIES, fastest first"""
+    lines: list = output.splitlines()
+    available: list = []
+    if lines and lines[0].strip() == ADB_KEYBOARD_IME:
+        available.append("keyboard")
+    if "package:" in output:
+        available.append("clipboard")
+    available.append("input")
+    return available
+
+
+def choose_text_strategy(text: str, strategy: str, available: list) -> str:
+    """
+the strategy for text: with 'auto' the ADBKeyBoard IME if enabled, else 'input text' for ascii text,
+else the clipboard (so it's replaced only when nothing else can type the text)
+    """
+    if strategy == "auto":
+        if "keyboard" in available:
+            return "keyboard"
+        if "clipboard" in available and not text.isascii():
+            return "clipboard"
+        return "input"
+    if strategy not in TEXT_STRATEGIES:
+        raise RuntimeError(f"text strategy '{strategy}' not supported, choose one of {', '.join(TEXT_STRATEGIES)}")
+    if strategy not in available:
+        raise RuntimeError(f"text strategy '{strategy}' is not available on this device")
+    return strategy
+
+
+def text_scripts(text: str, strategy: str, chunk_size: int = None) -> list:
+    """the device scripts typing text with strategy ('keyboard', 'clipboard' or 'input'), one per round trip"""
+    if strategy == "keyboard":
+        commands: list = keyboard_text_commands(text, chunk_size or TEXT_BROADCAST_CHUNK_SIZE)
+    elif strategy == "clipboard":
+        commands = clipboard_text_commands(text, chunk_size or TEXT_BROADCAST_CHUNK_SIZE)
+    else:
+        commands = input_text_commands(text, chunk_size or TEXT_CHUNK_SIZE)
+    return batch_commands(commands)
+
+
+class WaitResult(NamedTuple):
+    ok: bool
+    # seconds waited
+    waited: float
+    attempts: int
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+class WaitStep(NamedTuple):
+    name: str
+    device_id: str
+    ok: bool
+    waited: float
+    timeout: float
+
+
+def wait_until(predicate, timeout: float = WAIT_TIMEOUT, interval: float = WAIT_INTERVAL, backoff: float = WAIT_BACKOFF,
+               max_interval: float = WAIT_MAX_INTERVAL) -> WaitResult:
+    """
+call predicate until it returns True or timeout expires, the first call is immediate and the pause between
+calls starts from interval and grows by backoff up to max_interval, return a WaitResult (truthy if it succeeded)
+    """
+    start: float = monotonic()
+    attempts: int = 0
+    while True:
+        attempts += 1
+        if predicate():
+            return WaitResult(True, monotonic() - start, attempts)
+        remaining: float = timeout - (monotonic() - start)
+        if remaining <= 0:
+            return WaitResult(False, monotonic() - start, attempts)
+        sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+async def async_wait_until(predicate, timeout: float = WAIT_TIMEOUT, interval: float = WAIT_INTERVAL, backoff: float = WAIT_BACKOFF,
+                           max_interval: float = WAIT_MAX_INTERVAL) -> WaitResult:
+    """wait_until for a coroutine predicate"""
+    start: float = monotonic()
+    attempts: int = 0
+    while True:
+        attempts += 1
+        if await predicate():
+            return WaitResult(True, monotonic() - start, attempts)
+        remaining: float = timeout - (monotonic() - start)
+        if remaining <= 0:
+            return WaitResult(False, monotonic() - start, attempts)
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+def wait_timings(steps) -> dict:
+    """group WaitStep by name with the count, the timeouts and the mean and max time waited in milliseconds"""
+    groups: dict = {}
+    for step in steps:
+        groups.setdefault(step.name, []).append(step)
+    return {
+        name: {
+            "count": len(group),
+            "timeouts": sum(not step.ok for step in group),
+            "mean_ms": mean(step.waited for step in group) * 1000,
+            "max_ms": max(step.waited for step in group) * 1000
+        } for name, group in groups.items()
+    }
+
+
+def parse_focused_window(output: str) -> str:
+    """the component of the focused window ('com.android.camera/.Camera') from 'dumpsys window', "" if none"""
+    match = FOCUSED_WINDOW_PATTERN.search(output)
+    return match.group(1) if match else ""
+
+
+def window_package(window: str) -> str:
+    """the package of a focused window component"""
+    return window.split("/")[0]
+
+
+def parse_resumed_activity(output: str) -> str:
+    match = RESUMED_ACTIVITY_PATTERN.search(output)
+    return match.group(1) if match else ""
+
+
+def full_component(component: str) -> str:
+    """expand the short form of a component, 'com.android.chrome/.Main' is 'com.android.chrome/com.android.chrome.Main'"""
+    package, _, name = component.partition("/")
+    return f"{package}/{package}{name}" if name.startswith(".") else component
+
+
+def is_same_activity(activity: str, expected: str) -> bool:
+    """expected can be a package ('com.android.chrome') or a component ('com.android.chrome/.Main')"""
+    if "/" not in expected:
+        return activity.split("/")[0] == expected
+    return full_component(activity) == full_component(expected)
+
+
+def parse_display_status(screen_data: str) -> dict:
+    """
+parse 'dumpsys window' (or the output of SCRIPT_DISPLAY_STATUS) in a dict with is_locked and is_awake,
+when the window policy doesn't report the screen state the power manager wakefulness is used
+    """
+    if "screenState=" in screen_data:
+        is_awake: bool = "screenState=SCREEN_STATE_ON" in screen_data
+    else:
+        is_awake = "mWakefulness=Awake" in screen_data
+    return {
+        "is_locked": "mDreamingLockscreen=true" in screen_data,
+        "is_awake": is_awake,
+    }
+
+
+class StateWatcher:
+    """
+keep the display state (is_locked, is_awake) of a device up to date, returned by 'Py_adb.watch':
+a single loop runs on the device checking the state every interval seconds and sends a line only when
+it changes, so the host always has the latest state in memory without querying the device,
+wait for a transition with 'wait_for' (or 'wait_for_async' from asyncio code), or get every change
+with 'subscribe', call 'close' (or use 'with') to stop it
+    """
+
+    def __init__(self, adb: "Py_adb", device_id: str, interval: float = STATE_WATCH_INTERVAL) -> None:
+        self.device_id = device_id
+        self.interval = interval
+        self.state: dict = None
+        self.changed_at: float = None
+        self.changes: int = 0
+        self.callbacks: list = []
+        # asyncio waiters: (loop, future, predicate, expected)
+        self.waiters: list = []
+        self.closed: bool = False
+        self.condition = Condition()
+        script: str = SCRIPT_STATE_WATCH.format(SCRIPT_DISPLAY_STATUS, interval)
+        self.stream = adb.transport.open(COMMAND_SHELL.format(device_id, shlex.quote(script)))
+        self.reader = Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    @property
+    def alive(self) -> bool:
+        return not self.closed
+
+    @staticmethod
+    def _matches(state: dict, predicate, expected: dict) -> bool:
+        return (state is not None
+                and all(state[key] == value for key, value in expected.items())
+                and (predicate is None or predicate(state)))
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: bool) -> None:
+        if not future.done():
+            future.set_result(result)
+
+    def _read_loop(self) -> None:
+        try:
+            for line in self.stream:
+                self._update(parse_display_status(line.decode("utf8", "replace")))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+                for loop, future, _, _ in self.waiters:
+                    loop.call_soon_threadsafe(self._resolve, future, False)
+                self.waiters = []
+
+    def _update(self, state: dict) -> None:
+        with self.condition:
+            self.state = state
+            self.changed_at = monotonic()
+            self.changes += 1
+            self.condition.notify_all()
+            waiting: list = []
+            for waiter in self.waiters:
+                loop, future, predicate, expected = waiter
+                if self._matches(state, predicate, expected):
+                    loop.call_soon_threadsafe(self._resolve, future, True)
+                else:
+                    waiting.append(waiter)
+            self.waiters = waiting
+            callbacks: list = list(self.callbacks)
+        for callback in callbacks:
+            # a failing callback must not stop the watcher thread
+            try:
+                callback(dict(state))
+            except Exception as e:
+                print(colored(f" > ERROR : state watcher callback {getattr(callback, '__name__', callback)} failed: {e!r}", "red"))
+
+    def current(self, timeout: float = WAIT_TIMEOUT) -> dict:
+        """the latest state, waiting for the first one, None if the watcher stopped before"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.state is not None or self.closed, timeout)
+            return dict(self.state) if self.state is not None else None
+
+    def subscribe(self, callback) -> None:
+        """call callback(state) from the watcher thread on every change, its exceptions are printed and ignored"""
+        with self.condition:
+            self.callbacks.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        with self.condition:
+            self.callbacks.remove(callback)
+
+    def wait_for(self, predicate=None, timeout: float = WAIT_TIMEOUT, **expected) -> bool:
+        """
+block until the state has the expected values (like is_awake=True) and predicate(state) is True,
+return False if it doesn't happen in timeout seconds or the watcher stops
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self._matches(self.state, predicate, expected) or self.closed, timeout
+            ) and self._matches(self.state, predicate, expected)
+
+    async def wait_for_async(self, predicate=None, timeout: float = WAIT_TIMEOUT, **expected) -> bool:
+        """wait_for for asyncio code, the event loop is not blocked"""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        waiter: tuple = (loop, future, predicate, expected)
+        with self.condition:
+            if self._matches(self.state, predicate, expected):
+                return True
+            if self.closed:
+                return False
+            self.waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.condition:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+        self.stream.close()
+        self.reader.join(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<StateWatcher {self.device_id} {self.state} {'running' if self.alive else 'stopped'}>"
+
+
+def parse_battery(battery_output: str) -> dict:
+    """parse 'dumpsys battery' in a dict with level and is_charging"""
+    battery_data: list = battery_output.split()
+    return {
+        "level": battery_data[battery_data.index("level:") + 1],
+        "is_charging": bool(re.search(r"(AC|USB|Wireless) powered: true", battery_output))
+    }
+
+
+def parse_properties(output: str) -> dict:
+    """parse 'getprop' output in a dict, values can contain spaces"""
+    return {match.group(1): match.group(2) for match in PROPERTY_PATTERN.finditer(output)}
+
+
+def parse_device_data(properties) -> dict:
+    """build the device_data dict from the 'getprop' output or the parsed properties"""
+    if isinstance(properties, str):
+        properties = parse_properties(properties)
+    return {
+        "model": properties.get(PROPERTY_MODEL),
+        "android_version": properties.get(PROPERTY_VERSION),
+        "brand": properties.get(PROPERTY_BRAND)
+    }
+
+
+def parse_packages(packages_output: str) -> dict:
+    """parse 'pm list packages' in a dict with list and count"""
+    package_list: list = []
+    for line in packages_output.split("\n"):
+        if line:
+            package_list.append(line.removesuffix("\r").split(":")[-1])
+    return {
+        "list": package_list,
+        "count": len(package_list)
+    }
+
+
+def parse_phone_data(screen_data: str, battery_output: str, device_output: str, packages_output: str) -> dict:
+    """
+build the phone_data dict from the output of 'dumpsys window', 'dumpsys battery', 'getprop' and 'pm list packages'
+    """
+    return {
+        "battery_data": parse_battery(battery_output),
+        "device_data": parse_device_data(device_output),
+        "status": parse_display_status(screen_data),
+        "packages": parse_packages(packages_output)
+    }
+
+
+class PropertyStore(Mapping):
+    """
+the properties of a device, 'getprop' is run and parsed once, then every property is a dict lookup,
+'ro.*' properties can't change so they are kept for the whole session, the others are read again
+after ttl seconds, get(key, fresh=True) reads a single property with 'getprop <key>'
+    """
+
+    def __init__(self, adb: "Py_adb", device_id: str, ttl: float = PROPERTY_TTL) -> None:
+        self.adb = adb
+        self.device_id = device_id
+        self.ttl = ttl
+        self.static: dict = {}
+        self.dynamic: dict = {}
+        self.loaded_at: float = None
+        self.lock = Lock()
+
+    def load(self) -> "PropertyStore":
+        """run 'getprop' and parse every property"""
+        properties: dict = parse_properties(execute(COMMAND_INFO_DEVICE.format(self.device_id), self.adb.transport))
+        with self.lock:
+            self.static = {key: value for key, value in properties.items() if key.startswith("ro.")}
+            self.dynamic = {key: value for key, value in properties.items() if not key.startswith("ro.")}
+            self.loaded_at = monotonic()
+        return self
+
+    def _current(self) -> None:
+        if self.loaded_at is None or monotonic() - self.loaded_at >= self.ttl:
+            self.load()
+
+    def get(self, key: str, default=None, fresh: bool = False):
+        if key.startswith("ro.") and self.loaded_at is not None:
+            return self.static.get(key, default)
+        if fresh:
+            value: str = execute(COMMAND_GETPROP.format(self.device_id, shlex.quote(key)), self.adb.transport).strip()
+            with self.lock:
+                (self.static if key.startswith("ro.") else self.dynamic)[key] = value
+            return value if value else default
+        self._current()
+        return self.static.get(key, self.dynamic.get(key, default))
+
+    def __getitem__(self, key: str) -> str:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        self._current()
+        return iter({**self.static, **self.dynamic})
+
+    def __len__(self) -> int:
+        self._current()
+        return len(self.static) + len(self.dynamic)
+
+    def refresh(self) -> "PropertyStore":
+        """read every property again, 'ro.*' included"""
+        return self.load()
+
+    def __repr__(self) -> str:
+        return f"<PropertyStore {self.device_id} {len(self.static)} static, {len(self.dynamic)} dynamic>"
+
+
+class PackageInfo(NamedTuple):
+    name: str
+    version_code: int
+    uid: int
+
+
+def parse_package_list(output: str) -> dict:
+    """parse 'pm list packages --show-versioncode -U' in a dict of PackageInfo by package name"""
+    return {
+        match.group(1): PackageInfo(match.group(1), int(match.group(2) or 0), int(match.group(3) or 0))
+        for match in PACKAGE_PATTERN.finditer(output)
+    }
+
+
+def parse_package_changes(output: str) -> tuple:
+    """
+parse 'dumpsys package changes' in (sequence number, {package: last change sequence}),
+sequence number is None if the device doesn't report it
+    """
+    sequence = re.search(r"Sequence number=(\d+)", output)
+    changes: dict = {}
+    for seq, package in re.findall(r"seq=(\d+), package=(\S+)", output):
+        changes[package] = max(int(seq), changes.get(package, 0))
+    return (int(sequence.group(1)) if sequence else None), changes
+
+
+class PackageIndex:
+    """
+the installed packages of a device (name, versionCode, uid) in a set and a sorted list for prefix
+queries, the index is built once, then it is updated using the package manager change counter
+('dumpsys package changes'): only the packages changed since the last sync are read again,
+lookups don't touch the device for max_age seconds after a sync, and after that only to read the
+counter, 'changes' tells what was added, removed or updated by the last sync
+    """
+
+    def __init__(self, adb: "Py_adb", device_id: str, max_age: float = PACKAGE_INDEX_MAX_AGE) -> None:
+        self.adb = adb
+        self.device_id = device_id
+        self.max_age = max_age
+        self.packages: dict = {}
+        self.names: list = []
+        self.sequence: int = None
+        self.synced_at: float = None
+        self.changes: dict = {"added": set(), "removed": set(), "updated": set()}
+        self.lock = Lock()
+
+    def _shell(self, script: str) -> str:
+        return execute(COMMAND_SHELL.format(self.device_id, shlex.quote(script)), self.adb.transport)
+
+    def rebuild(self) -> None:
+        """read every package from the device"""
+        sequence, _ = parse_package_changes(execute(COMMAND_PACKAGE_CHANGES.format(self.device_id), self.adb.transport))
+        packages: dict = parse_package_list(self._shell(SCRIPT_LIST_PACKAGES_DETAILED.format("")))
+        old: dict = self.packages
+        self.changes = {
+            "added": set(packages) - set(old),
+            "removed": set(old) - set(packages),
+            "updated": {name for name in set(packages) & set(old) if packages[name] != old[name]}
+        }
+        self.packages = packages
+        self.names = sorted(packages)
+        self.sequence = sequence
+        self.synced_at = monotonic()
+
+    def sync(self) -> dict:
+        """
+update the index with the packages changed since the last sync, return the changes
+        """
+        with self.lock:
+            if self.synced_at is None:
+                self.rebuild()
+                return self.changes
+            sequence, changed = parse_package_changes(execute(COMMAND_PACKAGE_CHANGES.format(self.device_id), self.adb.transport))
+            self.synced_at = monotonic()
+            if sequence is not None and sequence == self.sequence:
+                self.changes = {"added": set(), "removed": set(), "updated": set()}
+                return self.changes
+            # without counter or after a reboot (the counter restarts) read everything again
+            if sequence is None or self.sequence is None or sequence < self.sequence:
+                self.rebuild()
+                return self.changes
+
+            # the counter is the next sequence to assign, so changes after the last sync have seq >= it
+            names: list = sorted(name for name, seq in changed.items() if seq >= self.sequence)
+            current: dict = {}
+            if names:
+                output: str = self._shell("; ".join(SCRIPT_LIST_PACKAGES_DETAILED.format(shlex.quote(name)) for name in names))
+                current = {name: info for name, info in parse_package_list(output).items() if name in changed}
+            changes: dict = {"added": set(), "removed": set(), "updated": set()}
+            for name in names:
+                if name in current and name not in self.packages:
+                    insort(self.names, name)
+                    changes["added"].add(name)
+                elif name not in current and name in self.packages:
+                    del self.names[bisect_left(self.names, name)]
+                    del self.packages[name]
+                    changes["removed"].add(name)
+                    continue
+                elif name in current and current[name] != self.packages[name]:
+                    changes["updated"].add(name)
+                if name in current:
+                    self.packages[name] = current[name]
+            self.sequence = sequence
+            self.changes = changes
+            return changes
+
+    def _current(self) -> None:
+        if self.synced_at is None or monotonic() - self.synced_at >= self.max_age:
+            self.sync()
+
+    # QUERIES
+
+    def is_installed(self, package: str) -> bool:
+        self._current()
+        return package in self.packages
+
+    def get(self, package: str) -> PackageInfo:
+        """return the PackageInfo (name, version_code, uid) of a package or None if not installed"""
+        self._current()
+        return self.packages.get(package)
+
+    def with_prefix(self, prefix: str) -> list:
+        """return the sorted names of the packages starting with prefix, like 'com.google.'"""
+        self._current()
+        names: list = self.names
+        start: int = bisect_left(names, prefix)
+        end: int = start
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[start:end]
+
+    def list(self) -> list:
+        self._current()
+        return list(self.names)
+
+    def __contains__(self, package: str) -> bool:
+        return self.is_installed(package)
+
+    def __len__(self) -> int:
+        self._current()
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.list())
+
+    def __repr__(self) -> str:
+        return f"<PackageIndex {self.device_id} {len(self.names)} packages, sequence {self.sequence}>"
+
+
+class UINode(NamedTuple):
+    index: int
+    # index of the parent node, -1 for the root nodes
+    parent: int
+    text: str
+    resource_id: str
+    class_name: str
+    package: str
+    content_desc: str
+    bounds: tuple
+    clickable: bool
+    enabled: bool
+    focused: bool
+    checked: bool
+    selected: bool
+    scrollable: bool
+
+    @property
+    def center(self) -> tuple:
+        left, top, right, bottom = self.bounds
+        return (left + right) // 2, (top + bottom) // 2
+
+
+def parse_ui_node(index: int, parent: int, attributes: dict) -> UINode:
+    bounds = UI_BOUNDS_PATTERN.match(attributes.get("bounds", ""))
+    return UINode(
+        index,
+        parent,
+        attributes.get("text", ""),
+        attributes.get("resource-id", ""),
+        attributes.get("class", ""),
+        attributes.get("package", ""),
+        attributes.get("content-desc", ""),
+        tuple(int(value) for value in bounds.groups()) if bounds else (0, 0, 0, 0),
+        attributes.get("clickable") == "true",
+        attributes.get("enabled") == "true",
+        attributes.get("focused") == "true",
+        attributes.get("checked") == "true",
+        attributes.get("selected") == "true",
+        attributes.get("scrollable") == "true"
+    )
+
+
+def parse_ui_hierarchy(chunks) -> list:
+    """
+parse the xml of 'uiautomator dump' incrementally while the chunks (bytes) arrive,
+return the nodes as UINode in document order, the elements are discarded once parsed
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    nodes: list = []
+    parents: list = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        try:
+            for event, element in parser.read_events():
+                if element.tag == "hierarchy" and event == "end":
+                    return nodes
+                if element.tag != "node":
+                    continue
+                if event == "start":
+                    nodes.append(parse_ui_node(len(nodes), parents[-1] if parents else -1, element.attrib))
+                    parents.append(len(nodes) - 1)
+                else:
+                    parents.pop()
+                    element.clear()
+        except ParseError as error:
+            raise RuntimeError(f"invalid ui dump: {error}")
+    raise RuntimeError("uiautomator didn't dump the ui, is the screen on?")
+
+
+class UIHierarchy:
+    """
+the ui elements of the device screen from 'uiautomator dump', kept in a table of UINode indexed by
+text, resource_id, class_name and content_desc, the screen is dumped again only when it changes:
+for max_age seconds after a dump lookups don't touch the device, after that the focused window is
+read and compared with the one of the dump, call 'invalidate' after an action that changes the
+screen without changing the focused window (like a scroll)
+    """
+
+    INDEXED: tuple = ("text", "resource_id", "class_name", "content_desc")
+
+    def __init__(self, adb: "Py_adb", device_id: str, max_age: float = UI_HIERARCHY_MAX_AGE) -> None:
+        self.adb = adb
+        self.device_id = device_id
+        self.max_age = max_age
+        self.nodes: list = []
+        self.indexes: dict = {field: {} for field in self.INDEXED}
+        self.focus: str = None
+        self.checked_at: float = None
+        self.stale: bool = True
+        self.lock = Lock()
+
+    def focus_state(self) -> str:
+        return execute(COMMAND_SHELL.format(self.device_id, shlex.quote(SCRIPT_WINDOW_FOCUS)), self.adb.transport).strip()
+
+    def dump(self) -> None:
+        """read the ui from the device"""
+        # the focus is read first, so a change during the dump is noticed by the next check
+        focus: str = self.focus_state()
+        with self.adb.transport.open(COMMAND_UI_DUMP.format(self.device_id)) as stream:
+            nodes: list = parse_ui_hierarchy(iter(lambda: stream.read1(65536), b""))
+        indexes: dict = {field: {} for field in self.INDEXED}
+        for node in nodes:
+            for field in self.INDEXED:
+                value: str = getattr(node, field)
+                if value:
+                    indexes[field].setdefault(value, []).append(node.index)
+        self.nodes = nodes
+        self.indexes = indexes
+        self.focus = focus
+        self.checked_at = monotonic()
+        self.stale = False
+
+    def _current(self) -> None:
+        with self.lock:
+            if self.stale or self.checked_at is None:
+                self.dump()
+            elif monotonic() - self.checked_at >= self.max_age:
+                if self.focus_state() != self.focus:
+                    self.dump()
+                else:
+                    self.checked_at = monotonic()
+
+    def invalidate(self) -> None:
+        """dump the screen again on the next lookup"""
+        self.stale = True
+
+    def find(self, text: str = None, resource_id: str = None, class_name: str = None, content_desc: str = None,
+             **attributes) -> list:
+        """
+return the nodes matching every given value, text, resource_id, class_name and content_desc use the
+indexes, other UINode fields (like clickable=True or package="com.android.settings") filter the result
+        """
+        self._current()
+        candidates = None
+        for field, value in (("text", text), ("resource_id", resource_id), ("class_name", class_name), ("content_desc", content_desc)):
+            if value is None:
+                continue
+            matches = set(self.indexes[field].get(value, ()))
+            candidates = matches if candidates is None else candidates & matches
+        nodes: list = self.nodes if candidates is None else [self.nodes[index] for index in sorted(candidates)]
+        return [node for node in nodes if all(getattr(node, field) == value for field, value in attributes.items())]
+
+    def find_one(self, *args, **kwargs) -> UINode:
+        """return the first node matching, None if there isn't"""
+        nodes: list = self.find(*args, **kwargs)
+        return nodes[0] if nodes else None
+
+    def children(self, node: UINode) -> list:
+        return [child for child in self.nodes[node.index + 1:] if child.parent == node.index]
+
+    def __len__(self) -> int:
+        self._current()
+        return len(self.nodes)
+
+    def __iter__(self):
+        self._current()
+        return iter(self.nodes)
+
+    def __repr__(self) -> str:
+        return f"<UIHierarchy {self.device_id} {len(self.nodes)} nodes, focus {self.focus!r}>"
+
+
+class LogRecord(NamedTuple):
+    time: object
+    pid: int
+    tid: int
+    level: str
+    tag: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.time} {self.pid:>5} {self.tid:>5} {self.level} {self.tag}: {self.message}"
+
+
+def parse_logcat_line(line: str) -> LogRecord:
+    """
+parse a 'logcat -v threadtime' line, the time is a float with '-v epoch' else the 'MM-DD HH:MM:SS.mmm' string,
+return None for lines that are not records (like '--------- beginning of main')
+    """
+    match = LOGCAT_PATTERN.match(line.rstrip("\r\n"))
+    if not match:
+        return None
+    time, pid, tid, level, tag, message = match.groups()
+    return LogRecord(float(time) if " " not in time else time, int(pid), int(tid), level, tag, message)
+
+
+class BinaryLogRecord:
+    """
+a record of 'logcat -B', the payload is kept as bytes, tag and message are decoded only when accessed
+    """
+
+    __slots__ = ("sec", "nsec", "pid", "tid", "priority", "log_id", "payload")
+
+    def __init__(self, sec: int, nsec: int, pid: int, tid: int, priority: int, log_id: int, payload: bytes) -> None:
+        self.sec = sec
+        self.nsec = nsec
+        self.pid = pid
+        self.tid = tid
+        self.priority = priority
+        self.log_id = log_id
+        self.payload = payload
+
+    @property
+    def time(self) -> float:
+        return self.sec + self.nsec / 1e9
+
+    @property
+    def level(self) -> str:
+        return LOGCAT_PRIORITIES[self.priority] if self.priority < len(LOGCAT_PRIORITIES) else "?"
+
+    @property
+    def tag(self) -> str:
+        end: int = self.payload.find(b"\0")
+        return self.payload[:end if end >= 0 else None].decode("utf8", "replace")
+
+    @property
+    def message(self) -> str:
+        start: int = self.payload.find(b"\0") + 1
+        return self.payload[start:].rstrip(b"\0\n").decode("utf8", "replace") if start else ""
+
+    def to_record(self) -> LogRecord:
+        return LogRecord(self.time, self.pid, self.tid, self.level, self.tag, self.message)
+
+    def __str__(self) -> str:
+        return str(self.to_record())
+
+    def __repr__(self) -> str:
+        return f"<BinaryLogRecord {self.time:.3f} {self.pid} {self.level} {self.tag}>"
+
+
+def iter_binary_logcat(stream, min_priority: int = 0, tags: set = None, buffer_size: int = 1 << 20):
+    """
+decode the 'logcat -B' stream in BinaryLogRecord, frames are read in a single reusable buffer and
+headers are parsed in place with struct, records below min_priority or with a tag not in tags
+(set of bytes) are skipped before any copy, only the payload of accepted records is copied
+    """
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    header = struct.Struct("<HHiIII")
+    start: int = 0
+    end: int = 0
+    while True:
+        if start:
+            # move the incomplete frame at the beginning of the buffer
+            buffer[:end - start] = bytes(view[start:end])
+            end -= start
+            start = 0
+        read: int = stream.readinto(view[end:])
+        if not read:
+            return
+        end += read
+        while end - start >= LOGGER_ENTRY_V1_SIZE:
+            length, header_size, pid, tid, sec, nsec = header.unpack_from(buffer, start)
+            header_size = header_size or LOGGER_ENTRY_V1_SIZE
+            total: int = header_size + length
+            if total > buffer_size:
+                raise RuntimeError(f"logcat frame of {total} bytes is bigger than the buffer")
+            if end - start < total:
+                break
+            payload_start: int = start + header_size
+            priority: int = buffer[payload_start] if length else 0
+            log_id: int = struct.unpack_from("<I", buffer, start + 20)[0] if header_size >= 24 else 0
+            accepted: bool = priority >= min_priority
+            if accepted and tags is not None:
+                tag_end: int = buffer.find(0, payload_start + 1, start + total)
+                accepted = bytes(view[payload_start + 1:tag_end if tag_end >= 0 else start + total]) in tags
+            if accepted:
+                yield BinaryLogRecord(sec, nsec, pid, tid, priority, log_id, bytes(view[payload_start + 1:start + total]))
+            start += total
+
+
+class LogcatStream:
+    """
+iterate over the logcat records of a device, returned by 'Py_adb.logcat', a background thread
+reads and parses the log, records are filtered by tags, minimum level and regex (on the message)
+and kept in a buffer of buffer_size records, when the consumer is slower than the log
+the drop_policy decides what happens:
+    * 'oldest' : the oldest buffered record is dropped (default)
+    * 'newest' : the incoming record is dropped
+    * 'block' : the reader waits, so the log is not read until there is space
+dropped records are counted in 'dropped', call 'close' (or use 'with') to stop the stream
+    """
+
+    def __init__(self, stream, tags: list = None, level: str = "V", regex: str = None,
+                 buffer_size: int = 10000, drop_policy: str = "oldest", binary: bool = False) -> None:
+        if drop_policy not in ("oldest", "newest", "block"):
+            raise RuntimeError(f"drop policy '{drop_policy}' not supported, choose 'oldest', 'newest' or 'block'")
+        self.stream = stream
+        self.tags: set = set(tags) if tags else None
+        self.levels: str = LOGCAT_LEVELS[LOGCAT_LEVELS.index(level.upper()):] + "S"
+        self.regex = re.compile(regex) if regex else None
+        self.binary = binary
+        self.buffer_size = buffer_size
+        self.drop_policy = drop_policy
+        self.buffer: deque = deque()
+        self.dropped: int = 0
+        self.closed: bool = False
+        self.condition = Condition()
+        self.reader = Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def accept(self, record: LogRecord) -> bool:
+        return (record.level in self.levels
+                and (self.tags is None or record.tag in self.tags)
+                and (self.regex is None or self.regex.search(record.message) is not None))
+
+    def _records(self):
+        if self.binary:
+            # level and tags are checked by the decoder on the raw frames
+            tags: set = {tag.encode("utf8") for tag in self.tags} if self.tags else None
+            for record in iter_binary_logcat(self.stream, LOGCAT_PRIORITIES.index(self.levels[0]), tags):
+                if self.regex is None or self.regex.search(record.message):
+                    yield record
+            return
+        for line in self.stream:
+            record = parse_logcat_line(line.decode("utf8", "replace"))
+            if record is not None and self.accept(record):
+                yield record
+
+    def _read_loop(self) -> None:
+        try:
+            for record in self._records():
+                with self.condition:
+                    if len(self.buffer) >= self.buffer_size:
+                        if self.drop_policy == "oldest":
+                            self.buffer.popleft()
+                            self.dropped += 1
+                        elif self.drop_policy == "newest":
+                            self.dropped += 1
+                            continue
+                        else:
+                            self.condition.wait_for(lambda: len(self.buffer) < self.buffer_size or self.closed)
+                            if self.closed:
+                                return
+                    self.buffer.append(record)
+                    self.condition.notify_all()
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+
+    def get(self, timeout: float = None) -> LogRecord:
+        """return the next record, None if the timeout expires or the stream is closed"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.buffer or self.closed, timeout)
+            if not self.buffer:
+                return None
+            record = self.buffer.popleft()
+            self.condition.notify_all()
+            return record
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> LogRecord:
+        record = self.get()
+        if record is None:
+            raise StopIteration
+        return record
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.stream.close()
+        self.reader.join(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PhoneData(Mapping):
+    """
+phone data of a device, returned by 'Py_adb.phone_data', it can be used like the old dict
+(data["battery_data"]["level"]) but every section is fetched only when accessed and cached
+for a time depending on how often it changes (see PHONE_DATA_TTL), call 'refresh' to drop the cache
+    """
+
+    def __init__(self, adb: "Py_adb", device_id: str) -> None:
+        self.adb = adb
+        self.device_id = device_id
+        self.cache: dict = {}
+        self.lock = Lock()
+
+    def _fetch(self, section: str):
+        device_id, transport = self.device_id, self.adb.transport
+        match section:
+            case "battery_data":
+                return parse_battery(execute(COMMAND_INFO_BATTERY.format(device_id), transport))
+            case "device_data":
+                return parse_device_data(self.adb.properties(device_id))
+            case "status":
+                return self.adb.display_status(device_id)
+            case "packages":
+                names: list = self.adb.packages(device_id).list()
+                return {"list": names, "count": len(names)}
+
+    def __getitem__(self, section: str):
+        if section not in PHONE_DATA_TTL:
+            raise KeyError(section)
+        with self.lock:
+            cached = self.cache.get(section)
+            if cached and monotonic() - cached[0] < PHONE_DATA_TTL[section]:
+                return cached[1]
+        value = self._fetch(section)
+        with self.lock:
+            self.cache[section] = (monotonic(), value)
+        return value
+
+    def __iter__(self):
+        return iter(PHONE_DATA_TTL)
+
+    def __len__(self) -> int:
+        return len(PHONE_DATA_TTL)
+
+    @property
+    def battery(self) -> dict:
+        return self["battery_data"]
+
+    @property
+    def device(self) -> dict:
+        return self["device_data"]
+
+    @property
+    def status(self) -> dict:
+        return self["status"]
+
+    @property
+    def packages(self) -> dict:
+        return self["packages"]
+
+    def refresh(self, section: str = None) -> "PhoneData":
+        """drop the cached data of a section, or of every section if not provided"""
+        with self.lock:
+            if section:
+                self.cache.pop(section, None)
+            else:
+                self.cache.clear()
+        return self
+
+    def to_dict(self) -> dict:
+        """fetch every section and return the old phone_data dict"""
+        return {section: self[section] for section in self}
+
+    def __repr__(self) -> str:
+        return f"<PhoneData {self.device_id} cached: {list(self.cache)}>"
+
+
+def read_string_pool(data: bytes, offset: int) -> list:
+    """read a binary xml string pool chunk, used to read the AndroidManifest.xml of an apk"""
+    string_count, _, flags, strings_start = struct.unpack_from("<IIII", data, offset + 8)
+    is_utf8: bool = bool(flags & (1 << 8))
+    strings: list = []
+    for index in range(string_count):
+        position: int = offset + strings_start + struct.unpack_from("<I", data, offset + 28 + index * 4)[0]
+        if is_utf8:
+            # utf16 length then utf8 length, both 1 or 2 bytes
+            position += 2 if data[position] & 0x80 else 1
+            length: int = data[position]
+            if length & 0x80:
+                length = ((length & 0x7f) << 8) | data[position + 1]
+                position += 1
+            strings.append(data[position + 1:position + 1 + length].decode("utf8", "replace"))
+        else:
+            length = struct.unpack_from("<H", data, position)[0]
+            if length & 0x8000:
+                length = ((length & 0x7fff) << 16) | struct.unpack_from("<H", data, position + 2)[0]
+                position += 2
+            strings.append(data[position + 2:position + 2 + length * 2].decode("utf-16-le", "replace"))
+    return strings
+
+
+def read_apk_manifest(path: str) -> dict:
+    """
+read package name, versionCode, versionName and split name from the binary AndroidManifest.xml of an apk
+    """
+    with ZipFile(path) as apk:
+        data: bytes = apk.read("AndroidManifest.xml")
+
+    # android attributes may have no name, the resource map gives their id
+    attribute_ids: dict = {0x0101021b: "versionCode", 0x0101021c: "versionName"}
+    strings: list = []
+    resource_map: list = []
+    offset: int = struct.unpack_from("<H", data, 2)[0]
+    while offset < len(data):
+        chunk_type, header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+        if chunk_type == 0x0001:
+            strings = read_string_pool(data, offset)
+        elif chunk_type == 0x0180:
+            resource_map = list(struct.unpack_from(f"<{(chunk_size - header_size) // 4}I", data, offset + header_size))
+        elif chunk_type == 0x0102:
+            name_index, attribute_start, attribute_size, attribute_count = struct.unpack_from("<4xIHHH", data, offset + 16)
+            if strings[name_index] != "manifest":
+                break
+            manifest: dict = {"package": None, "version_code": 0, "version_name": None, "split": None}
+            for index in range(attribute_count):
+                position: int = offset + header_size + attribute_start + index * attribute_size
+                _, name, raw, _, data_type, value = struct.unpack_from("<IIIHxBI", data, position)
+                name = strings[name] or attribute_ids.get(resource_map[name] if name < len(resource_map) else None, "")
+                text = strings[raw] if raw != 0xffffffff else None
+                match name:
+                    case "package":
+                        manifest["package"] = text
+                    case "versionCode":
+                        manifest["version_code"] = value if data_type in (0x10, 0x11) else int(text)
+                    case "versionName":
+                        manifest["version_name"] = text
+                    case "split":
+                        manifest["split"] = text
+            return manifest
+        offset += chunk_size
+    raise RuntimeError(f"no manifest found in '{path}'")
+
+
+@lru_cache(maxsize=16)
+def _load_apk(path: str, mtime: float, size: int) -> tuple:
+    with open(path, "rb") as file:
+        data: bytes = file.read()
+    return data, sha256(data).hexdigest(), read_apk_manifest(path)
+
+
+def load_apk(path: str) -> tuple:
+    """
+return (content, sha256, manifest) of an apk, the file is read once and kept in memory
+until it changes, so deploying it on many devices reads and hashes it only once
+    """
+    real_path: str = realpath(path)
+    if not exists(real_path):
+        raise RuntimeError(f"no such apk file: '{real_path}'")
+    return _load_apk(real_path, getmtime(real_path), getsize(real_path))
+
+
+def clear_cmd():
+    match platform:
+        case "win32":
+            system("cls")
+        case "linux" | "darwin":
+            system("clear")
+
+
+
+def require_numpy(feature: str) -> None:
+    if numpy is None:
+        raise RuntimeError(f"numpy is required {feature}, install it with 'pip install numpy'")
+
+
+class ScreenFrame(NamedTuple):
+    width: int
+    height: int
+    format: int
+    pixels: memoryview
+
+    @property
+    def format_name(self) -> str:
+        return SCREENCAP_FORMATS[self.format][0]
+
+    @property
+    def buffer(self):
+        """the memory holding the pixels, pass it to the next capture to read it in the same memory"""
+        return self.pixels.obj
+
+    def to_numpy(self):
+        """
+a (height, width, channels) uint8 array sharing the frame memory, RGB_565 frames are (height, width) uint16
+        """
+        require_numpy("to get frames as arrays")
+        if self.format == 4:
+            return numpy.frombuffer(self.pixels, numpy.uint16).reshape(self.height, self.width)
+        return numpy.frombuffer(self.pixels, numpy.uint8).reshape(self.height, self.width, SCREENCAP_FORMATS[self.format][1])
+
+
+def screencap_size(width: int, height: int, pixel_format: int) -> int:
+    if pixel_format not in SCREENCAP_FORMATS:
+        raise RuntimeError(f"screencap pixel format {pixel_format} not supported")
+    return width * height * SCREENCAP_FORMATS[pixel_format][1]
+
+
+def parse_screencap(data: bytes) -> ScreenFrame:
+    """
+parse the output of 'screencap' (raw, not png), the pixels are a view of data, nothing is copied,
+newer android versions add a 4 bytes dataspace after width, height and format
+    """
+    if len(data) < SCREENCAP_HEADER.size:
+        raise RuntimeError(f"screencap returned {len(data)} bytes, is the device screen available?")
+    width, height, pixel_format = SCREENCAP_HEADER.unpack_from(data)
+    size: int = screencap_size(width, height, pixel_format)
+    offset: int = len(data) - size
+    if offset not in (SCREENCAP_HEADER.size, SCREENCAP_HEADER.size + 4):
+        raise RuntimeError(f"screencap returned {len(data)} bytes for a {width}x{height} frame")
+    return ScreenFrame(width, height, pixel_format, memoryview(data)[offset:])
+
+
+def read_screencap(stream, buffer: bytearray = None) -> ScreenFrame:
+    """
+read a raw screencap from stream directly in buffer, so the pixels of the previous frame read in the
+same buffer are overwritten, when buffer is too small a new one is used (it can't be resized while
+frames or arrays still point to it), frame.buffer is the memory actually used
+    """
+    header: bytes = stream.read(SCREENCAP_HEADER.size)
+    if len(header) < SCREENCAP_HEADER.size:
+        raise RuntimeError(f"screencap returned {len(header)} bytes, is the device screen available?")
+    width, height, pixel_format = SCREENCAP_HEADER.unpack(header)
+    size: int = screencap_size(width, height, pixel_format)
+    # room for the optional dataspace
+    if buffer is None or len(buffer) < size + 4:
+        buffer = bytearray(size + 4)
+    view = memoryview(buffer)[:size + 4]
+    read: int = 0
+    while read < len(view):
+        count = stream.readinto(view[read:])
+        if not count:
+            break
+        read += count
+    if read not in (size, size + 4):
+        raise RuntimeError(f"screencap returned {read} bytes for a {width}x{height} frame")
+    return ScreenFrame(width, height, pixel_format, view[read - size:read])
+
+
+class ScreenStream:
+    """
+live view of a device screen, returned by 'Py_adb.screen_stream', a background thread captures frames with:
+    * 'h264' : 'screenrecord --output-format=h264' decoded with PyAV (pip install av), restarted when screenrecord stops
+    * 'screencap' : repeated raw 'screencap', slower but without dependencies
+    * 'auto' : 'h264' when PyAV is installed, otherwise 'screencap' (default), also used when screenrecord
+      keeps stopping without frames (like on devices without h264 output)
+frames are kept in a buffer of buffer_size frames, when the consumer is slower the oldest frame is dropped,
+'latest' returns the freshest frame discarding the older ones, 'stats' returns the achieved fps and the
+latency of the last frames, from the capture request (screencap) or the arrival of the encoded data (h264)
+until the frame is available, call 'close' (or use 'with') to stop the stream
+    """
+
+    def __init__(self, adb: "Py_adb", device_id: str, source: str = "auto", buffer_size: int = 2,
+                 as_numpy: bool = False, size: str = None, bit_rate: int = None) -> None:
+        # with 'auto' a failing h264 stream falls back to screencap
+        self.fallback: bool = source == "auto"
+        if source == "auto":
+            source = "screencap" if av is None or numpy is None else "h264"
+        if source not in ("h264", "screencap"):
+            raise RuntimeError(f"screen stream source '{source}' not supported, choose 'auto', 'h264' or 'screencap'")
+        if source == "h264" and (av is None or numpy is None):
+            raise RuntimeError("PyAV and numpy are required to decode the h264 stream, install them with 'pip install av numpy'")
+        self.adb = adb
+        self.device_id = device_id
+        self.source = source
+        self.buffer_size = buffer_size
+        self.as_numpy = as_numpy
+        self.options: str = " ".join(([f"--size {size}"] if size else []) + ([f"--bit-rate {bit_rate}"] if bit_rate else []))
+        self.buffer: deque = deque()
+        # buffers of the dropped frames, reused by screencap
+        self.free: list = []
+        self.frames: int = 0
+        self.dropped: int = 0
+        self.arrivals: deque = deque(maxlen=SCREEN_STREAM_WINDOW)
+        self.latencies: deque = deque(maxlen=SCREEN_STREAM_WINDOW)
+        self.error: Exception = None
+        self.stream = None
+        self.closed: bool = False
+        self.condition = Condition()
+        self.reader = Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _drop(self, frame: ScreenFrame) -> None:
+        self.dropped += 1
+        # only screencap frames own a reusable buffer
+        if isinstance(frame.pixels.obj, bytearray):
+            self.free.append(frame.pixels.obj)
+
+    def _push(self, frame: ScreenFrame, started: float) -> None:
+        now = monotonic()
+        with self.condition:
+            if len(self.buffer) >= self.buffer_size:
+                self._drop(self.buffer.popleft())
+            self.buffer.append(frame)
+            self.frames += 1
+            self.arrivals.append(now)
+            self.latencies.append((now - started) * 1000)
+            self.condition.notify_all()
+
+    def _read_screencap(self) -> None:
+        CMD: str = COMMAND_SCREENCAP.format(self.device_id)
+        while not self.closed:
+            started = monotonic()
+            with self.adb.transport.open(CMD) as stream:
+                self.stream = stream
+                with self.condition:
+                    buffer = self.free.pop() if self.free else None
+                frame = read_screencap(stream, buffer)
+            self._push(frame, started)
+
+    def _read_h264(self) -> None:
+        CMD: str = COMMAND_SCREENRECORD_H264.format(self.device_id, self.options)
+        codec = av.CodecContext.create("h264", "r")
+        failures: int = 0
+        while not self.closed:
+            started: float = monotonic()
+            frames: int = self.frames
+            with self.adb.transport.open(CMD) as stream:
+                self.stream = stream
+                while not self.closed:
+                    chunk: bytes = stream.read1(65536)
+                    if not chunk:
+                        break
+                    received = monotonic()
+                    for packet in codec.parse(chunk):
+                        for decoded in codec.decode(packet):
+                            pixels = decoded.to_ndarray(format="rgba")
+                            self._push(ScreenFrame(decoded.width, decoded.height, 1, memoryview(pixels).cast("B")), received)
+            # screenrecord stops after its time limit, so it is started again, but a run ending early without
+            # frames (h264 output not supported, secure display, device gone) is retried only a few times
+            if self.frames > frames or monotonic() - started >= SCREENRECORD_TIME_LIMIT * 0.9:
+                failures = 0
+                continue
+            failures += 1
+            if failures >= SCREEN_STREAM_RETRIES:
+                raise RuntimeError(f"screenrecord stopped {failures} times without frames on device '{self.device_id}'")
+            with self.condition:
+                self.condition.wait_for(lambda: self.closed, SCREEN_STREAM_BACKOFF * 2 ** (failures - 1))
+
+    def _read_loop(self) -> None:
+        try:
+            if self.source == "h264":
+                try:
+                    self._read_h264()
+                except RuntimeError:
+                    if not self.fallback or self.closed:
+                        raise
+                    self.source = "screencap"
+                    self._read_screencap()
+            else:
+                self._read_screencap()
+        except (OSError, ValueError, RuntimeError) as error:
+            if not self.closed:
+                self.error = error
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+
+    def _result(self, frame: ScreenFrame):
+        return frame.to_numpy() if self.as_numpy else frame
+
+    def get(self, timeout: float = None):
+        """return the next frame, None if the timeout expires or the stream is closed"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.buffer or self.closed, timeout)
+            if not self.buffer:
+                return None
+            return self._result(self.buffer.popleft())
+
+    def latest(self, timeout: float = None):
+        """return the freshest frame dropping the older ones, None if the timeout expires or the stream is closed"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.buffer or self.closed, timeout)
+            if not self.buffer:
+                return None
+            frame = self.buffer.pop()
+            while self.buffer:
+                self._drop(self.buffer.popleft())
+            return self._result(frame)
+
+    def stats(self) -> dict:
+        with self.condition:
+            arrivals: list = list(self.arrivals)
+            latencies: list = list(self.latencies)
+            frames, dropped = self.frames, self.dropped
+        elapsed: float = arrivals[-1] - arrivals[0] if arrivals else 0
+        return {
+            "frames": frames,
+            "dropped": dropped,
+            "fps": (len(arrivals) - 1) / elapsed if elapsed else 0.0,
+            "latency_ms": {
+                "mean": mean(latencies),
+                "min": min(latencies),
+                "max": max(latencies)
+            } if latencies else None
+        }
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        frame = self.get()
+        if frame is None:
+            raise StopIteration
+        return frame
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.stream is not None:
+            self.stream.close()
+        self.reader.join(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def rgb_pixels(frame):
+    """
+(height, width, 3) uint8 array of a ScreenFrame or of a frame array (RGBA, RGB or RGB_565),
+a view of the frame memory when possible
+    """
+    require_numpy("for visual waits")
+    if isinstance(frame, ScreenFrame):
+        pixels = frame.to_numpy()
+        if frame.format == 5:
+            return pixels[:, :, 2::-1]
+    else:
+        pixels = numpy.asarray(frame)
+    if pixels.ndim == 3:
+        return pixels[:, :, :3]
+    # RGB_565
+    pixels = pixels.astype(numpy.uint16)
+    return numpy.stack((
+        (pixels >> 11 & 0x1f) * 255 // 31,
+        (pixels >> 5 & 0x3f) * 255 // 63,
+        (pixels & 0x1f) * 255 // 31
+    ), axis=-1).astype(numpy.uint8)
+
+
+def crop(pixels, region: tuple = None):
+    """region is (left, top, right, bottom) in pixels, None for the whole frame"""
+    if region is None:
+        return pixels
+    left, top, right, bottom = region
+    return pixels[top:bottom, left:right]
+
+
+def changed_fraction(pixels, reference, tolerance: int = VISUAL_WAIT_TOLERANCE) -> float:
+    """fraction of pixels with a channel differing more than tolerance"""
+    difference = numpy.abs(pixels.astype(numpy.int16) - reference.astype(numpy.int16)).max(axis=-1)
+    return float(numpy.count_nonzero(difference > tolerance)) / difference.size
+
+
+class TemplateMatch(NamedTuple):
+    # center of the match in frame coordinates, ready to be tapped
+    x: int
+    y: int
+    score: float
+
+
+def match_template(pixels, template, region: tuple = None) -> TemplateMatch:
+    """
+find the best match of template in pixels with the normalized cross correlation of the grayscale
+images, the score is between -1 and 1 (identical), correlation is computed with the FFT and the
+local sums with integral images, so the cost doesn't depend on the template size
+    """
+    image = crop(rgb_pixels(pixels), region).mean(axis=-1)
+    template = rgb_pixels(template).mean(axis=-1)
+    height, width = image.shape
+    template_height, template_width = template.shape
+    if template_height > height or template_width > width:
+        raise RuntimeError("the template is bigger than the searched image")
+    template = template - template.mean()
+    template_norm: float = numpy.sqrt((template ** 2).sum())
+    # correlation with the zero mean template, sum(image * template) over every window
+    kernel = numpy.zeros((height, width))
+    kernel[:template_height, :template_width] = template[::-1, ::-1]
+    correlation = numpy.fft.irfft2(numpy.fft.rfft2(image) * numpy.fft.rfft2(kernel), s=(height, width))
+    correlation = correlation[template_height - 1:, template_width - 1:]
+
+    def window_sums(values):
+        integral = numpy.zeros((height + 1, width + 1))
+        integral[1:, 1:] = values.cumsum(0).cumsum(1)
+        return (integral[template_height:, template_width:] - integral[:-template_height, template_width:]
+                - integral[template_height:, :-template_width] + integral[:-template_height, :-template_width])
+
+    size: int = template_height * template_width
+    sums = window_sums(image)
+    variance = numpy.maximum(window_sums(image ** 2) - sums ** 2 / size, 0)
+    denominator = numpy.sqrt(variance) * template_norm
+    scores = numpy.where(denominator > 1e-6, correlation / numpy.maximum(denominator, 1e-6), 0)
+    y, x = numpy.unravel_index(int(numpy.argmax(scores)), scores.shape)
+    left, top = (region[0], region[1]) if region else (0, 0)
+    return TemplateMatch(int(left + x + template_width // 2), int(top + y + template_height // 2), float(scores[y, x]))
+
+
+class Py_adb:
+    """
+this is a simple low level ADB connector, you can use it for every task, such as
+debugging, automatism and even fun!
+a list of avaiable function and methods with description
+
+    * transport : the object used to run commands, SocketTransport (default) talks directly with the adb server,
+      SubprocessTransport spawns the adb client for each command
+    * input_backend : 'input' (default) or 'sendevent' to write touch events directly in /dev/input for tap, swipe and precision_tap
+    * injector : get the SendeventInjector of a device
+    * persistent_shell : if True, one 'adb shell' is kept open for each device and reused by every command
+    * shell_session : get the persistent shell of a device to pipeline commands
+    * ADB_DATA : get some adb data such as version and main ADB executable path
+    * ADB_VERSION : return only the version of ADB
+    * ADB_EXECUTABLE : only return main executable ADB path
+    * is_adb_running : to check if adb is actualy running
+    * list_devices : to check all avaiable devices
+    * group : get a DeviceGroup to run an action on many devices in parallel
+    * device : get a Device bound to a single device, its actions skip the device checks
+    * registry : the DeviceRegistry tracking connected devices in background
+    * display_status : check if display is awake or locked
+    * watch / unwatch : keep the display state of a device up to date in background, to wait for its changes
+    * get_first_avaiable_device : to get a a dict of first avaiable device
+    * phone_data : a rich dict with some of the most important phone data
+    * packages : the index of installed packages, updated only with the changed ones
+    * properties : every device property (getprop) with cached lookups
+    * ui : the ui elements on the screen (uiautomator), dumped again only when the screen changes
+    * find : find ui elements by text, resource_id, class_name, content_desc
+    * tap_element : tap a ui element found by text, resource_id, class_name, content_desc
+    * install_apk : try to insrall install apk on device
+    * uninstall_apk : try to unistall apk by its package name
+    * deploy_apk : install an apk (or split apks) only if the device doesn't have the same build yet
+    * deploy : deploy_apk on many devices in parallel
+    * start_logcat : very interesting feature for debugging app, current device log
+    * logcat : stream the device log as parsed records, with filters
+    * screenshot : to take a screenshot
+    * screencap : capture the screen pixels in memory, as a ScreenFrame or a numpy array
+    * screen_stream : live stream of screen frames, always keeping the freshest ones
+    * wait_for_pixel / wait_for_region_change / wait_for_region_stable / wait_for_template : wait for the screen to show something, with a timeout
+    * find_template : find an image on the screen
+    * power_button : to lock or unlock the screen
+    * call : to start a call
+    * send_sms : to send a sms to someone
+    * insert_text : to input some text, escaped and chunked, with the fastest strategy available
+    * text_strategies : the text strategies available on the device
+    * wait_for : wait until a condition holds, recording how long it took in 'wait_log'
+    * wait_timings : the time waited by every step, to tune the timeouts
+    * is_screen_on / is_unlocked / focused_window / resumed_activity / is_activity_resumed : device state predicates
+    * unlock_screen : to try to unlock the screen, you may provide a password if needed
+    * take_picture : take a photo, you can even provide the zoom_in<int> and zoom_out<int>
+    * video_capture start a video capture, you can even provide the zoom_in<int> and zoom_out<int> and duration<int> to define video duration
+    * swipe : to swipe on the screen 
+    * tap : to tap on the screen giving x and y
+    * register_script / run_script : push a sequence of actions once and run it with a single command
+    * cached_scripts / evict_scripts : list and remove the scripts on the device
+    * record_gesture / replay_gesture : record the touches on the screen and replay them with the same timing
+    * turn_off : turn off the device
+    * reboot : reboot device
+    * open_call_log : open the system default call-log app
+    * open_calendar : open the system default calendar app
+    * open_calulator : open the system default calculator app
+    * open_email : open the system default email
+    * open_browser : open the system default browser
+    * open_camera : open the system default camera, specify 'frontal_camera=True' to use frontal camera
+    * home : go to the device home screen
+    * back : go back in the previous screen
+    * foreground_apps : toggle the app in background
+    * notification_center : toggle the notification center
+    * voice_assistant : toggle voice assistant, like saying 'ok google'
+    * key_sequence : press many keys with a single command, with optional delays run on the device
+    * volume_up / volume_down : to raise or low the volume, provide 'times' to define how many times repeat the action
+    * brightness_up / brightness_down : to raise or low brightness, provide 'times' to define how many times repeat the action
+    """
+
+    def __init__(self, transport=None, persistent_shell: bool = False, input_backend: str = "input") -> None:
+        # if adb shell is not running, raise a RuntimeError exception
+        if not self.is_adb_running():
+            raise RuntimeError(
+                "ADB is not running, please start it with 'adb start-server'")
+
+        # every command goes through the transport, by default it talks directly with the adb server,
+        # pass 'SubprocessTransport()' to spawn the adb client for each command
+        self.transport = transport or SocketTransport()
+        # keep one 'adb shell' open for each device instead of starting one for each command
+        if persistent_shell:
+            self.transport = ShellSessionTransport(self.transport)
+        # connected devices are tracked in background, so device checks don't run 'adb devices'
+        self.registry = DeviceRegistry.shared(self.transport)
+        # 'input' uses the android input command, 'sendevent' writes events directly in the touchscreen
+        if input_backend not in ("input", "sendevent"):
+            raise RuntimeError(f"input backend '{input_backend}' not supported, choose 'input' or 'sendevent'")
+        self.input_backend = input_backend
+        self.injectors: dict = {}
+        self.phone_data_cache: dict = {}
+        self.property_stores: dict = {}
+        self.package_indexes: dict = {}
+        self.ui_hierarchies: dict = {}
+        self.wait_log: deque = deque(maxlen=WAIT_LOG_SIZE)
+        self.watchers: dict = {}
+        self.scripts: dict = {}
+        self.script_caches: dict = {}
+        self.text_strategy_cache: dict = {}
+        self.ADB_DATA = execute("adb --version", self.transport)
+        self.ADB_VERSION = self.ADB_DATA.split()[4]
+        self.ADB_EXECUTABLE = self.ADB_DATA.split()[9]
+        self.SUPPORTED_APPS = {
+            "call_log":KEYEVENT_CALL_LOG,
+            "calendar":KEYEVENT_CALENDAR,
+            "music":KEYEVENT_MUSIC,
+            "calculator":KEYEVENT_CALCULATOR,
+            "email":KEYEVENT_EMAIL,
+            "browser":KEYEVENT_BROWSER,
+            "camera":KEYEVENT_CAMERA
+        }
+        self.SUPPORTED_NAVIGATION_ACTIONS = {
+            "home":KEYEVENT_HOME,
+            "back":KEYEVENT_BACK,
+            "foreground":KEYEVENT_FOREGROUND,
+            "notification_center":KEYEVENT_NOTIFICATION_CENTER
+        }
+
+    # ADB FUNCTIONS
+
+    def is_adb_running(self) -> bool:
+        """
+this function return boolean value True if adb is runnig else it raises
+a RuntimeError exception, to solve this issue just run in CMD 'adb start-server'
+        """
+        try:
+            return IS_ADB_RUNNING_CMD()
+        except CalledProcessError:
+            return False
+
+    def shell_session(self, device_id: str = None) -> ShellSession:
+        """
+return the persistent shell of a device, use 'submit' to pipeline commands without waiting,
+the object must be created with 'persistent_shell=True'
+        """
+        if not hasattr(self.transport, "session"):
+            raise RuntimeError("persistent shell is disabled, create Py_adb with 'persistent_shell=True'")
+        device_id = self._resolve_device(device_id)
+        return self.transport.session(device_id)
+
+    def injector(self, device_id: str = None) -> SendeventInjector:
+        """
+return the SendeventInjector of a device, the touchscreen is discovered only the first time
+        """
+        device_id = self._resolve_device(device_id)
+        if device_id not in self.injectors:
+            self.injectors[device_id] = SendeventInjector(device_id, self.transport)
+        return self.injectors[device_id]
+
+    def group(self, serials: list = None, max_workers: int = 8, timeout: float = None) -> "DeviceGroup":
+        """
+return a DeviceGroup to run the same action on many devices in parallel,
+by default it contains every device with status 'device'
+        """
+        if serials is None:
+            serials = [device["id"] for device in self.list_devices() if device["status"] == "device"]
+        return DeviceGroup(self, serials, max_workers, timeout)
+
+    def list_devices(self) -> list:
+        """
+this function return a list containing a dict with name and status of each devices
+        """
+        return self.registry.list_devices()
+
+    def get_first_avaiable_device(self) -> dict:
+        """
+this function just returns a dict of first device avaiable
+        """
+        # use this on every function to check if there is a device else raise exception
+        return self.registry.first()
+     
+    def _basic_device_check(self,device_id:str="") ->None:
+        """
+this is an internal function just to check if some devices are unauthorized, this may cause fatal errors
+        """
+        if not device_id:
+            if not self.registry.first(): raise RuntimeError("a device must be connected")
+        
+        if self.registry.has_unauthorized():
+            print(colored(" > ERROR - some of your devices are tagged with 'unauthorized' status, this may cause problems, please get developer mode in android settings","red"))
+
+    def _resolve_device(self, device_id: str = None) -> str:
+        """
+this is an internal function, it runs the device checks and returns device_id,
+or the id of the first avaiable device if device_id is not provided
+        """
+        if not self.get_first_avaiable_device():
+            raise RuntimeError("no device detected")
+        self._basic_device_check()
         if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
             device_id = self.get_first_avaiable_device()["id"]
+        return device_id
+
+    def device(self, serial: str = None) -> "Device":
+        """
+return a Device bound to serial (or to the first avaiable device), it is validated once
+and then its actions skip the device discovery and checks
+        """
+        return Device(self, serial or self._resolve_device())
+
+    # PHONE DATA
+
+    def display_status(self, device_id: str = None) -> dict:
+        """
+this function can be called to check if display is awake and unlocked
+        """
+        device_id = self._resolve_device(device_id)
+        # while the device is watched the state is already here
+        watcher: StateWatcher = self.watchers.get(device_id)
+        if watcher is not None and watcher.alive and watcher.state is not None:
+            return dict(watcher.state)
+        return parse_display_status(execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_DISPLAY_STATUS)), self.transport))
+
+    def watch(self, interval: float = STATE_WATCH_INTERVAL, device_id: str = None) -> StateWatcher:
+        """
+start (or return the running) StateWatcher of a device, while it runs display_status is read from memory
+and you can wait for the screen state to change:
+
+    watcher = adb_connector.watch()
+    adb_connector.power_button()
+    watcher.wait_for(is_awake=True, timeout=5)
+        """
+        device_id = self._resolve_device(device_id)
+        watcher: StateWatcher = self.watchers.get(device_id)
+        if watcher is None or not watcher.alive:
+            watcher = self.watchers[device_id] = StateWatcher(self, device_id, interval)
+        return watcher
+
+    def unwatch(self, device_id: str = None) -> None:
+        """stop the StateWatcher of a device"""
+        device_id = self._resolve_device(device_id)
+        watcher: StateWatcher = self.watchers.pop(device_id, None)
+        if watcher is not None:
+            watcher.close()
+
+    def get_apps(self, device_id=None) ->list:
+        """get a list of all package on your device"""
+        return self.packages(device_id).list()
+
+    def properties(self, device_id: str = None) -> PropertyStore:
+        """
+return the properties of a device (getprop) as a dict-like object, properties['ro.product.model'],
+'ro.*' properties are cached for the whole session, use get(key, fresh=True) to read a single
+property from the device
+        """
+        device_id = self._resolve_device(device_id)
+        if device_id not in self.property_stores:
+            self.property_stores[device_id] = PropertyStore(self, device_id)
+        return self.property_stores[device_id]
+
+    def packages(self, device_id: str = None) -> PackageIndex:
+        """
+return the PackageIndex of a device, it is built once and then updated only with the packages
+changed on the device, use it to check installed packages without listing them every time
+        """
+        device_id = self._resolve_device(device_id)
+        if device_id not in self.package_indexes:
+            self.package_indexes[device_id] = PackageIndex(self, device_id)
+        return self.package_indexes[device_id]
+
+    def ui(self, fresh: bool = False, device_id: str = None) -> UIHierarchy:
+        """
+return the UIHierarchy of a device, the screen is dumped with uiautomator only when the focused
+window changed, fresh=True dumps it anyway
+        """
+        device_id = self._resolve_device(device_id)
+        if device_id not in self.ui_hierarchies:
+            self.ui_hierarchies[device_id] = UIHierarchy(self, device_id)
+        hierarchy = self.ui_hierarchies[device_id]
+        if fresh:
+            hierarchy.invalidate()
+        return hierarchy
+
+    def find(self, text: str = None, resource_id: str = None, class_name: str = None, content_desc: str = None,
+             fresh: bool = False, device_id: str = None, **attributes) -> list:
+        """
+return the ui elements (UINode) on the screen matching every given value:
+
+    adb_connector.find(text="Settings")
+    adb_connector.find(resource_id="com.android.chrome:id/url_bar")
+    adb_connector.find(class_name="android.widget.Button", clickable=True)
+        """
+        return self.ui(fresh, device_id).find(text, resource_id, class_name, content_desc, **attributes)
+
+    def tap_element(self, text: str = None, resource_id: str = None, class_name: str = None, content_desc: str = None,
+                    fresh: bool = False, device_id: str = None, **attributes) -> bool:
+        """
+tap the center of the first ui element matching every given value, return False if there isn't
+        """
+        hierarchy = self.ui(fresh, device_id)
+        node = hierarchy.find_one(text, resource_id, class_name, content_desc, **attributes)
+        if node is None:
+            return False
+        x, y = node.center
+        tapped: bool = self.tap(x, y, device_id=hierarchy.device_id)
+        hierarchy.invalidate()
+        return tapped
+
+    def phone_data(self, device_id=None) -> PhoneData:
+        """
+this function return the most part of phone data that you could need,
+the parameterdevice_id is optionally, it will take as default the first device avaiable
+if you want to use another device just call
+the 'get_first_avaiable_device[\'id'] function and use theDEVICE_ID to refer to device',
+it works like a dict but each section (battery_data, device_data, status, packages) is fetched
+only when you read it and cached, call 'refresh()' on it to get fresh data
+        """
+
+        device_id = self._resolve_device(device_id)
+        if device_id not in self.phone_data_cache:
+            self.phone_data_cache[device_id] = PhoneData(self, device_id)
+        return self.phone_data_cache[device_id]
+
+    # FUNCTIONS
+
+    def install_apk(self, path: str, device_id: str = None) -> bool:
+        """
+this function try to install apk it needs a path to apk
+and optionalyDEVICE_ID, if notDEVICE_ID is provided it will take the first device as default,
+you have to allow the operation from the device
+        """
+
+        device_id = self._resolve_device(device_id)
+        # path check
+        real_path: str = realpath(path)
+        if not exists(real_path):
+            raise RuntimeError(f"no such apk file: '{real_path}'")
+
+        print(" > request sent to device")
+        print(" > confirm installation")
+        return execute_keyevent(COMMAND_INSTALL_APK.format(device_id, path), self.transport)
+
+    def uninstall_apk(self, package_name: str, device_id=None) -> bool:
+        """
+this function try to uninstall a package by its name, you have to pass into attribute 'path'
+a package name like 'com.package.app' in order to uninstall it, to get a list of
+packages present on this device run 'phone_data()['packages']'
+        """
+        device_id = self._resolve_device(device_id)
+        print(execute(COMMAND_UNINSTALL_APK.format(
+            device_id, package_name.removeprefix("package:")), self.transport).strip())
+        return True
+
+    def deploy_apk(self, path, force: bool = False, device_id: str = None) -> str:
+        """
+install an apk only if the device doesn't have it yet, path can be a list of paths to install
+split apks together, the device is skipped when the installed versionCode is the same and the
+apk was deployed from the same file (sha256), the file is pushed and installed without
+confirmation, return 'skipped' or 'installed', to deploy on many devices in parallel use
+'group().deploy_apk(path)'
+        """
+        device_id = self._resolve_device(device_id)
+        paths: list = [path] if isinstance(path, str) else list(path)
+        apks: list = [load_apk(apk) for apk in paths]
+        base: tuple = next((apk for apk in apks if not apk[2]["split"]), apks[0])
+        package: str = base[2]["package"]
+        digest: str = sha256("".join(apk[1] for apk in apks).encode("utf8")).hexdigest()
+
+        if not force:
+            status: str = execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_DEPLOY_STATUS.format(package))), self.transport)
+            installed = re.search(r"versionCode=(\d+)", status)
+            if installed and int(installed.group(1)) == base[2]["version_code"] and digest in status:
+                return "skipped"
+
+        # bytes are pushed from memory with the socket transport, the client reads the file itself
+        transport = self.transport
+        while hasattr(transport, "transport"):
+            transport = transport.transport
+        in_memory: bool = isinstance(transport, SocketTransport)
+        execute(COMMAND_SHELL.format(device_id, f"mkdir -p {DEPLOY_DIRECTORY}"), self.transport)
+        remote_paths: list = []
+        for apk, local_path in zip(apks, paths):
+            remote_path: str = f"{DEPLOY_DIRECTORY}/{apk[1]}.apk"
+            self.transport.push(device_id, apk[0] if in_memory else realpath(local_path), remote_path)
+            remote_paths.append(remote_path)
+
+        if len(apks) == 1:
+            output: str = execute(COMMAND_SHELL.format(device_id, shlex.quote(f"pm install -r {remote_paths[0]}")), self.transport)
+        else:
+            created: str = execute(COMMAND_SHELL.format(device_id, shlex.quote(f"pm install-create -r -S {sum(len(apk[0]) for apk in apks)}")), self.transport)
+            session = re.search(r"\[(\d+)\]", created)
+            if not session:
+                raise RuntimeError(f"install session not created: {created.strip()}")
+            script: list = [
+                f"pm install-write -S {len(apk[0])} {session.group(1)} {index}.apk {remote_path}"
+                for index, (apk, remote_path) in enumerate(zip(apks, remote_paths))
+            ]
+            script.append(f"pm install-commit {session.group(1)}")
+            output = execute(COMMAND_SHELL.format(device_id, shlex.quote("\n".join(script))), self.transport)
+
+        cleanup: list = [f"rm -f {' '.join(remote_paths)}"]
+        if "Success" in output:
+            cleanup.append(SCRIPT_DEPLOY_MARKER.format(package, digest))
+        execute(COMMAND_SHELL.format(device_id, shlex.quote("; ".join(cleanup))), self.transport)
+        if "Success" not in output:
+            raise RuntimeError(f"installation of '{package}' failed on '{device_id}': {output.strip()}")
+        return "installed"
+
+    def deploy(self, path, serials: list = None, max_workers: int = 8, timeout: float = None, force: bool = False) -> "GroupResult":
+        """
+deploy an apk (or a list of split apks) on many devices in parallel, devices already
+up to date are skipped, see 'deploy_apk'
+        """
+        return self.group(serials, max_workers, timeout).deploy_apk(path, force=force)
+
+    def logcat(self, tags: list = None, level: str = "V", regex: str = None, buffer_size: int = 10000,
+               drop_policy: str = "oldest", epoch: bool = False, device_id: str = None, binary: bool = False) -> LogcatStream:
+        """
+stream the device log as LogRecord (time, pid, tid, level, tag, message), filtered by tags,
+minimum level ('V', 'D', 'I', 'W', 'E', 'F') and a regex on the message, records are kept in
+a buffer of buffer_size records, see LogcatStream for drop_policy, with epoch=True the time is
+a float timestamp, with binary=True the device sends 'logcat -B' frames, cheaper to decode on busy
+devices, and records are BinaryLogRecord decoding tag and message only when accessed,
+close the stream (or use 'with') to stop it:
+
+    with adb.logcat(tags=["ActivityManager"], level="I") as log:
+        for record in log:
+            print(record.message)
+        """
+        device_id = self._resolve_device(device_id)
+        if binary:
+            CMD: str = COMMAND_LOGCAT_BINARY.format(device_id)
+        else:
+            CMD = COMMAND_LOGCAT.format(device_id) + " -v threadtime" + (" -v epoch" if epoch else "")
+        return LogcatStream(self.transport.open(CMD), tags, level, regex, buffer_size, drop_policy, binary)
+
+    def start_logcat(self, term: str = None, device_id: str = None, binary: bool = False):
+        """
+this function is useful if you need to debug your app in production, you can
+see the entire log of your phone, it may look very messy, so you can pass
+in the attribute 'term' a word that you want to find inside the log,
+so you can create a custom error and isolate it, press CTRL+C to stop it,
+use 'logcat' to read the log from your code, binary=True reads the log in binary format
+        """
+
+        with self.logcat(regex=term, binary=binary, device_id=device_id) as log:
+            try:
+                for record in log:
+                    print(record)
+            except KeyboardInterrupt:
+                pass
+
+    def screencap(self, as_numpy: bool = False, buffer: bytearray = None, device_id: str = None):
+        """
+capture the screen with 'exec-out screencap' in raw format, so there is no png to encode and decode,
+return a ScreenFrame (width, height, format, pixels as memoryview) or a numpy array with as_numpy=True,
+pass the buffer of the previous frame (frame.buffer) to read every frame in the same memory:
+
+    frame = adb_connector.screencap()
+    frame.width, frame.height, frame.format_name # 1080, 2400, "RGBA_8888"
+    pixels = adb_connector.screencap(as_numpy=True) # array of shape (2400, 1080, 4)
+        """
+        device_id = self._resolve_device(device_id)
+        with self.transport.open(COMMAND_SCREENCAP.format(device_id)) as stream:
+            frame = read_screencap(stream, buffer)
+        return frame.to_numpy() if as_numpy else frame
+
+    def screen_stream(self, source: str = "auto", buffer_size: int = 2, as_numpy: bool = False,
+                      size: str = None, bit_rate: int = None, device_id: str = None) -> ScreenStream:
+        """
+stream the screen frames as ScreenFrame (or numpy arrays with as_numpy=True), with 'screenrecord' h264
+when PyAV is installed, otherwise with repeated screencap, size ("720x1280") and bit_rate are passed
+to screenrecord, at most buffer_size frames are kept, dropping the oldest:
+
+    with adb_connector.screen_stream(as_numpy=True) as stream:
+        frame = stream.latest()
+        stream.stats() # {"frames": 120, "dropped": 4, "fps": 29.8, "latency_ms": {...}}
+        """
+        device_id = self._resolve_device(device_id)
+        return ScreenStream(self, device_id, source, buffer_size, as_numpy, size, bit_rate)
+
+    # VISUAL WAITS
+
+    def _frames(self, timeout: float, interval: float, stream: ScreenStream, device_id: str):
+        """
+yield the screen as (height, width, 3) arrays until timeout expires, the frames come from stream when
+provided (the freshest one each time), otherwise from a screencap every interval seconds,
+every array is overwritten by the next capture
+        """
+        device_id = self._resolve_device(device_id)
+        deadline: float = monotonic() + timeout
+        buffer = None
+        while True:
+            if stream is not None:
+                frame = stream.latest(max(deadline - monotonic(), 0))
+                if frame is None:
+                    return
+            else:
+                frame = self.screencap(buffer=buffer, device_id=device_id)
+                buffer = frame.buffer
+            yield rgb_pixels(frame)
+            remaining: float = deadline - monotonic()
+            if remaining <= 0:
+                return
+            if stream is None:
+                sleep(min(interval, remaining))
+
+    def wait_for_pixel(self, x: int, y: int, color: tuple, tolerance: int = VISUAL_WAIT_TOLERANCE, timeout: float = 10,
+                       interval: float = VISUAL_WAIT_INTERVAL, stream: ScreenStream = None, device_id: str = None) -> bool:
+        """
+wait until the pixel in x, y has color (r, g, b), every channel within tolerance,
+return False if it doesn't happen in timeout seconds
+        """
+        require_numpy("for visual waits")
+        color = numpy.array(color[:3], numpy.int16)
+        for pixels in self._frames(timeout, interval, stream, device_id):
+            if numpy.abs(pixels[y, x].astype(numpy.int16) - color).max() <= tolerance:
+                return True
+        return False
+
+    def wait_for_region_change(self, region: tuple = None, threshold: float = 0.01, tolerance: int = VISUAL_WAIT_TOLERANCE,
+                               timeout: float = 10, interval: float = VISUAL_WAIT_INTERVAL, stream: ScreenStream = None,
+                               device_id: str = None) -> bool:
+        """
+wait until more than threshold (fraction) of the pixels in region (left, top, right, bottom)
+changed from when the wait started, return False if it doesn't happen in timeout seconds
+        """
+        reference = None
+        for pixels in self._frames(timeout, interval, stream, device_id):
+            pixels = crop(pixels, region)
+            if reference is None:
+                reference = pixels.copy()
+            elif changed_fraction(pixels, reference, tolerance) > threshold:
+                return True
+        return False
+
+    def wait_for_region_stable(self, region: tuple = None, duration: float = 0.5, threshold: float = 0.001,
+                               tolerance: int = VISUAL_WAIT_TOLERANCE, timeout: float = 10, interval: float = VISUAL_WAIT_INTERVAL,
+                               stream: ScreenStream = None, device_id: str = None) -> bool:
+        """
+wait until region (left, top, right, bottom) doesn't change for duration seconds, like when an animation
+ends, at most threshold (fraction) of the pixels may change, return False if it doesn't happen in timeout seconds
+        """
+        previous = None
+        stable_since: float = monotonic()
+        for pixels in self._frames(timeout, interval, stream, device_id):
+            pixels = crop(pixels, region)
+            if previous is None or changed_fraction(pixels, previous, tolerance) > threshold:
+                previous = pixels.copy()
+                stable_since = monotonic()
+            elif monotonic() - stable_since >= duration:
+                return True
+        return False
+
+    def find_template(self, template, region: tuple = None, device_id: str = None) -> TemplateMatch:
+        """
+find the position of template (an array, like a crop of a previous screencap) in the screen,
+return the TemplateMatch (x, y, score) of the best match, its center is in x, y
+        """
+        return match_template(self.screencap(device_id=device_id), template, region)
+
+    def wait_for_template(self, template, threshold: float = 0.9, region: tuple = None, timeout: float = 10,
+                          interval: float = VISUAL_WAIT_INTERVAL, stream: ScreenStream = None, device_id: str = None) -> TemplateMatch:
+        """
+wait until template appears on the screen with a score of at least threshold,
+return the TemplateMatch or None if it doesn't happen in timeout seconds:
+
+    button = adb_connector.screencap(as_numpy=True)[100:160, 400:600]
+    ...
+    match = adb_connector.wait_for_template(button, timeout=5)
+    if match:
+        adb_connector.tap(match.x, match.y)
+        """
+        for pixels in self._frames(timeout, interval, stream, device_id):
+            match = match_template(pixels, template, region)
+            if match.score >= threshold:
+                return match
+        return None
+
+    # ACTIONS
+
+    def screenshot(self, device_id: str = None) -> bool:
+        """
+this command take a screenshot, it will not awake the screen,
+to do it, use the 'power_button' function
+        """
+        device_id = self._resolve_device(device_id)
+        return execute_keyevent(BASIC_INPUT_KEYEVENT.format(
+            device_id, KEYEVENT_SCREENSHOT), self.transport)
+
+    def power_button(self, device_id: str = None) -> bool:
+        """
+this command simulate the pressing of power button
+        """
+        device_id = self._resolve_device(device_id)
+        return execute_keyevent(BASIC_INPUT_KEYEVENT.format(
+            device_id, KEYEVENT_POWER_BUTTON), self.transport)
+
+    def call(self, phone_number: str, device_id: str = None) -> bool:
+        """
+this function start a call even if the device is locked
+        """
+        device_id = self._resolve_device(device_id)
+        return execute_intent(INTENT_CALLTO.format(device_id, phone_number), self.transport)
+
+
+    def send_sms(self, phone_number: str, message: str, device_id: str = None) -> bool:
+        """
+this function send a sms, but the phone need to be locked
+        """
+        device_id = self._resolve_device(device_id)
+        execute_intent(INTENT_SENDTO.format(device_id, phone_number, message), self.transport)
 
-        if self.open_camera(device_id=device_id,camera_type=2,frontal_camera=1 if frontal_camera else 0):
-              # zoom in events
-            for el in range(zoom_in):
-                sleep(0.5)
-                execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id, KEYEVENT_ZOOM_IN))
-            # zoom out events
-            for el in range(zoom_out):
-                sleep(0.5)
-                execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id, KEYEVENT_ZOOM_OUT))
-
-            sleep(1)
-            execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_RETURN))
-            sleep(1)
-            execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_RETURN))
-            if duration:
-                i = 0 
-                while i < duration:
-                    print(f"video will be stopped in {duration -i}")
-                    i+=1
-                    sleep(1)
-                    clear_cmd()
-
-
-            return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_RETURN))
+        status: str = self.display_status(device_id)
+        if status["is_locked"] or not status["is_awake"]:
+            print(colored(" > ERROR : the phone need to be unlocked","red"))
+            return False
         else:
+            self.key_sequence([KEYEVENT_TAB] * 3, device_id=device_id)
+            return True
+
+    def text_strategies(self, device_id: str = None, fresh: bool = False) -> list:
+        """
+the text strategies available on the device, fastest first: 'keyboard' when ADBKeyBoard is the current IME,
+'clipboard' when the Clipper app is installed and always 'input', the result is cached unless fresh is True
+        """
+        device_id = self._resolve_device(device_id)
+        if fresh or device_id not in self.text_strategy_cache:
+            output: str = execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_TEXT_STRATEGIES)), self.transport)
+            self.text_strategy_cache[device_id] = parse_text_strategies(output)
+        return self.text_strategy_cache[device_id]
+
+    def insert_text(self, text: str, device_id: str = None, strategy: str = "auto", chunk_size: int = None) -> bool:
+        """
+type text in the focused field, escaped for the device shell and split in chunks sent with few round trips,
+strategy is one of:
+
+    * auto : the fastest available (see text_strategies)
+    * keyboard : broadcast to the ADBKeyBoard IME, any character
+    * clipboard : set the clipboard with Clipper and paste, any character but it replaces the clipboard
+      ('auto' uses it only for text 'input' can't type)
+    * input : 'input text', only ascii
+
+chunk_size is the characters of each chunk (TEXT_CHUNK_SIZE for 'input', else TEXT_BROADCAST_CHUNK_SIZE)
+        """
+        device_id = self._resolve_device(device_id)
+        if not text:
+            return False
+        available: list = self.text_strategies(device_id) if strategy != "input" else ["input"]
+        res = True
+        for script in text_scripts(text, choose_text_strategy(text, strategy, available), chunk_size):
+            if execute(COMMAND_SHELL.format(device_id, shlex.quote(script)), self.transport) != "":
+                res = False
+        return res
+
+
+    # STATE WAITS
+
+    def wait_for(self, name: str, predicate, timeout: float = WAIT_TIMEOUT, interval: float = WAIT_INTERVAL,
+                 backoff: float = WAIT_BACKOFF, device_id: str = None) -> WaitResult:
+        """
+call predicate until it returns True or timeout expires, polling faster at the beginning,
+the step is recorded with name in 'wait_log', return a WaitResult (truthy if it succeeded):
+
+    adb_connector.open_browser()
+    adb_connector.wait_for("browser", lambda: adb_connector.is_activity_resumed("com.android.chrome"))
+        """
+        result: WaitResult = wait_until(predicate, timeout, interval, backoff)
+        self.wait_log.append(WaitStep(name, device_id, result.ok, result.waited, timeout))
+        return result
+
+    def wait_timings(self) -> dict:
+        """
+the waits recorded in 'wait_log' by step, like {"screen on": {"count": 3, "timeouts": 0, "mean_ms": 180.2, "max_ms": 260.9}}
+        """
+        return wait_timings(self.wait_log)
+
+    def is_screen_on(self, device_id: str = None) -> bool:
+        return self.display_status(device_id)["is_awake"]
+
+    def is_unlocked(self, device_id: str = None) -> bool:
+        return not self.display_status(device_id)["is_locked"]
+
+    def focused_window(self, device_id: str = None) -> str:
+        """the component of the window with the focus, like 'com.android.camera/.Camera'"""
+        device_id = self._resolve_device(device_id)
+        return parse_focused_window(execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_WINDOW_FOCUS)), self.transport))
+
+    def resumed_activity(self, device_id: str = None) -> str:
+        """the component of the activity in foreground, like 'com.android.chrome/com.google.android.apps.chrome.Main'"""
+        device_id = self._resolve_device(device_id)
+        return parse_resumed_activity(execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_RESUMED_ACTIVITY)), self.transport))
+
+    def is_activity_resumed(self, activity: str, device_id: str = None) -> bool:
+        """activity can be a package ('com.android.chrome') or a component ('com.android.chrome/.Main')"""
+        return is_same_activity(self.resumed_activity(device_id), activity)
+
+    def unlock_screen(self, password: str = None, device_id: str = None) -> bool:
+        """
+this function try to unlock the screen, you may provide a password if needed,
+every step goes on as soon as the device is ready
+        """
+        device_id = self._resolve_device(device_id)
+        status: dict = self.display_status(device_id)
+
+        # if already unlocked return True
+        if not status["is_locked"]:
+            return True
+
+        # if is in sleep press power button and wait for the screen
+        if not status["is_awake"]:
+            execute_keyevent(BASIC_INPUT_KEYEVENT.format(
+                device_id, KEYEVENT_POWER_BUTTON), self.transport)
+            self.wait_for("screen on", lambda: self.is_screen_on(device_id), device_id=device_id)
+
+        self.swipe(from_x=200, from_y=500, to_x=200, to_y=0, device_id=device_id)
+
+        # if password write it
+        if password:
+            sleep(UNLOCK_PIN_PAD_DELAY)
+            self.insert_text(password, device_id=device_id)
+
+        return self.wait_for("unlocked", lambda: self.is_unlocked(device_id), UNLOCK_TIMEOUT, device_id=device_id).ok
+
+    def _camera_flow(self, camera_type: int, frontal_camera: bool, zoom_in: int, zoom_out: int, duration: int, device_id: str) -> bool:
+        """
+open the camera and wait for its window, zoom, then take the photo (or start and stop the video)
+and confirm it, with one return key per step waiting for the window to change in between,
+it returns True when the camera closed
+        """
+        previous: str = self.focused_window(device_id)
+        if not self.open_camera(device_id=device_id, camera_type=camera_type, frontal_camera=frontal_camera):
+            return False
+        if not self.wait_for("camera focused", lambda: self.focused_window(device_id) not in (previous, ""), device_id=device_id):
             return False
+        camera: str = self.focused_window(device_id)
+
+        # zoom events
+        self.key_sequence([KEYEVENT_ZOOM_IN] * zoom_in + [KEYEVENT_ZOOM_OUT] * zoom_out, CAMERA_ZOOM_DELAY, device_id=device_id)
+
+        if camera_type == 2:
+            # start recording
+            execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id, KEYEVENT_RETURN), self.transport)
+            i = 0
+            while i < duration:
+                print(f"video will be stopped in {duration -i}")
+                i+=1
+                sleep(1)
+                clear_cmd()
+
+        package: str = window_package(camera)
+        window: str = camera
+        for step in CAMERA_STEPS:
+            execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id, KEYEVENT_RETURN), self.transport)
+            # a review screen can keep the same window, then the next step goes on after the timeout
+            if self.wait_for(f"camera {step}", lambda: self.focused_window(device_id) != window,
+                             timeout=CAMERA_STEP_TIMEOUT, device_id=device_id):
+                window = self.focused_window(device_id)
+                if window_package(window) != package:
+                    return True
+        return self.wait_for("camera closed", lambda: window_package(self.focused_window(device_id)) != package,
+                             device_id=device_id).ok
+
+    def take_picture(self,frontal_camera:bool=False,zoom_in:int=0,zoom_out:int=0,device_id:str="")->bool:
+        """
+this function just take photo, serveral arguments ca be provided such as:
+        * frontal_camera : <bool> if True open the frontal camera
+        * zoom_in : <int> if specified it zoom in the camera 'n' times
+        * zoom_in : <int> if specified it zoom out the camera 'n' times
+it returns True when the photo has been confirmed and the camera closed
+        """
+        device_id = self._resolve_device(device_id)
+        return self._camera_flow(1, frontal_camera, zoom_in, zoom_out, 0, device_id)
+
+
+    def video_capture(self,frontal_camera:bool=False,zoom_in:int=0,zoom_out:int=0,duration:int=0,device_id:str=""):
+        """
+call this function if you want to capture video, you can provide some data like:
+        * frontal_camera : <bool> if True open the frontal camera
+        * zoom_in : <int> if specified it zoom in the camera 'n' times
+        * zoom_in : <int> if specified it zoom out the camera 'n' times
+        * duration : <int> in seconds of the duration of the video
+it returns True when the video has been confirmed and the camera closed
+        """
+        device_id = self._resolve_device(device_id)
+        return self._camera_flow(2, frontal_camera, zoom_in, zoom_out, duration, device_id)
 
 
         
@@ -605,70 +3795,136 @@ you need to pass:
     * to_x : the x ending point on the screen
     * to_y : the y ending point on the screen
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
+        device_id = self._resolve_device(device_id)
+        if self.display_status(device_id):
+            if self.input_backend == "sendevent":
+                return self.injector(device_id).swipe(from_x, from_y, to_x, to_y)
+            return execute_keyevent(COMMAND_SWIPE.format(
+                device_id, from_x, from_y, to_x, to_y), self.transport)
         else:
-            self._basic_device_check()
-            if self.display_status():
-                if not device_id:
-                    if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                    device_id: str = self.get_first_avaiable_device()["id"]
-                return execute_keyevent(COMMAND_SWIPE.format(
-                    device_id, from_x, from_y, to_x, to_y))
-            else:
-                print(colored(" > ERROR : phone need to be awake","red"))
-                return False
-            
-    def multitap(self, x: int, y: int,times:int,milliseconds:int=0, device_id: str = None) -> bool:
+            print(colored(" > ERROR : phone need to be awake","red"))
+            return False
+
+    def multitap(self, x: int, y: int,times:int,milliseconds:int=0, device_id: str = None) -> dict:
         """
 You can use this function to tap on the screen giving x and y at very fast time providing milliseconds
-between a tap and an other and times to express how many times will be tapped
+between a tap and an other and times to express how many times will be tapped,
+the whole sequence runs on the device with a single command, if times is 0 it taps until
+interrupted (CTRL+C), it returns the achieved tap rate and timing statistics (see tap_statistics),
+the interval between two taps is milliseconds plus the time 'input tap' takes (dispatch_ms)
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
+        device_id = self._resolve_device(device_id)
+        tap: str = SCRIPT_TAP.format(x, y)
+        if milliseconds:
+            tap += "; " + SCRIPT_SLEEP.format(milliseconds / 1000)
+
         if times > 0:
-            for _ in range(times):
-                execute_keyevent(COMMAND_TAP.format(device_id, x, y))
-                sleep(milliseconds / 1000)
-        else:
-            while True:
-                execute_keyevent(COMMAND_TAP.format(device_id, x, y))
-                sleep(milliseconds / 1000)
+            script: str = SCRIPT_REPEAT.format(times, tap)
+            timestamps: list = parse_timestamps(execute(COMMAND_SHELL.format(device_id, shlex.quote(script)), self.transport))
+            return tap_statistics(timestamps[0::2], ends=timestamps[1::2])
+
+        # tap forever, the device streams back a timestamp for each tap
+        timestamps: list = []
+        stream = self.transport.open(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_FOREVER.format(tap))))
+        try:
+            for line in stream:
+                timestamps += parse_timestamps(line.decode("utf8", "replace"))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stream.close()
+        return tap_statistics(timestamps[0::2], ends=timestamps[1::2])
+
+    def precision_tap(self,instructions:list, device_id: str = None)->dict:
+        """
+tap following a list of instructions like {"x":100, "y":100, "milliseconds":250}, where milliseconds is the
+delay before the tap, the sequence is sent as a single script and the delays run on the device,
+it returns the achieved tap rate and timing statistics, error_ms compares each delay with the measured one,
+without the time the previous tap took (dispatch_ms)
+        """
+        device_id = self._resolve_device(device_id)
+        if self.input_backend == "sendevent":
+            return self.injector(device_id).precision_tap(instructions)
+
+        steps: list = []
+        for x in instructions:
+            if x["milliseconds"]:
+                steps.append(SCRIPT_SLEEP.format(x["milliseconds"] / 1000))
+            steps.append(SCRIPT_TAP.format(x["x"], x["y"]))
 
-          
+        timestamps: list = parse_timestamps(execute(COMMAND_SHELL.format(device_id, shlex.quote("\n".join(steps))), self.transport))
+        return tap_statistics(timestamps[0::2], [x["milliseconds"] for x in instructions[1:]], timestamps[1::2])
 
+    # SCRIPTS
 
-    def precision_tap(self,instructions:list, device_id: str = None)->None:
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
+    def register_script(self, name: str, script: ActionScript) -> ActionScript:
+        """
+register an ActionScript with a name, it is pushed on a device the first time it runs there:
+
+    adb_connector.register_script("login", ActionScript().tap(540, 900).text(ActionScript.arg(1)).keyevent(KEYEVENT_RETURN))
+    adb_connector.run_script("login", "my_user")
+        """
+        self.scripts[name] = script
+        return script
+
+    def script_cache(self, device_id: str = None) -> ScriptCache:
+        device_id = self._resolve_device(device_id)
+        if device_id not in self.script_caches:
+            self.script_caches[device_id] = ScriptCache(self, device_id)
+        return self.script_caches[device_id]
+
+    def run_script(self, name: str, *args, device_id: str = None) -> str:
+        """run a registered script with its arguments as a single command, return its output"""
+        if name not in self.scripts:
+            raise RuntimeError(f"script '{name}' not registered, use 'register_script' first")
+        return self.script_cache(device_id).run(self.scripts[name], args)
+
+    def cached_scripts(self, device_id: str = None) -> dict:
+        """the scripts on the device by hash, with the registered name or None when it's an old version"""
+        names: dict = {script.digest: name for name, script in self.scripts.items()}
+        return {digest: names.get(digest) for digest in self.script_cache(device_id).list()}
+
+    def evict_scripts(self, names: list = None, device_id: str = None) -> list:
+        """
+remove scripts from the device, the registered ones in names or, if not provided, the old versions
+and the scripts not registered anymore, return the removed hashes
+        """
+        cached: dict = self.cached_scripts(device_id)
+        if names is None:
+            digests: list = [digest for digest, name in cached.items() if name is None]
         else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
+            digests = [digest for digest, name in cached.items() if name in names]
+        self.script_cache(device_id).evict(digests)
+        return digests
 
-        for x in instructions:
-            sleep(x["milliseconds"] / 1000)
-            execute_keyevent(COMMAND_TAP.format(device_id,x["x"],x["y"]))
+    def record_gesture(self, duration: float = None, path: str = None, device_id: str = None) -> GestureTrace:
+        """
+record the touches on the device screen for duration seconds (until CTRL+C if not provided),
+return a GestureTrace, saved in path (a compact binary file) when provided
+        """
+        trace: GestureTrace = self.injector(device_id).record(duration)
+        if path:
+            trace.save(path)
+        return trace
+
+    def replay_gesture(self, trace, scale: bool = True, device_id: str = None) -> dict:
+        """
+replay a GestureTrace (or the path of a saved one) on the device with its original timing,
+scaled to the device screen when it was recorded on another resolution, it returns the
+timing statistics: how late each event ran compared to the recording
+        """
+        if isinstance(trace, str):
+            trace = GestureTrace.load(trace)
+        return self.injector(device_id).replay(trace, scale)
 
     def tap(self, x: int, y: int, device_id: str = None) -> bool:
         """
 You can use this function to tap on the screen giving x and y
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            return execute_keyevent(COMMAND_TAP.format(device_id, x, y))
+        device_id = self._resolve_device(device_id)
+        if self.input_backend == "sendevent":
+            return self.injector(device_id).tap(x, y)
+        return execute_keyevent(COMMAND_TAP.format(device_id, x, y), self.transport)
 
     # POWER
 
@@ -677,60 +3933,45 @@ You can use this function to tap on the screen giving x and y
 just turn off the phone, you can provide 'countdown' as timer for shutdown
         """
 
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-
-            self._basic_device_check()
-
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            if countdown:
-                i = 1
-                while i <= countdown:
-
-                    clear_cmd()
-                    if see_countdown:
-                        if countdown - i == 0:
-                            print(f" > SHUTDOWN ")
-                        else:
-                            print(f" > SHUTDOWN IN {countdown - i}")
-                    sleep(1)
-                    i += 1
+        device_id = self._resolve_device(device_id)
+        if countdown:
+            i = 1
+            while i <= countdown:
+
+                clear_cmd()
+                if see_countdown:
+                    if countdown - i == 0:
+                        print(f" > SHUTDOWN ")
+                    else:
+                        print(f" > SHUTDOWN IN {countdown - i}")
+                sleep(1)
+                i += 1
 
-            return execute_keyevent(COMMAND_TURN_OFF.format(device_id))
+        return execute_keyevent(COMMAND_TURN_OFF.format(device_id), self.transport)
 
     def reboot(self, countdown: int = 0, see_countdown: bool = True, device_id: str = None) -> bool:
         """
 reboot the phone, you can provide 'countdown' as timer for shutdown
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-            if countdown:
-                i = 1
-                while i <= countdown:
-                    clear_cmd()
-                    if see_countdown:
-                        if countdown - i == 0:
-                            print(f" > REBOOT ")
-                        else:
-                            print(f" > REBOOT IN {countdown - i}")
-                    sleep(1)
-                    i += 1
+        device_id = self._resolve_device(device_id)
+        if countdown:
+            i = 1
+            while i <= countdown:
+                clear_cmd()
+                if see_countdown:
+                    if countdown - i == 0:
+                        print(f" > REBOOT ")
+                    else:
+                        print(f" > REBOOT IN {countdown - i}")
+                sleep(1)
+                i += 1
 
-            res =execute(COMMAND_REBOOT.format(device_id))
-            if res:
-                print(res)
-                return False
-            else:
-                return True
+        res =execute(COMMAND_REBOOT.format(device_id), self.transport)
+        if res:
+            print(res)
+            return False
+        else:
+            return True
 
     def open_app(self,app_name:str, device_id:str="",)->bool:
         """
@@ -738,52 +3979,38 @@ open system app, you have to provide app_name, to see all supported app, call SU
 actually are included : 'call_log', 'calendar', 'music', 'calculator', 'email', 'browser', 'camera',
 you can use specific function like open_calendar, open_music, ecc..
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
+        device_id = self._resolve_device(device_id)
+        if self.display_status(device_id)["is_locked"]:
+            raise RuntimeError("the device need to be unlocked")
         else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-            
-            if self.display_status(device_id)["is_locked"]:
-                raise RuntimeError("the device need to be unlocked")
+            if not app_name.lower() in self.SUPPORTED_APPS:
+                print(f"app not supported yet choose one of these {list(self.SUPPORTED_APPS.keys())}")
+                return False
             else:
-                if not app_name.lower() in self.SUPPORTED_APPS:
-                    print(f"app not supported yet choose one of these {list(self.SUPPORTED_APPS.keys())}")
-                    return False
-                else:
-                    return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,self.SUPPORTED_APPS[app_name]))
+                return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,self.SUPPORTED_APPS[app_name]), self.transport)
 
     # OPEN APPS
-    def open_call_log(self,device_id:str="")->bool: return self.open_app(app_name="call_log")
+    def open_call_log(self,device_id:str="")->bool: return self.open_app(app_name="call_log",device_id=device_id)
 
-    def open_calendar(self,device_id:str="")->bool: return self.open_app(app_name="calendar")
+    def open_calendar(self,device_id:str="")->bool: return self.open_app(app_name="calendar",device_id=device_id)
         
-    def open_music(self,device_id:str="")->bool: return self.open_app(app_name="music")
+    def open_music(self,device_id:str="")->bool: return self.open_app(app_name="music",device_id=device_id)
     
-    def open_calculator(self,device_id:str="")->bool: return self.open_app(app_name="calculator")
+    def open_calculator(self,device_id:str="")->bool: return self.open_app(app_name="calculator",device_id=device_id)
 
-    def open_email(self,device_id:str="")->bool: return self.open_app(app_name="email")
+    def open_email(self,device_id:str="")->bool: return self.open_app(app_name="email",device_id=device_id)
 
-    def open_browser(self,device_id:str="")->bool: return self.open_app(app_name="browser")
+    def open_browser(self,device_id:str="")->bool: return self.open_app(app_name="browser",device_id=device_id)
 
     def open_camera(self,frontal_camera:bool=False,camera_type:int=1,device_id:str="")->bool: 
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
+        device_id = self._resolve_device(device_id)
+        if camera_type == 1:
+            return execute_intent(INTENT_TAKE_PICTURE_INTENT.format(device_id,1 if frontal_camera else 0), self.transport) 
+        elif camera_type == 2:
+            return execute_intent(INTENT_VIDEO_CAPTURE_INTENT.format(device_id,1 if frontal_camera else 0), self.transport) 
         else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            if camera_type == 1:
-                return execute_intent(INTENT_TAKE_PICTURE_INTENT.format(device_id,1 if frontal_camera else 0)) 
-            elif camera_type == 2:
-                return execute_intent(INTENT_VIDEO_CAPTURE_INTENT.format(device_id,1 if frontal_camera else 0)) 
-            else:
-                print(colored(f" > ERROR camera time {camera_type} not supported, try 1 for photo and 2 for video","red"))
-                return False
+            print(colored(f" > ERROR camera time {camera_type} not supported, try 1 for photo and 2 for video","red"))
+            return False
 
     # navigation
 
@@ -792,32 +4019,21 @@ you can use specific function like open_calendar, open_music, ecc..
 use this function to move through the device, pass the 'action' parameter('home','back','foreground'),
 you can also use specific function like home(), back() or foreground()
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
+        device_id = self._resolve_device(device_id)
+        if not self.display_status(device_id)["is_awake"]:
+            print("device need to be awake to execute naviagtion command")
+            return False
         else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            if not self.display_status(device_id)["is_awake"]:
-                print("device need to be awake to execute naviagtion command")
-                return False
+            if not action.lower() in self.SUPPORTED_NAVIGATION_ACTIONS:
+                raise RuntimeError(f"navigation action not supported yet, please choose between these: {list(self.SUPPORTED_NAVIGATION_ACTIONS.keys())}")
             else:
-                if not action.lower() in self.SUPPORTED_NAVIGATION_ACTIONS:
-                    raise RuntimeError(f"navigation action not supported yet, please choose between these: {list(self.SUPPORTED_NAVIGATION_ACTIONS.keys())}")
-                else:
-                    return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,self.SUPPORTED_NAVIGATION_ACTIONS[action]))
-                        
-    
+                return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,self.SUPPORTED_NAVIGATION_ACTIONS[action]), self.transport)
+
+
     def home(self,device_id:str="") ->bool:
         """
 simulate home gesture
         """
-
-        if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-            device_id = self.get_first_avaiable_device()["id"]
         return self.navigate("home",device_id)
 
     
@@ -825,63 +4041,47 @@ simulate home gesture
         """
 simulate back gesture
         """
-
-        if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-            device_id = self.get_first_avaiable_device()["id"]
         return self.navigate("back",device_id)
 
     def foreground_apps(self,device_id:str="") ->bool:
         """
 simulate home background app gesture
         """
-
-        if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-            device_id = self.get_first_avaiable_device()["id"]
         return self.navigate("foreground",device_id)
 
     def notification_center(self,device_id:str="") ->bool:
         """
 toggle notification center
         """
-
-        if not device_id:
-            if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-            device_id = self.get_first_avaiable_device()["id"]
         return self.navigate("notification_center",device_id)
 
     def voice_assistant(self,device_id:str="") ->bool:
         """
 open the voice assitent, the same as saying 'ok google'
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-            return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_VOICE_ASSISTANT))
+        device_id = self._resolve_device(device_id)
+        return execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_VOICE_ASSISTANT), self.transport)
+
+    def key_sequence(self, keys: list, delay_ms: float = 0, longpress: bool = False, device_id: str = None) -> bool:
+        """
+press keys (keycodes like KEYEVENT_HOME or names like 'KEYCODE_HOME') in order with a single command,
+delay_ms waits between the keys on the device, longpress keeps every key pressed:
+
+    adb_connector.key_sequence([KEYEVENT_VOLUME_UP] * 5)
+    adb_connector.key_sequence([KEYEVENT_TAB, KEYEVENT_TAB, KEYEVENT_RETURN], delay_ms=200)
+        """
+        device_id = self._resolve_device(device_id)
+        if not keys:
+            return False
+        script: str = key_sequence_script(keys, delay_ms, longpress)
+        return execute(COMMAND_SHELL.format(device_id, shlex.quote(script)), self.transport) == ""
 
     def volume_up(self,times:int=1,device_id:str="") ->bool:
         """
 this function simply raises the volume, you can pass the 'times' argument to
 specify how many times raise the volume
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            res = False
-            for n in range(times):
-                if execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_VOLUME_UP)):
-                    res = True
-            return res
+        return self.key_sequence([KEYEVENT_VOLUME_UP] * times, device_id=device_id)
 
 
     def volume_down(self,times:int=1,device_id:str="") ->bool:
@@ -889,54 +4089,717 @@ specify how many times raise the volume
 this function simply lowes the volume, you can pass the 'times' argument to
 specify how many times low the volume
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            res = False
-            for n in range(times):
-                if execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_VOLUME_DOWN)):
-                    res = True
-            return res
+        return self.key_sequence([KEYEVENT_VOLUME_DOWN] * times, device_id=device_id)
 
     def brightness_up(self,times:int=1,device_id:str="") ->bool:
         """
 this function simply raises the brightness, you can pass the 'times' argument to
 specify how many times raise the brightness
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
-        else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            res = False
-            for n in range(times):
-                if execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_BRIGHTNESS_UP)):
-                    res = True
-            return res
+        return self.key_sequence([KEYEVENT_BRIGHTNESS_UP] * times, device_id=device_id)
 
     def brightness_down(self,times:int=1,device_id:str="") ->bool:
         """
 this function simply lowes the brightness, you can pass the 'times' argument to
 specify how many times low the brightness
         """
-        if not self.get_first_avaiable_device():
-            raise RuntimeError("no device detected")
+        return self.key_sequence([KEYEVENT_BRIGHTNESS_DOWN] * times, device_id=device_id)
+
+
+class DeviceTransport:
+    """
+wrap the transport of a Device, if a command fails the device will be validated again before the next action
+    """
+
+    def __init__(self, transport, device: "Device") -> None:
+        self.transport = transport
+        self.device = device
+
+    def run(self, CMD: str) -> bytes:
+        try:
+            return self.transport.run(CMD)
+        except (CalledProcessError, RuntimeError, OSError):
+            self.device.validated = False
+            raise
+
+    def open(self, CMD: str):
+        try:
+            return self.transport.open(CMD)
+        except (CalledProcessError, RuntimeError, OSError):
+            self.device.validated = False
+            raise
+
+    def __getattr__(self, name: str):
+        return getattr(self.transport, name)
+
+
+class Device(Py_adb):
+    """
+a Py_adb bound to a single device, get it with 'Py_adb.device(serial)', it has the same
+actions of Py_adb (tap, swipe, keyevents, intents, phone_data...) but the device is validated
+only once, actions don't look for devices or check them, unless the transport reports a failure
+    """
+
+    def __init__(self, adb: Py_adb, serial: str) -> None:
+        self.__dict__.update(adb.__dict__)
+        self.serial = serial
+        transport = adb.transport.transport if isinstance(adb.transport, DeviceTransport) else adb.transport
+        self.transport = DeviceTransport(transport, self)
+        self.validated = False
+        self.validate()
+
+    def validate(self) -> None:
+        """check that the device is connected and authorized, raise RuntimeError if not"""
+        status = self.registry.status(self.serial)
+        if status is None:
+            raise RuntimeError(f"device '{self.serial}' is not connected")
+        if status != "device":
+            raise RuntimeError(f"device '{self.serial}' is '{status}'")
+        self.validated = True
+
+    def _resolve_device(self, device_id: str = None) -> str:
+        if device_id and device_id != self.serial:
+            raise RuntimeError(f"this object is bound to device '{self.serial}', use Py_adb.device('{device_id}')")
+        if not self.validated:
+            self.validate()
+        return self.serial
+
+    def device(self, serial: str = None) -> "Device":
+        return self if not serial or serial == self.serial else Device(self, serial)
+
+
+class DeviceResult(NamedTuple):
+    device_id: str
+    result: object
+    error: BaseException
+    latency: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class GroupResult:
+    """
+the results of an action run by a DeviceGroup, a DeviceResult (result, error, latency) for each device
+    """
+
+    def __init__(self, action: str, results: dict, duration: float) -> None:
+        self.action = action
+        self.results = results
+        self.duration = duration
+
+    @property
+    def succeeded(self) -> dict:
+        return {serial: res.result for serial, res in self.results.items() if res.ok}
+
+    @property
+    def failed(self) -> dict:
+        return {serial: res.error for serial, res in self.results.items() if not res.ok}
+
+    @property
+    def latencies(self) -> dict:
+        return {serial: res.latency for serial, res in self.results.items()}
+
+    def __getitem__(self, serial: str) -> DeviceResult:
+        return self.results[serial]
+
+    def __iter__(self):
+        return iter(self.results.values())
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __repr__(self) -> str:
+        return f"<GroupResult {self.action}: {len(self.succeeded)} ok, {len(self.failed)} failed in {self.duration:.2f}s>"
+
+
+class DeviceGroup:
+    """
+run the same Py_adb action on many devices in parallel, get it with 'Py_adb.group(serials)',
+every Py_adb action can be called on the group, like group.install_apk(path="app.apk") or
+group.run("tap", x=100, y=100), actions run on a pool of max_workers threads and a device
+taking more than timeout seconds is reported as failed with TimeoutError, without stalling the others
+    """
+
+    def __init__(self, adb: Py_adb, serials: list, max_workers: int = 8, timeout: float = None) -> None:
+        self.adb = adb
+        self.serials = list(dict.fromkeys(serials))
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.devices: dict = {}
+
+    def _device(self, serial: str) -> "Device":
+        if serial not in self.devices:
+            self.devices[serial] = self.adb.device(serial)
+        return self.devices[serial]
+
+    def _call(self, serial: str, action: str, args: tuple, kwargs: dict, started: dict):
+        started[serial] = perf_counter()
+        return getattr(self._device(serial), action)(*args, **kwargs)
+
+    def run(self, action: str, *args, **kwargs) -> GroupResult:
+        if not callable(getattr(Py_adb, action, None)) or action.startswith("_"):
+            raise RuntimeError(f"'{action}' is not a Py_adb action")
+
+        begin: float = perf_counter()
+        started: dict = {}
+        results: dict = {}
+        queue: deque = deque(self.serials)
+        futures: dict = {}
+        # a device that timed out keeps its thread busy, so slots are counted here and not by the pool size
+        executor = ThreadPoolExecutor(max_workers=max(len(self.serials), 1))
+        try:
+            while queue or futures:
+                while queue and len(futures) < self.max_workers:
+                    serial = queue.popleft()
+                    futures[executor.submit(self._call, serial, action, args, kwargs, started)] = serial
+                done, _ = wait(futures, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    serial = futures.pop(future)
+                    latency = perf_counter() - started.get(serial, begin)
+                    error = future.exception()
+                    results[serial] = DeviceResult(serial, None if error else future.result(), error, latency)
+                if self.timeout is None:
+                    continue
+                for future, serial in list(futures.items()):
+                    if serial in started and perf_counter() - started[serial] > self.timeout:
+                        del futures[future]
+                        results[serial] = DeviceResult(serial, None, TimeoutError(f"'{action}' timed out on '{serial}'"), perf_counter() - started[serial])
+        finally:
+            # don't wait for the devices that timed out
+            executor.shutdown(wait=False, cancel_futures=True)
+        return GroupResult(action, {serial: results[serial] for serial in self.serials}, perf_counter() - begin)
+
+    def __getattr__(self, action: str):
+        if action.startswith("_") or not callable(getattr(Py_adb, action, None)):
+            raise AttributeError(action)
+        return lambda *args, **kwargs: self.run(action, *args, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.serials)
+
+
+# ASYNCIO
+
+class AsyncStream:
+    """
+asyncio binary stream over an adb service (socket) or an adb client process,
+returned by the async transports 'open' method
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer=None, process=None) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.process = process
+
+    async def read(self, size: int = -1) -> bytes:
+        return await self.reader.read(size)
+
+    async def readexactly(self, size: int) -> bytes:
+        return await self.reader.readexactly(size)
+
+    async def readline(self) -> bytes:
+        return await self.reader.readline()
+
+    async def write(self, data: bytes) -> None:
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        if self.process:
+            if self.process.returncode is None:
+                self.process.kill()
+            await self.process.wait()
+        elif self.writer:
+            self.writer.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        line: bytes = await self.reader.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line
+
+
+class AsyncSubprocessTransport:
+    """asyncio version of SubprocessTransport, the adb client runs without blocking the event loop"""
+
+    async def run(self, CMD: str) -> bytes:
+        process = await asyncio.create_subprocess_shell(CMD, stdout=PIPE)
+        stdout, _ = await process.communicate()
+        if process.returncode:
+            raise CalledProcessError(process.returncode, CMD, stdout)
+        return stdout
+
+    async def open(self, CMD: str) -> AsyncStream:
+        process = await asyncio.create_subprocess_shell(CMD, stdin=PIPE, stdout=PIPE, stderr=DEVNULL)
+        return AsyncStream(process.stdout, process.stdin, process)
+
+
+class AsyncSocketTransport:
+    """asyncio version of SocketTransport, it talks with the adb server using non blocking sockets"""
+
+    def __init__(self, host: str = ADB_SERVER_HOST, port: int = ADB_SERVER_PORT) -> None:
+        self.host = host
+        self.port = port
+        self.fallback = AsyncSubprocessTransport()
+        self.device_features: dict = {}
+
+    async def send_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: str) -> None:
+        payload = request.encode("utf8")
+        writer.write(b"%04x" % len(payload) + payload)
+        await writer.drain()
+        status = await reader.readexactly(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message = await reader.readexactly(int(await reader.readexactly(4), 16))
+            raise RuntimeError(f"adb server error: {message.decode('utf8', 'replace')}")
+        raise RuntimeError(f"unexpected adb server response: {status!r}")
+
+    async def service(self, serial: str, service: str, host: bool = False) -> tuple:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if not host:
+                await self.send_request(reader, writer, f"host:transport:{serial}" if serial else "host:transport-any")
+            await self.send_request(reader, writer, service)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def host_block(self, request: str) -> bytes:
+        reader, writer = await self.service(None, request, host=True)
+        try:
+            return await reader.readexactly(int(await reader.readexactly(4), 16))
+        finally:
+            writer.close()
+
+    async def features(self, serial: str = None) -> set:
+        if serial not in self.device_features:
+            payload: bytes = await self.host_block(f"host-serial:{serial}:features" if serial else "host:features")
+            self.device_features[serial] = set(payload.decode("utf8").split(","))
+        return self.device_features[serial]
+
+    async def run_shell(self, serial: str, command: str, CMD: str) -> bytes:
+        errors: bytes = b""
+        v2: bool = "shell_v2" in await self.features(serial)
+        reader, writer = await self.service(serial, "shell,v2,raw:" + command if v2 else "shell:" + command + SHELL_EXIT_SUFFIX)
+        try:
+            data: bytes = await reader.read()
+        finally:
+            writer.close()
+        if v2:
+            output, errors, exit_code = parse_shell_v2(data)
         else:
-            self._basic_device_check()
-            if not device_id:
-                if len(self.list_devices()) == 0: raise RuntimeError("a device must be connected")
-                device_id = self.get_first_avaiable_device()["id"]
-
-            res = False
-            for n in range(times):
-                if execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id,KEYEVENT_BRIGHTNESS_DOWN)):
-                    res = True
-            return res
\ No newline at end of file
+            output, exit_code = parse_shell_exit(data)
+        if errors:
+            sys.stderr.write(errors.decode("utf8", "replace"))
+        if exit_code:
+            raise CalledProcessError(exit_code, CMD, output, errors)
+        return output
+
+    async def run(self, CMD: str) -> bytes:
+        serial, verb, args = split_adb_command(CMD)
+        try:
+            if verb == "devices":
+                return b"List of devices attached\n" + await self.host_block("host:devices") + b"\n"
+            service = SocketTransport.to_service(verb, args)
+            if service is None:
+                return await self.fallback.run(CMD)
+            if service.startswith("shell:"):
+                return await self.run_shell(serial, service.removeprefix("shell:"), CMD)
+            reader, writer = await self.service(serial, service)
+            try:
+                return await reader.read()
+            finally:
+                writer.close()
+        except ConnectionRefusedError:
+            return await self.fallback.run(CMD)
+
+    async def open(self, CMD: str) -> AsyncStream:
+        serial, verb, args = split_adb_command(CMD)
+        service = SocketTransport.to_service(verb, args)
+        if service is None:
+            return await self.fallback.open(CMD)
+        try:
+            return AsyncStream(*await self.service(serial, service))
+        except ConnectionRefusedError:
+            return await self.fallback.open(CMD)
+
+
+class AsyncPy_adb:
+    """
+asyncio version of Py_adb, every action is a coroutine doing non blocking I/O and the fixed delays
+use asyncio.sleep, so one event loop can drive many devices at the same time:
+
+    adb = AsyncPy_adb()
+    await asyncio.gather(*[adb.tap(100, 100, device_id=d["id"]) for d in await adb.list_devices()])
+
+when device_id is provided the device is not looked up, so calls don't query the adb server for devices,
+it has the same actions of Py_adb except the persistent shell and the sendevent backend
+    """
+
+    def __init__(self, transport=None) -> None:
+        self.transport = transport or AsyncSocketTransport()
+        self.wait_log: deque = deque(maxlen=WAIT_LOG_SIZE)
+        self.text_strategy_cache: dict = {}
+        self.SUPPORTED_APPS = {
+            "call_log":KEYEVENT_CALL_LOG,
+            "calendar":KEYEVENT_CALENDAR,
+            "music":KEYEVENT_MUSIC,
+            "calculator":KEYEVENT_CALCULATOR,
+            "email":KEYEVENT_EMAIL,
+            "browser":KEYEVENT_BROWSER,
+            "camera":KEYEVENT_CAMERA
+        }
+        self.SUPPORTED_NAVIGATION_ACTIONS = {
+            "home":KEYEVENT_HOME,
+            "back":KEYEVENT_BACK,
+            "foreground":KEYEVENT_FOREGROUND,
+            "notification_center":KEYEVENT_NOTIFICATION_CENTER
+        }
+
+    async def execute(self, CMD: str) -> str:
+        return (await self.transport.run(CMD)).decode("utf8")
+
+    async def execute_keyevent(self, CMD_KEYEVENT: str) -> bool:
+        return await self.execute(CMD_KEYEVENT) == ""
+
+    async def execute_intent(self, CMD_INTENT: str) -> bool:
+        return "Starting: Intent" in await self.execute(CMD_INTENT)
+
+    async def keyevent(self, keycode: int, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        return await self.execute_keyevent(BASIC_INPUT_KEYEVENT.format(device_id, keycode))
+
+    # ADB FUNCTIONS
+
+    async def list_devices(self) -> list:
+        return parse_device_list(await self.execute(CMD_LIST_DEVICES))
+
+    async def get_first_avaiable_device(self) -> dict:
+        devices: list = await self.list_devices()
+        return devices[0] if devices else {}
+
+    async def _resolve_device(self, device_id: str = None) -> str:
+        if device_id:
+            return device_id
+        devices: list = await self.list_devices()
+        if not devices:
+            raise RuntimeError("no device detected")
+        if any(device["status"] == "unauthorized" for device in devices):
+            print(colored(" > ERROR - some of your devices are tagged with 'unauthorized' status, this may cause problems, please get developer mode in android settings","red"))
+        return devices[0]["id"]
+
+    # PHONE DATA
+
+    async def display_status(self, device_id: str = None) -> dict:
+        device_id = await self._resolve_device(device_id)
+        return parse_display_status(await self.execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_DISPLAY_STATUS))))
+
+    async def phone_data(self, device_id: str = None) -> dict:
+        device_id = await self._resolve_device(device_id)
+        return parse_phone_data(*await asyncio.gather(
+            self.execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_DISPLAY_STATUS))),
+            self.execute(COMMAND_INFO_BATTERY.format(device_id)),
+            self.execute(COMMAND_INFO_DEVICE.format(device_id)),
+            self.execute(COMMAND_LIST_PACKAGES.format(device_id))
+        ))
+
+    async def get_apps(self, device_id: str = None) -> list:
+        return (await self.phone_data(device_id))["packages"]["list"]
+
+    # FUNCTIONS
+
+    async def install_apk(self, path: str, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        real_path: str = realpath(path)
+        if not exists(real_path):
+            raise RuntimeError(f"no such apk file: '{real_path}'")
+        return await self.execute_keyevent(COMMAND_INSTALL_APK.format(device_id, path))
+
+    async def uninstall_apk(self, package_name: str, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        print(
+            (await self.execute(COMMAND_UNINSTALL_APK.format(device_id, package_name.removeprefix("package:")))).strip())
+        return True
+
+    async def screencap(self, as_numpy: bool = False, device_id: str = None):
+        device_id = await self._resolve_device(device_id)
+        frame = parse_screencap(await self.transport.run(COMMAND_SCREENCAP.format(device_id)))
+        return frame.to_numpy() if as_numpy else frame
+
+    # ACTIONS
+
+    async def screenshot(self, device_id: str = None) -> bool:
+        return await self.keyevent(KEYEVENT_SCREENSHOT, device_id)
+
+    async def power_button(self, device_id: str = None) -> bool:
+        return await self.keyevent(KEYEVENT_POWER_BUTTON, device_id)
+
+    async def call(self, phone_number: str, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        return await self.execute_intent(INTENT_CALLTO.format(device_id, phone_number))
+
+    async def send_sms(self, phone_number: str, message: str, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        await self.execute_intent(INTENT_SENDTO.format(device_id, phone_number, message))
+
+        status: dict = await self.display_status(device_id)
+        if status["is_locked"] or not status["is_awake"]:
+            print(colored(" > ERROR : the phone need to be unlocked","red"))
+            return False
+        await self.key_sequence([KEYEVENT_TAB] * 3, device_id=device_id)
+        return True
+
+    async def text_strategies(self, device_id: str = None, fresh: bool = False) -> list:
+        device_id = await self._resolve_device(device_id)
+        if fresh or device_id not in self.text_strategy_cache:
+            output: str = await self.execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_TEXT_STRATEGIES)))
+            self.text_strategy_cache[device_id] = parse_text_strategies(output)
+        return self.text_strategy_cache[device_id]
+
+    async def insert_text(self, text: str, device_id: str = None, strategy: str = "auto", chunk_size: int = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        if not text:
+            return False
+        available: list = await self.text_strategies(device_id) if strategy != "input" else ["input"]
+        res = True
+        for script in text_scripts(text, choose_text_strategy(text, strategy, available), chunk_size):
+            if await self.execute(COMMAND_SHELL.format(device_id, shlex.quote(script))) != "":
+                res = False
+        return res
+
+    async def wait_for(self, name: str, predicate, timeout: float = WAIT_TIMEOUT, interval: float = WAIT_INTERVAL,
+                       backoff: float = WAIT_BACKOFF, device_id: str = None) -> WaitResult:
+        result: WaitResult = await async_wait_until(predicate, timeout, interval, backoff)
+        self.wait_log.append(WaitStep(name, device_id, result.ok, result.waited, timeout))
+        return result
+
+    def wait_timings(self) -> dict:
+        return wait_timings(self.wait_log)
+
+    async def is_screen_on(self, device_id: str = None) -> bool:
+        return (await self.display_status(device_id))["is_awake"]
+
+    async def is_unlocked(self, device_id: str = None) -> bool:
+        return not (await self.display_status(device_id))["is_locked"]
+
+    async def focused_window(self, device_id: str = None) -> str:
+        device_id = await self._resolve_device(device_id)
+        return parse_focused_window(await self.execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_WINDOW_FOCUS))))
+
+    async def resumed_activity(self, device_id: str = None) -> str:
+        device_id = await self._resolve_device(device_id)
+        return parse_resumed_activity(await self.execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_RESUMED_ACTIVITY))))
+
+    async def is_activity_resumed(self, activity: str, device_id: str = None) -> bool:
+        return is_same_activity(await self.resumed_activity(device_id), activity)
+
+    async def unlock_screen(self, password: str = None, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        status: dict = await self.display_status(device_id)
+        if not status["is_locked"]:
+            return True
+
+        if not status["is_awake"]:
+            await self.power_button(device_id)
+            await self.wait_for("screen on", lambda: self.is_screen_on(device_id), device_id=device_id)
+
+        await self.swipe(from_x=200, from_y=500, to_x=200, to_y=0, device_id=device_id)
+
+        if password:
+            await asyncio.sleep(UNLOCK_PIN_PAD_DELAY)
+            await self.insert_text(password, device_id=device_id)
+
+        return (await self.wait_for("unlocked", lambda: self.is_unlocked(device_id), UNLOCK_TIMEOUT, device_id=device_id)).ok
+
+    async def _camera_flow(self, camera_type: int, frontal_camera: bool, zoom_in: int, zoom_out: int, duration: int, device_id: str) -> bool:
+        previous: str = await self.focused_window(device_id)
+        if not await self.open_camera(frontal_camera=frontal_camera, camera_type=camera_type, device_id=device_id):
+            return False
+
+        async def focused() -> bool:
+            return await self.focused_window(device_id) not in (previous, "")
+
+        if not await self.wait_for("camera focused", focused, device_id=device_id):
+            return False
+        camera: str = await self.focused_window(device_id)
+
+        await self.key_sequence([KEYEVENT_ZOOM_IN] * zoom_in + [KEYEVENT_ZOOM_OUT] * zoom_out, CAMERA_ZOOM_DELAY, device_id=device_id)
+
+        if camera_type == 2:
+            await self.keyevent(KEYEVENT_RETURN, device_id)
+            await asyncio.sleep(duration)
+
+        package: str = window_package(camera)
+        window: str = camera
+
+        async def changed() -> bool:
+            return await self.focused_window(device_id) != window
+
+        async def closed() -> bool:
+            return window_package(await self.focused_window(device_id)) != package
+
+        for step in CAMERA_STEPS:
+            await self.keyevent(KEYEVENT_RETURN, device_id)
+            if await self.wait_for(f"camera {step}", changed, timeout=CAMERA_STEP_TIMEOUT, device_id=device_id):
+                window = await self.focused_window(device_id)
+                if window_package(window) != package:
+                    return True
+        return (await self.wait_for("camera closed", closed, device_id=device_id)).ok
+
+    async def take_picture(self, frontal_camera: bool = False, zoom_in: int = 0, zoom_out: int = 0, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        return await self._camera_flow(1, frontal_camera, zoom_in, zoom_out, 0, device_id)
+
+    async def video_capture(self, frontal_camera: bool = False, zoom_in: int = 0, zoom_out: int = 0, duration: int = 0, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        return await self._camera_flow(2, frontal_camera, zoom_in, zoom_out, duration, device_id)
+
+    # GESTURES
+
+    async def swipe(self, from_x: int, from_y: int, to_x: int, to_y: int, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        return await self.execute_keyevent(COMMAND_SWIPE.format(device_id, from_x, from_y, to_x, to_y))
+
+    async def tap(self, x: int, y: int, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        return await self.execute_keyevent(COMMAND_TAP.format(device_id, x, y))
+
+    async def multitap(self, x: int, y: int, times: int, milliseconds: int = 0, device_id: str = None,
+                       stop: asyncio.Event = None) -> dict:
+        """
+with times 0 it taps until stop is set and returns the statistics, cancelling the task stops
+the taps too but the cancellation is raised as usual, without statistics
+        """
+        device_id = await self._resolve_device(device_id)
+        tap: str = SCRIPT_TAP.format(x, y)
+        if milliseconds:
+            tap += "; " + SCRIPT_SLEEP.format(milliseconds / 1000)
+
+        if times > 0:
+            timestamps: list = parse_timestamps(await self.execute(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_REPEAT.format(times, tap)))))
+            return tap_statistics(timestamps[0::2], ends=timestamps[1::2])
+
+        timestamps: list = []
+        stream: AsyncStream = await self.transport.open(COMMAND_SHELL.format(device_id, shlex.quote(SCRIPT_FOREVER.format(tap))))
+
+        async def read() -> None:
+            async for line in stream:
+                timestamps.extend(parse_timestamps(line.decode("utf8", "replace")))
+
+        tasks: set = {asyncio.ensure_future(read())}
+        if stop is not None:
+            tasks.add(asyncio.ensure_future(stop.wait()))
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await stream.close()
+        return tap_statistics(timestamps[0::2], ends=timestamps[1::2])
+
+    async def precision_tap(self, instructions: list, device_id: str = None) -> dict:
+        device_id = await self._resolve_device(device_id)
+        steps: list = []
+        for x in instructions:
+            if x["milliseconds"]:
+                steps.append(SCRIPT_SLEEP.format(x["milliseconds"] / 1000))
+            steps.append(SCRIPT_TAP.format(x["x"], x["y"]))
+        timestamps: list = parse_timestamps(await self.execute(COMMAND_SHELL.format(device_id, shlex.quote("\n".join(steps)))))
+        return tap_statistics(timestamps[0::2], [x["milliseconds"] for x in instructions[1:]], timestamps[1::2])
+
+    # POWER
+
+    async def turn_off(self, countdown: int = 0, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        await asyncio.sleep(countdown)
+        return await self.execute_keyevent(COMMAND_TURN_OFF.format(device_id))
+
+    async def reboot(self, countdown: int = 0, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        await asyncio.sleep(countdown)
+        res: str = await self.execute(COMMAND_REBOOT.format(device_id))
+        if res:
+            print(res)
+            return False
+        return True
+
+    async def open_app(self, app_name: str, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        if (await self.display_status(device_id))["is_locked"]:
+            raise RuntimeError("the device need to be unlocked")
+        if not app_name.lower() in self.SUPPORTED_APPS:
+            print(f"app not supported yet choose one of these {list(self.SUPPORTED_APPS.keys())}")
+            return False
+        return await self.keyevent(self.SUPPORTED_APPS[app_name], device_id)
+
+    # OPEN APPS
+    async def open_call_log(self, device_id: str = None) -> bool: return await self.open_app("call_log", device_id)
+
+    async def open_calendar(self, device_id: str = None) -> bool: return await self.open_app("calendar", device_id)
+
+    async def open_music(self, device_id: str = None) -> bool: return await self.open_app("music", device_id)
+
+    async def open_calculator(self, device_id: str = None) -> bool: return await self.open_app("calculator", device_id)
+
+    async def open_email(self, device_id: str = None) -> bool: return await self.open_app("email", device_id)
+
+    async def open_browser(self, device_id: str = None) -> bool: return await self.open_app("browser", device_id)
+
+    async def open_camera(self, frontal_camera: bool = False, camera_type: int = 1, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        if camera_type == 1:
+            return await self.execute_intent(INTENT_TAKE_PICTURE_INTENT.format(device_id, 1 if frontal_camera else 0))
+        elif camera_type == 2:
+            return await self.execute_intent(INTENT_VIDEO_CAPTURE_INTENT.format(device_id, 1 if frontal_camera else 0))
+        print(colored(f" > ERROR camera time {camera_type} not supported, try 1 for photo and 2 for video","red"))
+        return False
+
+    # navigation
+
+    async def navigate(self, action: str, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        if not (await self.display_status(device_id))["is_awake"]:
+            print("device need to be awake to execute naviagtion command")
+            return False
+        if not action.lower() in self.SUPPORTED_NAVIGATION_ACTIONS:
+            raise RuntimeError(f"navigation action not supported yet, please choose between these: {list(self.SUPPORTED_NAVIGATION_ACTIONS.keys())}")
+        return await self.keyevent(self.SUPPORTED_NAVIGATION_ACTIONS[action], device_id)
+
+    async def home(self, device_id: str = None) -> bool: return await self.navigate("home", device_id)
+
+    async def back(self, device_id: str = None) -> bool: return await self.navigate("back", device_id)
+
+    async def foreground_apps(self, device_id: str = None) -> bool: return await self.navigate("foreground", device_id)
+
+    async def notification_center(self, device_id: str = None) -> bool: return await self.navigate("notification_center", device_id)
+
+    async def voice_assistant(self, device_id: str = None) -> bool:
+        return await self.keyevent(KEYEVENT_VOICE_ASSISTANT, device_id)
+
+    async def key_sequence(self, keys: list, delay_ms: float = 0, longpress: bool = False, device_id: str = None) -> bool:
+        device_id = await self._resolve_device(device_id)
+        if not keys:
+            return False
+        return await self.execute(COMMAND_SHELL.format(device_id, shlex.quote(key_sequence_script(keys, delay_ms, longpress)))) == ""
+
+    async def _repeat_keyevent(self, keycode: int, times: int, device_id: str) -> bool:
+        return await self.key_sequence([keycode] * times, device_id=device_id)
+
+    async def volume_up(self, times: int = 1, device_id: str = None) -> bool:
+        return await self._repeat_keyevent(KEYEVENT_VOLUME_UP, times, device_id)
+
+    async def volume_down(self, times: int = 1, device_id: str = None) -> bool:
+        return await self._repeat_keyevent(KEYEVENT_VOLUME_DOWN, times, device_id)
+
+    async def brightness_up(self, times: int = 1, device_id: str = None) -> bool:
+        return await self._repeat_keyevent(KEYEVENT_BRIGHTNESS_UP, times, device_id)
+
+    async def brightness_down(self, times: int = 1, device_id: str = None) -> bool:
+        return await self._repeat_keyevent(KEYEVENT_BRIGHTNESS_DOWN, times, device_id)
@@ -0,0 +1,126 @@
+"""a fake adb server speaking the host protocol on localhost, for the transport tests"""
+
+import socket
+import struct
+from threading import Thread
+
+import py_adb
+
+
+class FakeAdbServer:
+    """
+serve the adb host protocol on a free localhost port: devices maps serials to their features
+(like {"emulator-5554": "shell_v2,cmd"}), commands maps shell commands to (stdout, stderr, exit code)
+and exec maps exec commands to their output, pushed files end up in files and every request in requests
+    """
+
+    def __init__(self, devices: dict, commands: dict = None, exec: dict = None) -> None:
+        self.devices = devices
+        self.commands = commands or {}
+        self.exec = exec or {}
+        self.files: dict = {}
+        self.requests: list = []
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port: int = self.listener.getsockname()[1]
+        self.thread = Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def transport(self) -> py_adb.SocketTransport:
+        return py_adb.SocketTransport(port=self.port, timeout=5)
+
+    def close(self) -> None:
+        self.listener.close()
+
+    # PROTOCOL
+
+    @staticmethod
+    def _recv(conn: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+    def _request(self, conn: socket.socket) -> str:
+        request = self._recv(conn, int(self._recv(conn, 4), 16)).decode()
+        self.requests.append(request)
+        return request
+
+    @staticmethod
+    def _okay(conn: socket.socket, block: bytes = None) -> None:
+        conn.sendall(b"OKAY" + (b"%04x" % len(block) + block if block is not None else b""))
+
+    @staticmethod
+    def _fail(conn: socket.socket, message: str) -> None:
+        conn.sendall(b"FAIL" + b"%04x" % len(message) + message.encode())
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn:
+            try:
+                self._dispatch(conn)
+            except EOFError:
+                pass
+
+    def _dispatch(self, conn: socket.socket) -> None:
+        request = self._request(conn)
+        if request == "host:devices":
+            return self._okay(conn, "".join(f"{serial}\tdevice\n" for serial in self.devices).encode())
+        if request.startswith("host-serial:") and request.endswith(":features"):
+            serial = request.removeprefix("host-serial:").removesuffix(":features")
+            if serial not in self.devices:
+                return self._fail(conn, f"device '{serial}' not found")
+            return self._okay(conn, self.devices[serial].encode())
+        if request.startswith("host:transport:"):
+            serial = request.removeprefix("host:transport:")
+            if serial not in self.devices:
+                return self._fail(conn, f"device '{serial}' not found")
+            self._okay(conn)
+            return self._service(conn, self._request(conn))
+        return self._fail(conn, f"unknown host service {request}")
+
+    def _service(self, conn: socket.socket, service: str) -> None:
+        if service.startswith("shell,v2,raw:"):
+            out, err, code = self.commands.get(service.removeprefix("shell,v2,raw:"), (b"", b"sh: not found\n", 127))
+            self._okay(conn)
+            for kind, payload in ((1, out), (2, err)):
+                if payload:
+                    conn.sendall(struct.pack("<BI", kind, len(payload)) + payload)
+            conn.sendall(struct.pack("<BI", 3, 1) + bytes([code]))
+        elif service.startswith("shell:"):
+            # shell v1: stderr merged in the output, the exit code is printed by the suffix of the command
+            command = service.removeprefix("shell:").removesuffix(py_adb.SHELL_EXIT_SUFFIX)
+            out, err, code = self.commands.get(command, (b"", b"sh: not found\n", 127))
+            self._okay(conn)
+            conn.sendall(out + err + f"\n{py_adb.SHELL_SENTINEL} 0 {code}\n".encode())
+        elif service.startswith("exec:"):
+            self._okay(conn)
+            conn.sendall(self.exec.get(service.removeprefix("exec:"), b""))
+        elif service == "sync:":
+            self._okay(conn)
+            self._sync(conn)
+        else:
+            self._fail(conn, f"unknown device service {service}")
+
+    def _sync(self, conn: socket.socket) -> None:
+        command, length = struct.unpack("<4sI", self._recv(conn, 8))
+        assert command == b"SEND"
+        path = self._recv(conn, length).decode().rsplit(",", 1)[0]
+        data = b""
+        while True:
+            command, length = struct.unpack("<4sI", self._recv(conn, 8))
+            if command == b"DONE":
+                break
+            data += self._recv(conn, length)
+        self.files[path] = data
+        conn.sendall(b"OKAY" + struct.pack("<I", 0))
+        self._recv(conn, 8)
@@ -0,0 +1,92 @@
+import struct
+from zipfile import ZipFile
+
+import pytest
+
+import py_adb
+
+
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+
+
+def utf8_length(length: int) -> bytes:
+    # lengths over 127 take two bytes, with the high bit set in the first one
+    return bytes([length]) if length < 0x80 else bytes([0x80 | length >> 8, length & 0xff])
+
+
+def string_pool(strings: list, utf8: bool) -> bytes:
+    offsets: list = []
+    body = b""
+    for string in strings:
+        offsets.append(len(body))
+        if utf8:
+            encoded = string.encode()
+            body += utf8_length(len(string)) + utf8_length(len(encoded)) + encoded + b"\0"
+        else:
+            body += struct.pack("<H", len(string)) + string.encode("utf-16-le") + b"\0\0"
+    body += bytes(-len(body) % 4)
+    strings_start = 28 + 4 * len(strings)
+    header = struct.pack("<HHIIIIII", 0x0001, 28, strings_start + len(body), len(strings), 0, (1 << 8) if utf8 else 0, strings_start, 0)
+    return header + b"".join(struct.pack("<I", offset) for offset in offsets) + body
+
+
+def binary_manifest(package: str, version_code: int, version_name: str, split: str = None, utf8: bool = False,
+                    named_attributes: bool = True) -> bytes:
+    """
+a minimal binary AndroidManifest.xml: a string pool, the resource map and the <manifest> start tag,
+release builds often strip the android attribute names, then only the resource map gives them
+    """
+    strings = ["versionCode" if named_attributes else "", "versionName" if named_attributes else "", "package", "split",
+               "manifest", package, version_name, split or ""]
+    resource_map = struct.pack("<HHI", 0x0180, 8, 16) + struct.pack("<II", 0x0101021b, 0x0101021c)
+    # namespace, name, raw value, size, type, data
+    attributes = [(0xffffffff, 0, 0xffffffff, TYPE_INT_DEC, version_code), (0xffffffff, 1, 6, TYPE_STRING, 6),
+                  (0xffffffff, 2, 5, TYPE_STRING, 5)]
+    if split:
+        attributes.append((0xffffffff, 3, 7, TYPE_STRING, 7))
+    attribute_data = b"".join(struct.pack("<IIIHxBI", namespace, name, raw, 8, kind, value) for namespace, name, raw, kind, value in attributes)
+    extension = struct.pack("<IIHHHHHH", 0xffffffff, 4, 20, 20, len(attributes), 0, 0, 0)
+    element = struct.pack("<HHIII", 0x0102, 16, 16 + len(extension) + len(attribute_data), 1, 0xffffffff) + extension + attribute_data
+    body = string_pool(strings, utf8) + resource_map + element
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(body)) + body
+
+
+def write_apk(path, manifest: bytes) -> str:
+    with ZipFile(path, "w") as apk:
+        apk.writestr("AndroidManifest.xml", manifest)
+        apk.writestr("classes.dex", b"dex\n035\0" + bytes(1000))
+    return str(path)
+
+
+@pytest.mark.parametrize("utf8", [False, True])
+@pytest.mark.parametrize("named_attributes", [True, False])
+def test_read_apk_manifest(tmp_path, utf8, named_attributes):
+    path = write_apk(tmp_path / "app.apk", binary_manifest("com.example.app", 4200, "4.2", utf8=utf8, named_attributes=named_attributes))
+    assert py_adb.read_apk_manifest(path) == {"package": "com.example.app", "version_code": 4200, "version_name": "4.2", "split": None}
+
+
+def test_read_split_apk_manifest(tmp_path):
+    path = write_apk(tmp_path / "split.apk", binary_manifest("com.example.app", 7, "1.0", split="config.arm64_v8a"))
+    assert py_adb.read_apk_manifest(path)["split"] == "config.arm64_v8a"
+
+
+def test_long_utf8_strings(tmp_path):
+    package = "com.example." + "a" * 300
+    path = write_apk(tmp_path / "long.apk", binary_manifest(package, 1, "1", utf8=True))
+    assert py_adb.read_apk_manifest(path)["package"] == package
+
+
+def test_load_apk_reads_once_until_changed(tmp_path):
+    path = write_apk(tmp_path / "app.apk", binary_manifest("com.example.app", 1, "1.0"))
+    data, digest, manifest = py_adb.load_apk(path)
+    assert py_adb.load_apk(path)[0] is data
+    assert manifest["version_code"] == 1
+    write_apk(tmp_path / "app.apk", binary_manifest("com.example.app", 2, "2.0", utf8=True))
+    assert py_adb.load_apk(path)[1] != digest
+    assert py_adb.load_apk(path)[2]["version_code"] == 2
+
+
+def test_load_apk_missing_file(tmp_path):
+    with pytest.raises(RuntimeError, match="no such apk"):
+        py_adb.load_apk(str(tmp_path / "missing.apk"))
@@ -0,0 +1,128 @@
+import struct
+
+import pytest
+
+import py_adb
+
+
+GETEVENT_INFO = """add device 1: /dev/input/event0
+  name:     "gpio-keys"
+  events:
+    KEY (0001): 0072  0073  0074
+add device 2: /dev/input/event2
+  name:     "fts_ts"
+  events:
+    KEY (0001): 014a
+    ABS (0003): 002f  : value 0, min 0, max 9, fuzz 0, flat 0, resolution 0
+                0035  : value 0, min 0, max 10799, fuzz 0, flat 0, resolution 0
+                0036  : value 0, min 0, max 23999, fuzz 0, flat 0, resolution 0
+                0039  : value 0, min 0, max 65535, fuzz 0, flat 0, resolution 0
+  input props:
+    INPUT_PROP_DIRECT
+"""
+
+
+class DeviceTransport:
+    def __init__(self, abi: str) -> None:
+        self.abi = abi
+
+    def run(self, CMD: str) -> bytes:
+        if "getevent -p" in CMD:
+            return GETEVENT_INFO.encode()
+        if "wm size" in CMD:
+            return b"Physical size: 1080x2400\n"
+        if "cpu.abi" in CMD:
+            return f"{self.abi}\n".encode()
+        return b""
+
+
+def sample_trace() -> py_adb.GestureTrace:
+    trace = py_adb.GestureTrace(1080, 2400)
+    trace.append(0, 100, 200, py_adb.GESTURE_DOWN)
+    trace.append(16000, 150, 260, py_adb.GESTURE_MOVE)
+    trace.append(32000, 1079, 2399, py_adb.GESTURE_MOVE)
+    trace.append(48000, 1079, 2399, py_adb.GESTURE_UP)
+    return trace
+
+
+def to_getevent_lines(injector: py_adb.SendeventInjector, frames: list, interval_us: int = 16000) -> list:
+    """decode injector buffers in the 'getevent -t' lines the kernel would report for them"""
+    lines: list = []
+    for index, frame in enumerate(frames):
+        time_us: int = 1000000 + index * interval_us
+        for _, _, kind, code, value in injector.event_struct.iter_unpack(frame):
+            lines.append(f"[{time_us // 1000000:8d}.{time_us % 1000000:06d}] {kind:04x} {code:04x} {value & 0xffffffff:08x}\n")
+    return lines
+
+
+def test_trace_round_trip(tmp_path):
+    trace = sample_trace()
+    path = tmp_path / "swipe.pygt"
+    trace.save(str(path))
+    loaded = py_adb.GestureTrace.load(str(path))
+    assert (loaded.width, loaded.height) == (1080, 2400)
+    assert list(loaded) == list(trace)
+    assert loaded.duration == 0.048
+
+
+def test_trace_format_is_little_endian():
+    data = sample_trace().to_bytes()
+    assert data[:4] == py_adb.GESTURE_TRACE_MAGIC
+    assert struct.unpack_from("<4sHIII", data) == (py_adb.GESTURE_TRACE_MAGIC, 1, 1080, 2400, 4)
+    assert len(data) == py_adb.GESTURE_TRACE_HEADER.size + 4 * (4 + 4 + 4 + 1)
+
+
+def test_trace_rejects_other_files():
+    with pytest.raises(RuntimeError, match="not a gesture trace"):
+        py_adb.GestureTrace.from_bytes(b"PK\x03\x04" + bytes(20))
+
+
+def test_trace_scaled_keeps_the_corners():
+    scaled = sample_trace().scaled(720, 1600)
+    assert (scaled.width, scaled.height) == (720, 1600)
+    assert list(scaled.times) == list(sample_trace().times)
+    assert (scaled.xs[0], scaled.ys[0]) == (67, 133)
+    assert (scaled.xs[-1], scaled.ys[-1]) == (719, 1599)
+
+
+@pytest.mark.parametrize("abi, size", [("arm64-v8a", 24), ("armeabi-v7a", 16), ("x86", 16)])
+def test_injector_picks_the_touchscreen_and_input_event_size(abi, size):
+    injector = py_adb.SendeventInjector("serial", DeviceTransport(abi))
+    assert injector.node == "/dev/input/event2"
+    assert injector.event_struct.size == size
+    # explicit little endian, no native alignment
+    assert injector.events((py_adb.EV_ABS, py_adb.ABS_MT_TRACKING_ID, -1))[-4:] == b"\xff\xff\xff\xff"
+    assert injector.events((py_adb.EV_ABS, py_adb.ABS_MT_POSITION_X, 0x0102))[-6:] == b"\x35\x00\x02\x01\x00\x00"
+
+
+def test_injected_frames_parse_back_to_the_same_gesture():
+    injector = py_adb.SendeventInjector("serial", DeviceTransport("arm64-v8a"))
+    frames = [injector.touch_down(100, 200), injector.touch_move(150, 260), injector.touch_move(1079, 2399), injector.touch_up()]
+    trace = py_adb.parse_touch_events(to_getevent_lines(injector, frames), injector.to_screen, injector.width, injector.height)
+    assert list(trace) == list(sample_trace())
+
+
+def test_parse_touch_events_ignores_other_fingers_and_noise():
+    lines = [
+        "add device 2: /dev/input/event2\n",
+        "[   10.000000] 0003 0039 00000005\n",
+        "[   10.000000] 0003 0035 00000064\n",
+        "[   10.000000] 0003 0036 000000c8\n",
+        "[   10.000000] 0000 0000 00000000\n",
+        # a second finger moves, the first one doesn't
+        "[   10.010000] 0003 002f 00000001\n",
+        "[   10.010000] 0003 0035 00000200\n",
+        "[   10.010000] 0000 0000 00000000\n",
+        "[   10.020000] 0003 002f 00000000\n",
+        "[   10.020000] 0003 0039 ffffffff\n",
+        "[   10.020000] 0000 0000 00000000\n",
+    ]
+    trace = py_adb.parse_touch_events(lines, lambda x, y: (x, y), 1080, 2400)
+    assert list(trace) == [(0, 100, 200, py_adb.GESTURE_DOWN), (20000, 100, 200, py_adb.GESTURE_UP)]
+
+
+def test_replay_statistics():
+    statistics = py_adb.replay_statistics([0, 10_500_000, 21_000_000], [0, 10, 20])
+    assert statistics["events"] == 3
+    assert statistics["lateness_ms"]["max"] == pytest.approx(1.0)
+    assert py_adb.replay_statistics([], [])["lateness_ms"] is None
@@ -0,0 +1,81 @@
+import struct
+from io import BytesIO
+
+import pytest
+
+import py_adb
+
+
+class ChunkedStream:
+    """a stream returning at most size bytes per read, like a pipe under load"""
+
+    def __init__(self, data: bytes, size: int) -> None:
+        self.data = BytesIO(data)
+        self.size = size
+
+    def readinto(self, buffer) -> int:
+        chunk = self.data.read(min(self.size, len(buffer)))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def frame(priority: int, tag: str, message: str, pid: int = 100, tid: int = 101, sec: int = 1700000000,
+          nsec: int = 500000000, log_id: int = 0, header_size: int = 28) -> bytes:
+    payload = bytes([priority]) + tag.encode() + b"\0" + message.encode() + b"\0"
+    if header_size == 0:
+        # logger_entry v1: no header size nor log id
+        return struct.pack("<HHiIII", len(payload), 0, pid, tid, sec, nsec) + payload
+    header = struct.pack("<HHiIIII", len(payload), header_size, pid, tid, sec, nsec, log_id)
+    return header + bytes(header_size - len(header)) + payload
+
+
+FRAMES = [
+    frame(4, "ActivityManager", "Start proc 1234:com.example/u0a100"),
+    frame(3, "chatty", "uid=1000 expire 3 lines", log_id=3),
+    frame(6, "AndroidRuntime", "FATAL EXCEPTION: main\njava.lang.RuntimeException"),
+    frame(5, "città", "non ascii tag", header_size=24),
+    frame(4, "old", "v1 header", header_size=0),
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_records_survive_any_read_size(chunk_size):
+    records = list(py_adb.iter_binary_logcat(ChunkedStream(b"".join(FRAMES), chunk_size), buffer_size=256))
+    assert [(record.level, record.tag) for record in records] == [
+        ("I", "ActivityManager"), ("D", "chatty"), ("E", "AndroidRuntime"), ("W", "città"), ("I", "old")
+    ]
+    assert records[0].message == "Start proc 1234:com.example/u0a100"
+    assert records[0].time == 1700000000.5
+    assert (records[0].pid, records[0].tid) == (100, 101)
+    assert records[1].log_id == 3
+    assert records[2].message == "FATAL EXCEPTION: main\njava.lang.RuntimeException"
+
+
+def test_filters_skip_records():
+    data = b"".join(FRAMES)
+    assert [record.tag for record in py_adb.iter_binary_logcat(BytesIO(data), min_priority=5)] == ["AndroidRuntime", "città"]
+    tags = {"chatty".encode(), "città".encode()}
+    assert [record.tag for record in py_adb.iter_binary_logcat(BytesIO(data), tags=tags)] == ["chatty", "città"]
+
+
+def test_truncated_last_frame_is_dropped():
+    data = b"".join(FRAMES[:2])
+    assert len(list(py_adb.iter_binary_logcat(BytesIO(data[:-5])))) == 1
+
+
+def test_frame_bigger_than_the_buffer():
+    with pytest.raises(RuntimeError, match="bigger than the buffer"):
+        list(py_adb.iter_binary_logcat(BytesIO(frame(4, "tag", "x" * 200)), buffer_size=64))
+
+
+def test_binary_record_matches_the_text_record():
+    record = next(py_adb.iter_binary_logcat(BytesIO(FRAMES[0])))
+    assert record.to_record() == py_adb.LogRecord(1700000000.5, 100, 101, "I", "ActivityManager", "Start proc 1234:com.example/u0a100")
+
+
+def test_parse_logcat_line():
+    assert py_adb.parse_logcat_line("10-18 12:00:01.123  1000  2000 I ActivityManager: Start proc 1234\n") == py_adb.LogRecord(
+        "10-18 12:00:01.123", 1000, 2000, "I", "ActivityManager", "Start proc 1234"
+    )
+    assert py_adb.parse_logcat_line("1700000000.500  1000  2000 W Tag with spaces : message: with colon").tag == "Tag with spaces"
+    assert py_adb.parse_logcat_line("--------- beginning of main") is None
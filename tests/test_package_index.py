@@ -0,0 +1,123 @@
+import re
+import shlex
+from types import SimpleNamespace
+
+import pytest
+
+import py_adb
+
+
+class PackageManager:
+    """the package manager of a fake device, answering 'dumpsys package changes' and 'pm list packages'"""
+
+    def __init__(self, packages: dict) -> None:
+        # name: (version code, uid)
+        self.packages = dict(packages)
+        self.sequence = 5
+        self.changes: dict = {}
+        self.queries: list = []
+
+    def change(self, name: str, version: tuple = None) -> None:
+        if version is None:
+            del self.packages[name]
+        else:
+            self.packages[name] = version
+        self.changes[name] = self.sequence
+        self.sequence += 1
+
+    def reboot(self) -> None:
+        self.sequence, self.changes = 0, {}
+
+    def run(self, CMD: str) -> bytes:
+        _, _, args = py_adb.split_adb_command(CMD)
+        if args == "dumpsys package changes":
+            lines = ["Package Changes:", f"  Sequence number={self.sequence}", "  User 0:"]
+            lines += [f"    seq={seq}, package={name}" for name, seq in self.changes.items()]
+            return ("\n".join(lines) + "\n").encode()
+        script: str = shlex.split(args)[0]
+        output: list = []
+        # like pm, a filter matches every package containing it
+        for command in script.split("; "):
+            self.queries.append(command)
+            match = re.search(r"-U (\S*) 2>", command)
+            name_filter: str = shlex.split(match.group(1))[0] if match.group(1) else ""
+            output += [f"package:{name} versionCode:{version} uid:{uid}" for name, (version, uid) in sorted(self.packages.items())
+                       if name_filter in name]
+        return ("\n".join(output) + "\n").encode()
+
+
+@pytest.fixture
+def device():
+    return PackageManager({"com.android.chrome": (1, 10010), "com.example.app": (3, 10100), "com.example.app.debug": (3, 10101)})
+
+
+@pytest.fixture
+def index(device):
+    return py_adb.PackageIndex(SimpleNamespace(transport=device), "serial", max_age=0)
+
+
+def test_first_sync_reads_everything(index):
+    assert index.sync()["added"] == {"com.android.chrome", "com.example.app", "com.example.app.debug"}
+    assert index.get("com.example.app") == py_adb.PackageInfo("com.example.app", 3, 10100)
+    assert index.get("com.missing") is None
+
+
+def test_sync_without_changes_does_not_list_packages(index, device):
+    index.sync()
+    device.queries.clear()
+    assert index.sync() == {"added": set(), "removed": set(), "updated": set()}
+    assert device.queries == []
+
+
+def test_sync_reads_only_the_changed_packages(index, device):
+    index.sync()
+    device.queries.clear()
+    device.change("com.example.app", (4, 10100))
+    device.change("com.android.chrome")
+    device.change("com.new.game", (1, 10200))
+    assert index.sync() == {"added": {"com.new.game"}, "removed": {"com.android.chrome"}, "updated": {"com.example.app"}}
+    assert len(device.queries) == 3
+    assert not any("com.example.app.debug" in query for query in device.queries)
+    # the debug package matched the 'com.example.app' filter but it did not change
+    assert index.get("com.example.app.debug") == py_adb.PackageInfo("com.example.app.debug", 3, 10101)
+    assert index.list() == ["com.example.app", "com.example.app.debug", "com.new.game"]
+
+
+def test_changes_before_the_last_sync_are_ignored(index, device):
+    device.change("com.example.app", (4, 10100))
+    index.sync()
+    device.change("com.new.game", (1, 10200))
+    assert index.sync() == {"added": {"com.new.game"}, "removed": set(), "updated": set()}
+
+
+def test_reinstall_with_the_same_version_is_not_an_update(index, device):
+    index.sync()
+    device.change("com.example.app", (3, 10100))
+    assert index.sync()["updated"] == set()
+
+
+def test_reboot_rebuilds_the_index(index, device):
+    index.sync()
+    device.reboot()
+    device.change("com.example.app.debug")
+    assert index.sync() == {"added": set(), "removed": {"com.example.app.debug"}, "updated": set()}
+    assert index.sequence == device.sequence
+
+
+def test_with_prefix(index):
+    assert index.with_prefix("com.example.") == ["com.example.app", "com.example.app.debug"]
+    assert index.with_prefix("org.") == []
+    assert "com.android.chrome" in index
+    assert len(index) == 3
+
+
+def test_parse_package_list_without_version_and_uid():
+    assert py_adb.parse_package_list("package:com.a\r\npackage:com.b versionCode:7\n") == {
+        "com.a": py_adb.PackageInfo("com.a", 0, 0), "com.b": py_adb.PackageInfo("com.b", 7, 0)
+    }
+
+
+def test_parse_package_changes_keeps_the_last_change():
+    output = "Sequence number=9\n  User 0:\n    seq=3, package=com.a\n  User 10:\n    seq=8, package=com.a\n"
+    assert py_adb.parse_package_changes(output) == (9, {"com.a": 8})
+    assert py_adb.parse_package_changes("") == (None, {})
@@ -0,0 +1,37 @@
+import struct
+from io import BytesIO
+
+import pytest
+
+import py_adb
+
+
+def raw_screencap(width: int, height: int, pixel_format: int, pixels: bytes, dataspace: bool = True) -> bytes:
+    return struct.pack("<III", width, height, pixel_format) + (struct.pack("<I", 0) if dataspace else b"") + pixels
+
+
+@pytest.mark.parametrize("dataspace", [True, False])
+def test_parse_screencap(dataspace):
+    pixels = bytes(range(2 * 3 * 4))
+    frame = py_adb.parse_screencap(raw_screencap(2, 3, 1, pixels, dataspace))
+    assert (frame.width, frame.height, frame.format_name) == (2, 3, "RGBA_8888")
+    assert frame.pixels.tobytes() == pixels
+
+
+def test_parse_screencap_errors():
+    with pytest.raises(RuntimeError, match="screen available"):
+        py_adb.parse_screencap(b"")
+    with pytest.raises(RuntimeError, match="bytes for a 2x3 frame"):
+        py_adb.parse_screencap(raw_screencap(2, 3, 1, bytes(10)))
+    with pytest.raises(RuntimeError, match="not supported"):
+        py_adb.parse_screencap(raw_screencap(2, 3, 99, bytes(24)))
+
+
+def test_read_screencap_reuses_the_buffer():
+    first = py_adb.read_screencap(BytesIO(raw_screencap(2, 2, 1, bytes([1]) * 16)))
+    second = py_adb.read_screencap(BytesIO(raw_screencap(2, 2, 1, bytes([2]) * 16, dataspace=False)), first.buffer)
+    assert second.buffer is first.buffer
+    assert second.pixels.tobytes() == bytes([2]) * 16
+    # a bigger frame can't fit, it gets its own memory
+    third = py_adb.read_screencap(BytesIO(raw_screencap(4, 4, 1, bytes([3]) * 64)), first.buffer)
+    assert third.buffer is not first.buffer
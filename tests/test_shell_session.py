@@ -0,0 +1,87 @@
+from subprocess import PIPE, Popen
+from threading import Event
+
+import pytest
+
+import py_adb
+
+
+class LocalShellTransport:
+    """open a local 'sh' instead of 'adb shell sh', the session framing is the same"""
+
+    def open(self, CMD: str) -> py_adb.ProcessStream:
+        return py_adb.ProcessStream(Popen(["sh"], stdin=PIPE, stdout=PIPE))
+
+
+class ScriptedStream:
+    """a stream replaying fixed output lines once `commands` commands were written"""
+
+    def __init__(self, lines: list, commands: int) -> None:
+        self.lines = lines
+        self.commands = commands
+        self.written = b""
+        self.ready = Event()
+
+    def write(self, data: bytes) -> None:
+        self.written += data
+        if self.written.count(py_adb.SHELL_SENTINEL.encode()) >= self.commands:
+            self.ready.set()
+
+    def close(self) -> None:
+        self.ready.set()
+
+    def __iter__(self):
+        self.ready.wait(5)
+        return iter(self.lines)
+
+
+class ScriptedTransport:
+    def __init__(self, lines: list, commands: int) -> None:
+        self.stream = ScriptedStream(lines, commands)
+
+    def open(self, CMD: str) -> ScriptedStream:
+        return self.stream
+
+
+@pytest.fixture
+def session():
+    session = py_adb.ShellSession("local", LocalShellTransport())
+    yield session
+    session.close()
+
+
+def test_output_and_exit_code(session):
+    assert session.run("echo hello", timeout=5) == py_adb.ShellResult("hello\n", 0)
+    assert session.run("ls /missing-directory", timeout=5).exit_code != 0
+
+
+def test_output_without_trailing_newline(session):
+    assert session.run("printf 'a\\nb'", timeout=5) == py_adb.ShellResult("a\nb", 0)
+    assert session.run("true", timeout=5) == py_adb.ShellResult("", 0)
+
+
+def test_stderr_is_merged(session):
+    assert session.run("echo oops >&2; (exit 3)", timeout=5) == py_adb.ShellResult("oops\n", 3)
+
+
+def test_pipelined_commands_keep_their_output(session):
+    futures = [session.submit(f"echo {i}; (exit {i % 3})") for i in range(50)]
+    assert [future.result(5) for future in futures] == [py_adb.ShellResult(f"{i}\n", i % 3) for i in range(50)]
+
+
+def test_sentinel_like_output_is_not_a_frame(session):
+    # a line that only looks like a sentinel (no ids) is part of the output
+    assert session.run(f"echo {py_adb.SHELL_SENTINEL}", timeout=5).output == py_adb.SHELL_SENTINEL + "\n"
+
+
+def test_out_of_sync_fails_every_pending_command():
+    # the output of the first command is lost, the next sentinel has the id of the second one
+    transport = ScriptedTransport([b"two\n", f"{py_adb.SHELL_SENTINEL} 2 0\n".encode()], 2)
+    session = py_adb.ShellSession("scripted", transport)
+    first, second = session.submit("echo one"), session.submit("echo two")
+    with pytest.raises(RuntimeError, match="out of sync"):
+        first.result(5)
+    with pytest.raises(RuntimeError):
+        second.result(5)
+    with pytest.raises(RuntimeError, match="closed"):
+        session.submit("echo three")
@@ -0,0 +1,117 @@
+import asyncio
+from subprocess import CalledProcessError
+
+import pytest
+
+import py_adb
+from tests.fake_adb_server import FakeAdbServer
+
+
+COMMANDS = {
+    "input keyevent 3": (b"", b"WARNING: linker: unused DT entry\n", 0),
+    "getprop ro.product.model": (b"Pixel 7\n", b"", 0),
+    "ls /missing": (b"", b"ls: /missing: No such file or directory\n", 1),
+}
+
+
+@pytest.fixture
+def server():
+    server = FakeAdbServer({"v2device": "shell_v2,cmd,stat_v2", "v1device": "cmd"}, COMMANDS, {"screencap": b"\x01\n\x02\r\n"})
+    yield server
+    server.close()
+
+
+def test_devices(server):
+    assert py_adb.parse_device_list(server.transport().run("adb devices").decode()) == [
+        {"id": "v2device", "status": "device"}, {"id": "v1device", "status": "device"}
+    ]
+
+
+def test_shell_v2_returns_stdout_only(server, capsys):
+    transport = server.transport()
+    assert transport.run("adb -s v2device shell getprop ro.product.model") == b"Pixel 7\n"
+    assert "host:transport:v2device" in server.requests
+    assert "shell,v2,raw:getprop ro.product.model" in server.requests
+
+
+def test_shell_v2_stderr_does_not_break_success(server, capsys):
+    transport = server.transport()
+    assert py_adb.execute_keyevent("adb -s v2device shell input keyevent 3", transport)
+    assert "unused DT entry" in capsys.readouterr().err
+
+
+def test_shell_v2_exit_code_raises(server, capsys):
+    with pytest.raises(CalledProcessError) as error:
+        server.transport().run("adb -s v2device shell ls /missing")
+    assert error.value.returncode == 1
+    assert b"No such file" in error.value.stderr
+
+
+def test_features_are_asked_once(server):
+    transport = server.transport()
+    transport.run("adb -s v2device shell getprop ro.product.model")
+    transport.run("adb -s v2device shell getprop ro.product.model")
+    assert server.requests.count("host-serial:v2device:features") == 1
+
+
+def test_shell_v1_exit_code(server):
+    transport = server.transport()
+    assert transport.run("adb -s v1device shell getprop ro.product.model") == b"Pixel 7\n"
+    with pytest.raises(CalledProcessError) as error:
+        transport.run("adb -s v1device shell ls /missing")
+    assert error.value.returncode == 1
+    assert b"No such file" in error.value.output
+
+
+def test_exec_is_binary_safe(server):
+    assert server.transport().run("adb -s v2device exec-out screencap") == b"\x01\n\x02\r\n"
+    assert "exec:screencap" in server.requests
+
+
+def test_fail_is_raised(server):
+    with pytest.raises(RuntimeError, match="not found"):
+        server.transport().run("adb -s unknown exec-out screencap")
+
+
+def test_push_bytes(server):
+    data = bytes(range(256)) * 1000
+    server.transport().push("v2device", data, "/data/local/tmp/blob.bin")
+    assert server.files["/data/local/tmp/blob.bin"] == data
+
+
+def test_async_shell_v2(server, capsys):
+    transport = py_adb.AsyncSocketTransport(port=server.port)
+
+    async def main():
+        output = await transport.run("adb -s v2device shell getprop ro.product.model")
+        with pytest.raises(CalledProcessError):
+            await transport.run("adb -s v1device shell ls /missing")
+        return output
+
+    assert asyncio.run(main()) == b"Pixel 7\n"
+
+
+@pytest.mark.parametrize("command, service", [
+    ("adb -s abc shell input tap 1 2", "shell:input tap 1 2"),
+    ("adb -s abc shell 'echo a; echo b'", "shell:echo a; echo b"),
+    ("adb -s abc exec-out screencap", "exec:screencap"),
+    ("adb -s abc uninstall com.example", "shell:pm uninstall com.example"),
+    ("adb -s abc install app.apk", None),
+])
+def test_to_service(command, service):
+    serial, verb, args = py_adb.split_adb_command(command)
+    assert serial == "abc"
+    assert py_adb.SocketTransport.to_service(verb, args) == service
+
+
+def test_split_adb_command_without_serial():
+    assert py_adb.split_adb_command("adb devices") == (None, "devices", "")
+    with pytest.raises(RuntimeError):
+        py_adb.split_adb_command("ls -l")
+
+
+def test_parse_shell_exit():
+    output = b"line\n\n" + py_adb.SHELL_SENTINEL.encode() + b" 0 2\n"
+    assert py_adb.parse_shell_exit(output) == (b"line\n", 2)
+    assert py_adb.parse_shell_exit(b"\r\n" + py_adb.SHELL_SENTINEL.encode() + b" 0 0\r\n") == (b"", 0)
+    assert py_adb.parse_shell_exit(b"no sentinel") == (b"no sentinel", None)
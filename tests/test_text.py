@@ -0,0 +1,101 @@
+import subprocess
+from base64 import b64decode
+
+import pytest
+
+import py_adb
+
+
+# the device tools, 'input text' turns every '%s' in a space
+DEVICE_STUBS = """
+input() {
+    case $1 in
+        text) printf '%s' "$2" | sed 's/%s/ /g';;
+        keyevent) shift; printf '<%s>' "$@";;
+    esac
+}
+sleep() { printf '<sleep %s>' "$1"; }
+"""
+
+
+def run_on_device(scripts: list) -> str:
+    """run the scripts in a local sh with the device tools stubbed, return what was typed"""
+    return subprocess.run(["sh", "-c", DEVICE_STUBS + "\n".join(scripts)], capture_output=True, check=True).stdout.decode()
+
+
+@pytest.mark.parametrize("text", [
+    "hello world",
+    "quotes ' \" and `backticks`",
+    "$HOME $(reboot) ; && || > < * ? ~ # !",
+    "100%s off and %%s and %",
+    "back\\slash",
+    "  leading and trailing  ",
+])
+def test_input_text_types_the_exact_text(text):
+    assert run_on_device(py_adb.text_scripts(text, "input")) == text
+
+
+def test_input_text_new_lines_and_tabs_are_keyevents():
+    typed = run_on_device(py_adb.text_scripts("user\tpassword\n", "input"))
+    assert typed == f"user<{py_adb.KEYEVENT_TAB}>password<{py_adb.KEYEVENT_RETURN}>"
+
+
+def test_input_text_chunks():
+    commands = py_adb.input_text_commands("a" * 300, chunk_size=128)
+    assert len(commands) == 3
+    assert run_on_device(py_adb.batch_commands(commands)) == "a" * 300
+
+
+def test_input_text_rejects_non_ascii():
+    with pytest.raises(RuntimeError, match="ascii"):
+        py_adb.input_text_commands("caffè")
+
+
+def test_batch_commands_respects_the_size():
+    scripts = py_adb.batch_commands(["x" * 10] * 10, size=30)
+    assert scripts == ["; ".join(["x" * 10] * 2)] * 5
+
+
+def test_keyboard_text_is_base64():
+    text = "émoji 👍 and 'quotes'"
+    commands = py_adb.keyboard_text_commands(text, chunk_size=5)
+    decoded = "".join(b64decode(command.split("--es msg ")[1].split()[0]).decode() for command in commands)
+    assert decoded == text
+
+
+@pytest.mark.parametrize("text, strategy, available, chosen", [
+    ("ascii", "auto", ["keyboard", "clipboard", "input"], "keyboard"),
+    ("ascii", "auto", ["clipboard", "input"], "input"),
+    ("città", "auto", ["clipboard", "input"], "clipboard"),
+    ("città", "auto", ["input"], "input"),
+    ("ascii", "clipboard", ["clipboard", "input"], "clipboard"),
+])
+def test_choose_text_strategy(text, strategy, available, chosen):
+    assert py_adb.choose_text_strategy(text, strategy, available) == chosen
+
+
+def test_choose_text_strategy_errors():
+    with pytest.raises(RuntimeError, match="not supported"):
+        py_adb.choose_text_strategy("a", "telepathy", ["input"])
+    with pytest.raises(RuntimeError, match="not available"):
+        py_adb.choose_text_strategy("a", "keyboard", ["input"])
+
+
+def test_parse_text_strategies():
+    assert py_adb.parse_text_strategies(f"{py_adb.ADB_KEYBOARD_IME}\npackage:/data/app/base.apk\n") == ["keyboard", "clipboard", "input"]
+    assert py_adb.parse_text_strategies("com.google.android.inputmethod.latin/.LatinIME\n") == ["input"]
+
+
+def test_key_sequence_script_single_command():
+    assert py_adb.key_sequence_script([24, 24, "KEYCODE_HOME"]) == "input keyevent 24 24 KEYCODE_HOME"
+    assert py_adb.key_sequence_script([26], longpress=True) == "input keyevent --longpress 26"
+
+
+def test_key_sequence_script_delays_run_on_the_device():
+    assert run_on_device([py_adb.key_sequence_script([61, 66], delay_ms=250)]) == "<61><sleep 0.25><66>"
+
+
+@pytest.mark.parametrize("key", ["24; reboot", "$(id)", "KEYCODE HOME", ""])
+def test_key_sequence_script_rejects_non_keycodes(key):
+    with pytest.raises(RuntimeError, match="not a keycode"):
+        py_adb.key_sequence_script([24, key])
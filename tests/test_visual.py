@@ -0,0 +1,59 @@
+import struct
+
+import pytest
+
+import py_adb
+
+numpy = pytest.importorskip("numpy")
+
+
+def image(height: int = 60, width: int = 80, seed: int = 7):
+    return numpy.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=numpy.uint8)
+
+
+def test_rgb_pixels_of_rgb_565():
+    # pure red, green and blue in RGB_565
+    pixels = py_adb.rgb_pixels(numpy.array([[0xf800, 0x07e0, 0x001f]], dtype=numpy.uint16))
+    assert pixels.tolist() == [[[255, 0, 0], [0, 255, 0], [0, 0, 255]]]
+
+
+def test_rgb_pixels_of_bgra_frame():
+    frame = py_adb.parse_screencap(struct.pack("<III", 1, 1, 5) + bytes([10, 20, 30, 255]))
+    assert py_adb.rgb_pixels(frame).tolist() == [[[30, 20, 10]]]
+
+
+def test_match_template_finds_the_patch():
+    pixels = image()
+    match = py_adb.match_template(pixels, pixels[20:30, 35:50])
+    assert (match.x, match.y) == (35 + 15 // 2, 20 + 10 // 2)
+    assert match.score == pytest.approx(1.0)
+
+
+def test_match_template_in_a_region():
+    pixels = image()
+    # the same patch twice, the region selects the second one
+    pixels[5:15, 5:20] = pixels[40:50, 60:75]
+    match = py_adb.match_template(pixels, pixels[40:50, 60:75], region=(50, 30, 80, 60))
+    assert (match.x, match.y) == (60 + 7, 40 + 5)
+
+
+def test_match_template_is_brightness_invariant():
+    pixels = image()
+    template = (pixels[10:20, 10:20].astype(numpy.int16) // 2 + 40).astype(numpy.uint8)
+    match = py_adb.match_template(pixels, template)
+    assert (match.x, match.y) == (15, 15)
+    assert match.score > 0.99
+
+
+def test_match_template_bigger_than_the_image():
+    with pytest.raises(RuntimeError, match="bigger"):
+        py_adb.match_template(image(10, 10), image(20, 20))
+
+
+def test_changed_fraction_and_crop():
+    reference = image()
+    pixels = reference.copy()
+    pixels[:30] = 255 - pixels[:30]
+    assert py_adb.changed_fraction(py_adb.crop(pixels, (0, 30, 80, 60)), py_adb.crop(reference, (0, 30, 80, 60))) == 0
+    assert py_adb.changed_fraction(pixels, reference, tolerance=255) == 0
+    assert 0.45 < py_adb.changed_fraction(pixels, reference) <= 0.5